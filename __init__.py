@@ -16,7 +16,16 @@
 #
 # END GPL LICENSE BLOCK #####
 
+import json
+import os
+import re
+import time
+
 import bpy
+import numpy as np
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque, namedtuple
+from heapq import heappop, heappush, nsmallest
 
 def get_prefs(context):
     addon = context.preferences.addons.get(__name__)
@@ -25,6 +34,8 @@ def get_prefs(context):
 def get_row(parent_layout, context):
     prefs = get_prefs(context)
     row = parent_layout.row(align=True)
+    if profiler.enabled:
+        profiler.items += 1
     if prefs and prefs.align_ui != 'EXPAND':
         row.alignment = prefs.align_ui
     return row
@@ -42,9 +53,146 @@ class MATALOGUE_Preferences(bpy.types.AddonPreferences):
         ],
         default="EXPAND",
     )
+    use_list_view: bpy.props.BoolProperty(
+        name="List View",
+        default=False,
+        description="Show each catalogue as a scrollable list that only draws the visible rows. "
+        "Much faster for files with thousands of materials or node groups",
+    )
+    list_rows: bpy.props.IntProperty(
+        name="Rows",
+        default=12,
+        min=3,
+        max=100,
+        description="Number of rows shown in each list when List View is enabled",
+    )
+
+    preview_policy: bpy.props.EnumProperty(
+        name="Material Previews",
+        items=[
+            ("ALWAYS", "Always", "Show previews for every listed material, generating them all at once if needed"),
+            ("LAZY", "Lazy", "Generate previews a few at a time in the background, visible and recent materials first"),
+            ("LIMIT", "Off For Long Lists", "Generate previews lazily, but don't show any when many materials are listed"),
+        ],
+        default="LAZY",
+    )
+    preview_limit: bpy.props.IntProperty(
+        name="Max Items",
+        default=200,
+        min=1,
+        description="Don't show material previews when more than this many materials are listed",
+    )
+    preview_budget: bpy.props.IntProperty(
+        name="Previews Per Tick",
+        default=4,
+        min=1,
+        max=100,
+        description="How many material previews are requested each time the background generator runs",
+    )
+
+    build_budget: bpy.props.IntProperty(
+        name="Indexing Time Per Tick (ms)",
+        default=10,
+        min=1,
+        max=1000,
+        description="Milliseconds spent indexing objects and node trees at a time after a file is loaded, "
+        "before giving control back to the interface",
+    )
+
+    save_index: bpy.props.BoolProperty(
+        name="Save Index In File",
+        default=True,
+        description="Store which objects use which materials and node groups in a hidden text in the .blend file, "
+        "so the Trees tab is ready right away when the file is opened again",
+    )
+
+    report_navigation_time: bpy.props.BoolProperty(
+        name="Report Navigation Time",
+        default=False,
+        description="Report how long each jump to a tree took and how many editor path updates it needed",
+    )
+    show_group_users: bpy.props.BoolProperty(
+        name="Show Group Users",
+        default=False,
+        description="Show how many materials, trees and scenes use each node group directly",
+    )
+    show_tree_cost: bpy.props.BoolProperty(
+        name="Show Tree Cost",
+        default=False,
+        description="Show an estimate of how expensive each tree is to compile, from its nodes and textures and "
+        "those of the groups nested in it",
+    )
+    heavy_tree_cost: bpy.props.IntProperty(
+        name="Heavy Tree Cost",
+        default=500,
+        min=1,
+        description="Trees with an estimated cost of at least this much are highlighted",
+    )
+    show_face_counts: bpy.props.BoolProperty(
+        name="Show Face Counts",
+        default=False,
+        description="Show how many faces use each material. Nothing is shown for materials used by objects that "
+        "aren't meshes",
+    )
+
+    use_profiler: bpy.props.BoolProperty(
+        name="Profile Panels",
+        default=False,
+        description="Time every draw and poll of the Trees panels and every Matalogue operator, and show the "
+        "slowest ones in a Profiler panel. Adds a little overhead, so only enable it while looking into slowdowns",
+        update=lambda self, context: sync_profiler(self),
+    )
+    profiler_window: bpy.props.IntProperty(
+        name="Samples",
+        default=200,
+        min=10,
+        max=10000,
+        description="Number of recent timings kept for each panel, filter combination and operator",
+        update=lambda self, context: sync_profiler(self),
+    )
 
     def draw(self, context):
         self.layout.prop(self, "align_ui")
+        row = self.layout.row()
+        row.prop(self, "show_group_users")
+        row.prop(self, "show_face_counts")
+        row = self.layout.row()
+        row.prop(self, "show_tree_cost")
+        sub = row.row()
+        sub.active = self.show_tree_cost
+        sub.prop(self, "heavy_tree_cost")
+        self.layout.prop(self, "report_navigation_time")
+        row = self.layout.row()
+        row.prop(self, "build_budget")
+        row.prop(self, "save_index")
+        row = self.layout.row()
+        row.prop(self, "use_list_view")
+        sub = row.row()
+        sub.active = self.use_list_view
+        sub.prop(self, "list_rows")
+
+        col = self.layout.column()
+        col.prop(self, "preview_policy")
+        sub = col.column()
+        sub.active = self.preview_policy != "ALWAYS"
+        if self.preview_policy == "LIMIT":
+            sub.prop(self, "preview_limit")
+        sub.prop(self, "preview_budget")
+
+        row = self.layout.row()
+        row.prop(self, "use_profiler")
+        sub = row.row()
+        sub.active = self.use_profiler
+        sub.prop(self, "profiler_window")
+
+SORT_MODES = [
+    ("NAME", "Name", "Sort by name", "SORTALPHA", 0),
+    ("USERS", "Users", "Most used first: objects for materials, objects and node trees for node groups", "USER", 1),
+    ("RECENT", "Recently Visited", "Most recently visited first", "TIME", 2),
+    ("NODES", "Node Count", "Biggest trees first", "NODETREE", 3),
+    ("COST", "Estimated Cost", "Most expensive trees first, counting nested groups and textures", "ERROR", 4),
+]
+
 
 class MATALOGUE_Settings(bpy.types.PropertyGroup):
     mat_selected_only: bpy.props.BoolProperty(
@@ -56,6 +204,27 @@ class MATALOGUE_Settings(bpy.types.PropertyGroup):
         description="Only show materials used by objects that are visible in the current scene.",
     )
 
+    mat_evaluated: bpy.props.BoolProperty(
+        name="Evaluated Usage",
+        default=False,
+        description="Count materials as used when they are rendered through collection or particle instances or "
+        "geometry nodes, not only when they are in a material slot. Affects the Selected and Visible filters and "
+        "which objects are selected when going to a material",
+    )
+
+    mat_hide_empty: bpy.props.BoolProperty(
+        name="Hide Empty Slots",
+        default=False,
+        description="Hide materials that are only in material slots with no faces assigned to them",
+    )
+
+    mat_sort: bpy.props.EnumProperty(name="Sort Materials", items=SORT_MODES, default="NAME")
+    shader_group_sort: bpy.props.EnumProperty(name="Sort Shader Groups", items=SORT_MODES, default="NAME")
+    geo_modifier_sort: bpy.props.EnumProperty(name="Sort Geometry Node Modifiers", items=SORT_MODES, default="NAME")
+    geo_tool_sort: bpy.props.EnumProperty(name="Sort Geometry Node Tools", items=SORT_MODES, default="NAME")
+    geo_group_sort: bpy.props.EnumProperty(name="Sort Geometry Node Groups", items=SORT_MODES, default="NAME")
+    comp_group_sort: bpy.props.EnumProperty(name="Sort Compositor Groups", items=SORT_MODES, default="NAME")
+
     light_visible_only: bpy.props.BoolProperty(
         name="Visible Collections Only",
         default=False,
@@ -73,6 +242,17 @@ class MATALOGUE_Settings(bpy.types.PropertyGroup):
         description="Only show geometry node trees used by objects that are visible in the current scene",
     )
 
+    view_only: bpy.props.BoolProperty(
+        name="View Only",
+        default=False,
+        description="Show trees by pinning them in the Node Editor, without changing the selection, the active object "
+        "or the scene, or adding a dummy object for unused materials",
+    )
+
+    # Active indices for the lists in List View. Clicking an item runs its operator, so these are otherwise unused.
+    mat_list_index: bpy.props.IntProperty()
+    group_list_index: bpy.props.IntProperty()
+
 
 #####################################################################
 # Functions
@@ -94,36 +274,2029 @@ def get_compositor_node_group(scene):
     return scene.node_tree
 
 
+dummy_handle = [None]  # the dummy object, kept so it doesn't have to be found by name every time
+
+
+def find_dummy():
+    dummy = dummy_handle[0]
+    if dummy is not None:
+        try:
+            dummy.name
+        except ReferenceError:  # Removed by the user
+            dummy = None
+    if dummy is None:
+        dummy = bpy.data.objects.get("Matalogue Dummy Object")
+    dummy_handle[0] = dummy
+    return dummy
+
+
 def dummy_object(delete=False):
     """Return the existing dummy object, or create one if it doesn't exist."""
     scene = bpy.context.scene
 
     if delete:
-        for obj in scene.objects:
-            if "Matalogue Dummy Object" in obj.name:
-                scene.collection.objects.unlink(obj)
+        dummy = find_dummy()
+        if dummy is not None and scene in dummy.users_scene:
+            scene.collection.objects.unlink(dummy)
         return "DONE"
 
-    dummy = None
-    previous_dummy = [obj for obj in bpy.data.objects if obj.name == "Matalogue Dummy Object"]
-    if previous_dummy:
-        dummy = previous_dummy[0]
-    else:
+    dummy = find_dummy()
+    if dummy is None:
         m = bpy.data.meshes.new("Matalogue Dummy Mesh")
         dummy = bpy.data.objects.new("Matalogue Dummy Object", m)
+        dummy_handle[0] = dummy
 
-    if dummy not in list(obj for obj in scene.objects):
+    if scene not in dummy.users_scene:
         scene.collection.objects.link(dummy)
 
     dummy.select_set(True)
     bpy.context.view_layer.objects.active = dummy
 
     if len(dummy.material_slots) == 0:
-        bpy.ops.object.material_slot_add()
+        dummy.data.materials.append(None)
 
     return dummy
 
 
+#####################################################################
+# Usage Index
+#####################################################################
+
+
+def session_uids(collection):
+    uids = [0] * len(collection)
+    collection.foreach_get("session_uid", uids)
+    return uids
+
+
+class UsageIndex:
+    """Reverse index from materials and geometry node groups to the objects (and material slots or modifiers)
+    that use them.
+
+    Kept current from depsgraph updates so that the panels and operators can look up users of a tree
+    instead of scanning every object, material slot and modifier in the file."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.objects = {}  # object uid -> object
+        self.object_data = {}  # object uid -> object data uid
+        self.object_materials = {}  # object uid -> set of material uids
+        self.material_users = {}  # material uid -> {object uid: [slot indices]}
+        self.data_users = {}  # object data uid -> set of object uids
+        self.object_groups = {}  # object uid -> set of node group uids
+        self.group_users = {}  # node group uid -> {object uid: [modifier names]}
+        self.lights = {}  # object uid -> light object
+        self.light_generation = 0  # bumped when a light object changes or objects move between collections
+        self.light_layers = {}  # view layer pointer -> (key, {light type: [light objects]})
+        self.dirty = True
+        self.building = False  # filled a slice at a time by the index builder, lookups return partial results
+        self.touched = None  # uids of the trees whose users changed since the sort orders were updated, None for all
+
+    def begin_build(self):
+        self.clear()
+        self.dirty = False
+        self.building = True
+
+    def rebuild(self):
+        self.clear()
+        for obj in bpy.data.objects:
+            self.update_object(obj)
+        self.dirty = False
+
+    def sync_objects(self):
+        """Index the objects added since the last update and drop the removed ones, without reading the others."""
+        objects = bpy.data.objects
+        uids = session_uids(objects)
+        for uid in self.objects.keys() - set(uids):
+            self.remove_object(uid)
+        if len(self.objects) != len(uids):
+            for obj, uid in zip(objects, uids):
+                if uid not in self.objects:
+                    self.update_object(obj)
+
+    def ensure(self):
+        if self.building:
+            return
+        if self.dirty:
+            self.rebuild()
+        elif len(self.objects) != len(bpy.data.objects):
+            self.sync_objects()
+
+    def remove_object(self, uid):
+        self.objects.pop(uid, None)
+        if self.lights.pop(uid, None) is not None:
+            self.light_generation += 1
+        if self.touched is not None:
+            self.touched.update(self.object_materials.get(uid, ()), self.object_groups.get(uid, ()))
+        for mat_uid in self.object_materials.pop(uid, ()):
+            users = self.material_users.get(mat_uid)
+            if users is not None:
+                users.pop(uid, None)
+                if not users:
+                    del self.material_users[mat_uid]
+        for group_uid in self.object_groups.pop(uid, ()):
+            users = self.group_users.get(group_uid)
+            if users is not None:
+                users.pop(uid, None)
+                if not users:
+                    del self.group_users[group_uid]
+        data_uid = self.object_data.pop(uid, None)
+        if data_uid is not None:
+            self.data_users.get(data_uid, set()).discard(uid)
+
+    def update_object(self, obj):
+        materials = {}
+        for i, slot in enumerate(obj.material_slots):
+            mat = slot.material
+            if mat is not None:
+                materials.setdefault(mat.session_uid, []).append(i)
+
+        groups = {}
+        for mod in obj.modifiers:
+            if mod.type == "NODES" and mod.node_group is not None:
+                groups.setdefault(mod.node_group.session_uid, []).append(mod.name)
+
+        data_uid = obj.data.session_uid if obj.data is not None else None
+        self.add_object(obj, obj.type, data_uid, materials, groups)
+
+    def add_object(self, obj, obj_type, data_uid, materials, groups):
+        """Index an object whose users are already known: materials is {material uid: [slot indices]}
+        and groups is {node group uid: [modifier names]}."""
+        uid = obj.session_uid
+        self.remove_object(uid)
+        self.objects[uid] = obj
+        if obj_type == "LIGHT":
+            self.lights[uid] = obj
+            self.light_generation += 1
+        if data_uid is not None:
+            self.object_data[uid] = data_uid
+            self.data_users.setdefault(data_uid, set()).add(uid)
+
+        for mat_uid, slots in materials.items():
+            self.material_users.setdefault(mat_uid, {})[uid] = slots
+        self.object_materials[uid] = set(materials)
+
+        for group_uid, mods in groups.items():
+            self.group_users.setdefault(group_uid, {})[uid] = mods
+        self.object_groups[uid] = set(groups)
+        if self.touched is not None:
+            self.touched.update(materials, groups)
+
+    def handle_updates(self, depsgraph):
+        if self.dirty:
+            return
+        if not self.building and len(self.objects) != len(bpy.data.objects):
+            # Objects were added or removed, which doesn't always show up in the updates
+            self.sync_objects()
+        for update in depsgraph.updates:
+            id_data = update.id.original
+            if isinstance(id_data, bpy.types.Object):
+                self.update_object(id_data)
+            elif isinstance(id_data, bpy.types.Collection):
+                self.light_generation += 1
+            elif id_data.session_uid in self.data_users:
+                for uid in tuple(self.data_users[id_data.session_uid]):
+                    self.update_object(self.objects[uid])
+
+    def users(self, mat):
+        """Return a list of (object, slot indices) for every object using this material."""
+        self.ensure()
+        users = self.material_users.get(mat.session_uid, {})
+        return [(self.objects[uid], slots) for uid, slots in users.items()]
+
+    def group_modifier_users(self, g):
+        """Return a list of (object, modifier names) for every object with a Geometry Nodes modifier using this group."""
+        self.ensure()
+        users = self.group_users.get(g.session_uid, {})
+        return [(self.objects[uid], mods) for uid, mods in users.items()]
+
+    def used_by_selected(self, mat, view_layer):
+        return any(obj.select_get(view_layer=view_layer) for obj, _slots in self.users(mat))
+
+    def used_by_visible(self, mat, view_layer):
+        return any(obj.visible_get(view_layer=view_layer) for obj, _slots in self.users(mat))
+
+    def group_used_by_selected(self, g, view_layer):
+        return any(obj.select_get(view_layer=view_layer) for obj, _mods in self.group_modifier_users(g))
+
+    def group_used_by_visible(self, g, view_layer):
+        return any(obj.visible_get(view_layer=view_layer) for obj, _mods in self.group_modifier_users(g))
+
+    def remap_materials(self, sources, target):
+        """Assign target to every material slot that uses one of the sources, in one pass over their users.
+        Returns the number of slots changed, and of slots left alone because they belong to linked data."""
+        if index_builder.running:
+            index_builder.tick(float("inf"))
+        self.ensure()
+        done = set()  # (object data uid, slot index) of the slots already changed through another object
+        users = {}
+        changed = skipped = 0
+        for source in sources:
+            for uid, slots in tuple(self.material_users.get(source.session_uid, {}).items()):
+                obj = users[uid] = self.objects[uid]
+                for i in slots:
+                    slot = obj.material_slots[i]
+                    if slot.link == "DATA":
+                        key = (self.object_data.get(uid), i)
+                        if key in done:
+                            continue
+                        done.add(key)
+                        owner = obj.data
+                    else:
+                        owner = obj
+                    if owner.library is not None:
+                        skipped += 1
+                        continue
+                    slot.material = target
+                    changed += 1
+
+        for obj in users.values():
+            self.update_object(obj)
+        return changed, skipped
+
+    def lights_by_type(self, view_layer):
+        """Return {light type: [light objects]} for the lights in this view layer, sorted by name.
+
+        Only the light objects are checked, against the collections the view layer doesn't exclude, and the result
+        is kept until a light or a collection changes."""
+        self.ensure()
+        key = (self.light_generation, len(view_layer.objects))
+        cached = self.light_layers.get(view_layer.as_pointer())
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        included = set()
+        stack = [view_layer.layer_collection]
+        while stack:
+            layer = stack.pop()
+            if layer.exclude:
+                continue
+            included.add(layer.collection.as_pointer())
+            stack.extend(layer.children)
+
+        by_type = {}
+        for obj in sorted(self.lights.values(), key=lambda obj: obj.name):
+            if obj.data is not None and any(c.as_pointer() in included for c in obj.users_collection):
+                by_type.setdefault(obj.data.type, []).append(obj)
+        self.light_layers[view_layer.as_pointer()] = (key, by_type)
+        return by_type
+
+
+usage_index = UsageIndex()
+LIGHT_TYPES = ("POINT", "SUN", "SPOT", "AREA")
+
+
+class EvaluatedUsage:
+    """Material users as they are rendered, including materials that reach the view layer through collection or
+    particle instances and geometry nodes (e.g. Set Material), from the object instances of the evaluated depsgraph.
+
+    Each view layer's instances are walked at most once per depsgraph update, and the materials of each instanced
+    geometry are kept until its object changes."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.sources = {}  # original object uid -> {evaluated data pointer: material uids}
+        self.layers = {}  # view layer pointer -> {material uid: {object uid: object}}, instancers rather than instances
+
+    def handle_updates(self, depsgraph):
+        changed = False
+        for update in depsgraph.updates:
+            id_data = update.id.original
+            if isinstance(id_data, bpy.types.Object):
+                if update.is_updated_transform and not update.is_updated_geometry:
+                    continue  # Moving an object doesn't change its materials
+                self.sources.pop(id_data.session_uid, None)
+                changed = True
+            elif isinstance(id_data, (bpy.types.Collection, bpy.types.NodeTree)):
+                changed = True
+        if changed:
+            view_layer = depsgraph.view_layer
+            if view_layer is None:
+                self.layers.clear()
+            else:
+                self.layers.pop(view_layer.as_pointer(), None)
+
+    def users(self, depsgraph):
+        """Return {material uid: {object uid: object}} for the view layer of this evaluated depsgraph. The objects
+        are the ones in the view layer, so for instances it's the object doing the instancing."""
+        key = depsgraph.view_layer.as_pointer()
+        users = self.layers.get(key)
+        if users is not None:
+            return users
+
+        users = {}
+        seen = set()  # (instanced data pointer, instancer uid)
+        for instance in depsgraph.object_instances:
+            obj = instance.object
+            data = obj.data
+            pointer = data.as_pointer() if data is not None else 0
+            owner = instance.parent.original if instance.is_instance else obj.original
+            owner_uid = owner.session_uid
+            if (pointer, owner_uid) in seen:
+                continue
+            seen.add((pointer, owner_uid))
+
+            by_data = self.sources.setdefault(obj.original.session_uid, {})
+            materials = by_data.get(pointer)
+            if materials is None:
+                materials = by_data[pointer] = {
+                    slot.material.original.session_uid for slot in obj.material_slots if slot.material is not None
+                }
+            for mat_uid in materials:
+                users.setdefault(mat_uid, {})[owner_uid] = owner
+        self.layers[key] = users
+        return users
+
+    def objects(self, mat, depsgraph):
+        return list(self.users(depsgraph).get(mat.session_uid, {}).values())
+
+    def used_by_selected(self, mat, depsgraph):
+        view_layer = depsgraph.view_layer
+        return any(obj.select_get(view_layer=view_layer) for obj in self.objects(mat, depsgraph))
+
+    def used_by_visible(self, mat, depsgraph):
+        return mat.session_uid in self.users(depsgraph)
+
+
+evaluated_usage = EvaluatedUsage()
+
+
+class FaceCounts:
+    """Number of faces that use each material, from the material index of every face of the meshes using it.
+
+    The counts of a mesh are kept until its geometry changes, and the totals until a mesh or an object changes."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.meshes = {}  # mesh uid -> number of faces per material index
+        self.totals = {}  # material uid -> number of faces, None if it has no users or some of them aren't meshes
+
+    def handle_updates(self, depsgraph):
+        for update in depsgraph.updates:
+            id_data = update.id.original
+            if isinstance(id_data, bpy.types.Mesh):
+                if update.is_updated_geometry:
+                    self.meshes.pop(id_data.session_uid, None)
+                    self.totals.clear()
+            elif isinstance(id_data, bpy.types.Object):
+                if update.is_updated_geometry or not update.is_updated_transform:
+                    self.totals.clear()
+
+    def mesh_counts(self, mesh):
+        uid = mesh.session_uid
+        counts = self.meshes.get(uid)
+        if counts is None:
+            polygons = mesh.polygons
+            indices = np.empty(len(polygons), dtype=np.int32)
+            polygons.foreach_get("material_index", indices)
+            slots = len(mesh.materials)
+            if slots:
+                np.minimum(indices, slots - 1, out=indices)  # Faces past the last slot use the last one
+            counts = self.meshes[uid] = np.bincount(indices, minlength=slots)
+        return counts
+
+    def total(self, mat):
+        uid = mat.session_uid
+        if uid in self.totals:
+            return self.totals[uid]
+        users = usage_index.users(mat)
+        total = 0 if users else None
+        counted = set()  # (mesh uid, slot index), so slots shared through the mesh are counted once
+        for obj, slots in users:
+            if obj.type != "MESH":
+                total = None
+                break
+            mesh = obj.data
+            counts = self.mesh_counts(mesh)
+            for i in slots:
+                key = (mesh.session_uid, i)
+                if key not in counted and i < len(counts):
+                    counted.add(key)
+                    total += int(counts[i])
+        self.totals[uid] = total
+        return total
+
+
+face_counts = FaceCounts()
+
+
+def group_state(g, tree_type):
+    if tree_type == "GEOMETRY":
+        return (tree_type, g.is_modifier, g.is_tool)
+    return (tree_type, None, None)
+
+
+class DataRegistry:
+    """Materials, node groups and scenes partitioned by the panel they are listed in.
+
+    The partitions are computed at most once per change generation, so every panel drawn in one redraw shares
+    the same scan, and nothing is scanned again until the data changes. Edits inside a tree (moving a node, changing
+    a value) don't count as changes: only datablocks being added, removed, renamed or changing what they are listed as
+    do."""
+
+    def __init__(self):
+        self.generation = 0
+        self.key = None
+        self.materials = []
+        self.shader_groups = []
+        self.geometry_groups = []
+        self.compositor_groups = []
+        self.scenes = []
+        self.geometry_partitions = {}
+        self.material_duplicates = {}  # base name -> names of the materials called that or numbered copies of it
+        self.states = {}  # uid -> state() of each material and node group at the last scan
+
+    @staticmethod
+    def state(id_data):
+        """What decides where a material or node group is listed and in which order."""
+        if isinstance(id_data, bpy.types.Material):
+            return (id_data.name, id_data.use_nodes)
+        return (id_data.name, *group_state(id_data, id_data.type))
+
+    def bump(self):
+        self.generation += 1
+
+    def ensure(self):
+        data = bpy.data
+        key = (self.generation, len(data.materials), len(data.node_groups), len(data.scenes))
+        if key == self.key:
+            return
+        self.key = key
+
+        self.states = states = {}
+        self.materials = []
+        for mat, uid, name in zip(data.materials, session_uids(data.materials), data.materials.keys()):
+            use_nodes = mat.use_nodes
+            states[uid] = (name, use_nodes)
+            if use_nodes:
+                self.materials.append(mat)
+        self.shader_groups = []
+        self.geometry_groups = []
+        self.compositor_groups = []
+        by_type = {
+            "SHADER": self.shader_groups,
+            "GEOMETRY": self.geometry_groups,
+            "COMPOSITING": self.compositor_groups,
+        }
+        for g, uid, name in zip(data.node_groups, session_uids(data.node_groups), data.node_groups.keys()):
+            tree_type = g.type
+            states[uid] = (name, *group_state(g, tree_type))
+            groups = by_type.get(tree_type)
+            if groups is not None:
+                groups.append(g)
+        self.scenes = list(data.scenes)
+        self.geometry_partitions = {}
+
+        by_base = {}
+        for name in data.materials.keys():
+            by_base.setdefault(base_name(name), []).append(name)
+        self.material_duplicates = {base: names for base, names in by_base.items() if len(names) > 1}
+
+    def handle_updates(self, depsgraph):
+        for update in depsgraph.updates:
+            if isinstance(update.id, (bpy.types.Material, bpy.types.NodeTree)):
+                id_data = update.id.original
+                # Trees embedded in materials aren't listed, and added datablocks change the counts in the key
+                state = self.states.get(id_data.session_uid)
+                if state is not None and state != self.state(id_data):
+                    self.bump()
+                    return
+
+    def geometry_groups_where(self, conditions, inverse=False):
+        """Return the geometry node groups where any of the given flags (e.g. is_modifier) is set, or none if inverse."""
+        self.ensure()
+        key = (tuple(conditions), inverse)
+        groups = self.geometry_partitions.get(key)
+        if groups is None:
+            groups = [g for g in self.geometry_groups if any((getattr(g, c) is True for c in conditions)) != inverse]
+            self.geometry_partitions[key] = groups
+        return groups
+
+
+registry = DataRegistry()
+
+
+class IdentityMap:
+    """Datablocks by session_uid, so that the goto operators open exactly the datablock a panel listed, in constant
+    time, even when linked libraries bring in others with the same name.
+
+    The map of a collection is only rebuilt when datablocks were added to it or removed from it."""
+
+    def __init__(self):
+        self.maps = {}  # bpy.data collection name -> (length, {session_uid: datablock})
+
+    def clear(self):
+        self.maps.clear()
+
+    def build(self, collection_name):
+        collection = getattr(bpy.data, collection_name)
+        ids = {id_data.session_uid: id_data for id_data in collection}
+        self.maps[collection_name] = (len(collection), ids)
+        return ids
+
+    def get(self, collection_name, uid, name):
+        """Return the datablock with this session_uid, or the one with this name if there's no uid (e.g. when called
+        from a script) or it's no longer in the file. Raises KeyError if neither is found."""
+        collection = getattr(bpy.data, collection_name)
+        if uid:
+            length, ids = self.maps.get(collection_name, (None, None))
+            if length != len(collection):
+                ids = self.build(collection_name)
+            id_data = ids.get(uid)
+            try:
+                if id_data is not None and id_data.session_uid == uid:
+                    return id_data
+            except ReferenceError:  # Removed since the map was built
+                pass
+            # Others were added and removed without changing the count
+            id_data = self.build(collection_name).get(uid)
+            if id_data is not None:
+                return id_data
+        return collection[name]
+
+
+identity_map = IdentityMap()
+NUMBERED_NAME = re.compile(r"^(.+)\.\d{3,}$")
+
+
+def base_name(name):
+    """Strip the number Blender adds to duplicate names, e.g. 'Metal.002' -> 'Metal'."""
+    match = NUMBERED_NAME.match(name)
+    return match.group(1) if match else name
+
+
+def tree_of(owner):
+    """Return the node tree of a material, world, light, scene or node group."""
+    if isinstance(owner, bpy.types.NodeTree):
+        return owner
+    if isinstance(owner, bpy.types.Scene):
+        return get_compositor_node_group(owner)
+    return owner.node_tree
+
+
+class TreeGraph:
+    """Which node groups are used directly inside each node tree, and which trees use each node group.
+
+    Trees are keyed by the uid of the datablock that owns them (material, world, light, scene or the group itself).
+    A tree is only rescanned after it shows up in a depsgraph update."""
+
+    def __init__(self):
+        self.generation = 0  # bumped whenever a tree's group nodes change, never reset
+        self.clear()
+
+    def clear(self):
+        self.generation += 1
+        self.owners = {}  # owner uid -> owner
+        self.children = {}  # owner uid -> {group uid: group}, in the order they were found
+        self.parents = {}  # group uid -> set of owner uids
+        self.dirty = set()
+        self.key = None
+        self.building = False
+        self.touched = None  # uids of the groups whose users changed since the sort orders were updated, None for all
+
+    @staticmethod
+    def owner_collections():
+        data = bpy.data
+        return (data.materials, data.node_groups, data.worlds, data.lights, data.scenes)
+
+    def ensure(self):
+        collections = self.owner_collections()
+        key = tuple(len(collection) for collection in collections)
+        if key != self.key and not self.building:
+            self.clear()
+            self.key = key
+            for collection in collections:
+                for owner in collection:
+                    self.scan(owner)
+        elif self.dirty:
+            for uid in self.dirty:
+                owner = self.owners.get(uid)
+                if owner is not None:
+                    self.scan(owner)
+        self.dirty.clear()
+
+    def scan(self, owner):
+        children = {}
+        tree = tree_of(owner)
+        if tree is not None:
+            for node in tree.nodes:
+                if node.type == "GROUP" and node.node_tree is not None:
+                    children.setdefault(node.node_tree.session_uid, node.node_tree)
+        self.set_children(owner, children)
+
+    def set_children(self, owner, children):
+        uid = owner.session_uid
+        self.owners[uid] = owner
+        old_children = self.children.get(uid, {})
+        if old_children.keys() != children.keys():
+            self.generation += 1
+            if self.touched is not None:
+                self.touched.update(old_children.keys() ^ children.keys())
+        for child_uid in old_children:
+            self.parents[child_uid].discard(uid)
+        self.children[uid] = children
+        for child_uid in children:
+            self.parents.setdefault(child_uid, set()).add(uid)
+
+    def handle_updates(self, depsgraph):
+        owner_types = (bpy.types.Material, bpy.types.NodeTree, bpy.types.World, bpy.types.Light, bpy.types.Scene)
+        for update in depsgraph.updates:
+            if isinstance(update.id, owner_types):
+                self.dirty.add(update.id.original.session_uid)
+
+    def child_groups(self, owner):
+        self.ensure()
+        return list(self.children.get(owner.session_uid, {}).values())
+
+    def users(self, g):
+        """Return the materials, worlds, lights, scenes and node groups whose trees directly contain this group."""
+        self.ensure()
+        return [self.owners[uid] for uid in self.parents.get(g.session_uid, ())]
+
+    def user_count(self, g):
+        self.ensure()
+        return len(self.parents.get(g.session_uid, ()))
+
+
+tree_graph = TreeGraph()
+expanded_trees = set()  # uids of the trees whose nested groups are shown in the panels
+
+
+# Rough relative cost of compiling a node into a shader, 1 for every other node. Nested groups count in full each
+# time they're used.
+NODE_COSTS = {
+    "ShaderNodeTexImage": 4,
+    "ShaderNodeTexEnvironment": 4,
+    "ShaderNodeBsdfPrincipled": 4,
+    "ShaderNodeTexNoise": 3,
+    "ShaderNodeTexVoronoi": 3,
+    "ShaderNodeTexWave": 3,
+    "ShaderNodeTexMusgrave": 3,
+    "ShaderNodeBump": 2,
+}
+TEXTURE_NODES = {"ShaderNodeTexImage", "ShaderNodeTexEnvironment", "GeometryNodeImageTexture", "CompositorNodeImage"}
+TreeStats = namedtuple("TreeStats", "nodes links depth textures cost")
+TREE_STATS_SIZE = 2000  # Stats kept for tree signatures, including ones no tree has anymore
+
+
+class TreeCosts:
+    """Node, link and texture counts, nesting depth and an estimated compile cost of every tree, nested groups
+    included.
+
+    Each tree's own structure is read into a signature when it changes, and the stats are kept per signature of the
+    tree and its nested groups, so a tree whose structure didn't change (or that is a copy of another one) isn't
+    worked out again."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.own = {}  # owner uid -> (structure, nodes, links, textures, cost, {group uid: (group, uses)})
+        self.combined = {}  # owner uid -> (signature including the nested groups, TreeStats)
+        self.by_signature = OrderedDict()  # signature including the nested groups -> TreeStats, least recent first
+        self.touched = None  # uids whose stats may have changed since the sort orders were updated, None for all
+
+    def handle_updates(self, depsgraph):
+        if self.combined:
+            tree_graph.ensure()  # For the trees using the ones that changed
+        owner_types = (bpy.types.Material, bpy.types.NodeTree, bpy.types.World, bpy.types.Scene)
+        for update in depsgraph.updates:
+            if isinstance(update.id, owner_types):
+                uid = update.id.original.session_uid
+                self.own.pop(uid, None)
+                # The totals of the trees using it change too
+                stack = [uid]
+                while stack:
+                    uid = stack.pop()
+                    if self.combined.pop(uid, None) is not None:
+                        if self.touched is not None:
+                            self.touched.add(uid)
+                        stack.extend(tree_graph.parents.get(uid, ()))
+
+    def scan(self, uid, tree):
+        idnames = []
+        groups = {}
+        nodes = textures = cost = 0  # Group nodes count as the nodes inside them
+        for node in tree.nodes:
+            idname = node.bl_idname
+            if node.type == "GROUP" and node.node_tree is not None:
+                g = node.node_tree
+                entry = groups.setdefault(g.session_uid, [g, 0])
+                entry[1] += 1
+                idnames.append((idname, g.session_uid))
+                continue
+            idnames.append(idname)
+            nodes += 1
+            cost += NODE_COSTS.get(idname, 1)
+            textures += idname in TEXTURE_NODES
+        links = len(tree.links)
+        own = self.own[uid] = ((tuple(idnames), links), nodes, links, textures, cost, groups)
+        return own
+
+    def get(self, owner, visiting=frozenset()):
+        """Return the TreeStats of a material, world, scene or node group, or None if it has no tree."""
+        uid = owner.session_uid
+        combined = self.combined.get(uid)
+        if combined is not None:
+            return combined[1]
+        tree = tree_of(owner)
+        if tree is None or uid in visiting:
+            return None
+
+        own = self.own.get(uid) or self.scan(uid, tree)
+        structure, nodes, links, textures, cost, groups = own
+        children = []
+        for group_uid, (g, uses) in groups.items():
+            child = self.get(g, visiting | {uid})
+            if child is not None:
+                children.append((self.combined[group_uid][0], child, uses))
+        key = (structure, tuple((child_key, uses) for child_key, _child, uses in children))
+        by_signature = self.by_signature
+        stats = by_signature.get(key)
+        if stats is None:
+            stats = by_signature[key] = TreeStats(
+                nodes + sum(child.nodes * uses for _key, child, uses in children),
+                links,
+                1 + max(child.depth for _key, child, _uses in children) if children else 0,
+                textures + sum(child.textures * uses for _key, child, uses in children),
+                cost + sum(child.cost * uses for _key, child, uses in children),
+            )
+            if len(by_signature) > TREE_STATS_SIZE:
+                by_signature.popitem(last=False)
+        else:
+            by_signature.move_to_end(key)
+        self.combined[uid] = (key, stats)
+        return stats
+
+
+tree_costs = TreeCosts()
+
+
+class IndexBuilder:
+    """Fills the usage index and the tree graph a slice at a time from a timer after a file is loaded, so that
+    opening a big file doesn't block the UI. Until it's done, the panels list what has been indexed so far."""
+
+    def __init__(self):
+        self.pending = deque()
+        self.total = 0
+        self.key = None  # tree_graph key when the build started, trees added later are found by tree_graph.ensure
+
+    @property
+    def running(self):
+        return bool(self.pending)
+
+    def progress(self):
+        return 1 - len(self.pending) / self.total if self.total else 1
+
+    def start(self, objects=None, owners=None):
+        """Index every object and tree, or only the given ones on top of what is already indexed."""
+        if objects is None:
+            usage_index.begin_build()
+            tree_graph.clear()
+            objects = bpy.data.objects
+            owners = (owner for collection in tree_graph.owner_collections() for owner in collection)
+        else:
+            usage_index.building = True
+        tree_graph.building = True
+        self.key = tuple(len(collection) for collection in tree_graph.owner_collections())
+        self.pending = deque(objects)
+        self.pending.extend(owners)
+        self.total = len(self.pending)
+        if not self.pending:
+            self.finish()
+        elif not bpy.app.timers.is_registered(index_build_tick):
+            bpy.app.timers.register(index_build_tick, first_interval=0)
+
+    def finish(self):
+        usage_index.building = False
+        tree_graph.building = False
+        tree_graph.key = self.key
+
+    def tick(self, budget):
+        """Index items until budget seconds have passed. Returns True when everything has been indexed."""
+        deadline = time.perf_counter() + budget
+        pending = self.pending
+        while pending:
+            for _i in range(min(50, len(pending))):
+                item = pending.popleft()
+                try:
+                    if isinstance(item, bpy.types.Object):
+                        usage_index.update_object(item)
+                    else:
+                        tree_graph.scan(item)
+                except ReferenceError:  # Removed since the build started
+                    pass
+            if time.perf_counter() > deadline:
+                break
+        if pending:
+            return False
+        self.finish()
+        return True
+
+
+index_builder = IndexBuilder()
+
+
+def index_build_tick():
+    if not index_builder.running:
+        return None
+    prefs = get_prefs(bpy.context)
+    budget = prefs.build_budget if prefs else 10
+    done = index_builder.tick(budget / 1000)
+    tag_node_editors_redraw()
+    return None if done else 0.01
+
+
+#####################################################################
+# Saved Index
+#####################################################################
+
+
+INDEX_TEXT = ".matalogue_index"
+TRUSTED_SAVES_FILE = "trusted_saves.json"
+TRUSTED_SAVES_SIZE = 100
+INDEX_VERSION = 2
+OWNER_KINDS = ("MA", "NT", "WO", "LA", "SC")  # matches the order of TreeGraph.owner_collections
+
+
+def id_key(id_data):
+    """A name for a datablock that stays the same when the file is saved and opened again."""
+    if id_data.library is None:
+        return id_data.name
+    return "%s|%s" % (id_data.name, id_data.library.filepath)
+
+
+def user_file_path(name):
+    """Path of a file in the add-on's user folder, or None when installed as a legacy add-on, which has none."""
+    try:
+        folder = bpy.utils.extension_path_user(__package__, create=True)
+    except ValueError:
+        return None
+    return os.path.join(folder, name)
+
+
+def file_identity(filepath):
+    """Key, modification time and size of a saved file, or None if it can't be read."""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return [os.path.normcase(os.path.abspath(filepath)), stat.st_mtime_ns, stat.st_size]
+
+
+saved_token = [None]  # token written to the index by the last save_pre, confirmed by save_post
+
+
+def read_trusted_saves():
+    path = user_file_path(TRUSTED_SAVES_FILE)
+    if path is None:
+        return None, {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            saves = json.load(f)
+    except (OSError, ValueError):
+        saves = {}
+    return path, saves if isinstance(saves, dict) else {}
+
+
+def trust_saved_index():
+    """Remember the exact file that the last save_pre wrote its index to. Loading that same file then trusts the
+    index without checking every object and tree, while a file saved again in any other way (without the add-on, by
+    autosave or by another program) has a different modification time or size and is checked."""
+    token, saved_token[0] = saved_token[0], None
+    identity = file_identity(bpy.data.filepath)
+    path, saves = read_trusted_saves()
+    if token is None or identity is None or path is None:
+        return
+    key = identity[0]
+    saves.pop(key, None)
+    saves[key] = [token, *identity[1:]]
+    for old in list(saves)[:-TRUSTED_SAVES_SIZE]:
+        del saves[old]
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(saves, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print("WARNING [Matalogue]: Could not record the saved index: %s" % e)
+
+
+def is_trusted_save(token):
+    identity = file_identity(bpy.data.filepath)
+    if token is None or identity is None:
+        return False
+    _path, saves = read_trusted_saves()
+    return saves.get(identity[0]) == [token, *identity[1:]]
+
+
+def optional_key(id_data):
+    return id_key(id_data) if id_data is not None else ""
+
+
+def object_fingerprint(obj):
+    """What the object's index entry depends on: its data, the material in each slot and the group of each
+    Geometry Nodes modifier."""
+    return [
+        obj.type,
+        optional_key(obj.data),
+        [optional_key(slot.material) for slot in obj.material_slots],
+        [optional_key(mod.node_group) if mod.type == "NODES" else "" for mod in obj.modifiers],
+    ]
+
+
+def tree_fingerprint(owner):
+    """What the tree's entry depends on: its node and link counts and the group used by each group node."""
+    tree = tree_of(owner)
+    if tree is None:
+        return None
+    groups = [optional_key(node.node_tree) for node in tree.nodes if node.type == "GROUP"]
+    return [len(tree.nodes), len(tree.links), groups]
+
+
+def save_index():
+    """Store the usage index and tree graph in a hidden text in the file, so they don't have to be rebuilt when
+    the file is opened again. Entries are keyed by name and stamped with a fingerprint of the datablock."""
+    data = bpy.data
+    if index_builder.running:
+        index_builder.tick(float("inf"))
+    usage_index.ensure()
+    tree_graph.ensure()
+
+    keys = {}
+    for collection in (data.materials, data.node_groups):
+        for id_data in collection:
+            keys[id_data.session_uid] = id_key(id_data)
+
+    objects = {}
+    for uid, obj in usage_index.objects.items():
+        try:
+            materials = {keys[m]: usage_index.material_users[m][uid] for m in usage_index.object_materials[uid]}
+            groups = {keys[g]: usage_index.group_users[g][uid] for g in usage_index.object_groups[uid]}
+        except KeyError:  # Uses a datablock that was removed, leave it to be indexed again
+            continue
+        objects[id_key(obj)] = [object_fingerprint(obj), materials, groups]
+
+    trees = {}
+    for kind, collection in zip(OWNER_KINDS, tree_graph.owner_collections()):
+        for owner in collection:
+            children = tree_graph.children.get(owner.session_uid, {})
+            trees["%s:%s" % (kind, id_key(owner))] = [tree_fingerprint(owner), [id_key(g) for g in children.values()]]
+
+    text = data.texts.get(INDEX_TEXT)
+    if text is None:
+        text = data.texts.new(INDEX_TEXT)
+    saved_token[0] = os.urandom(8).hex()
+    saved = {
+        "version": INDEX_VERSION,
+        "token": saved_token[0],
+        "objects": objects,
+        "trees": trees,
+    }
+    text.from_string(json.dumps(saved, separators=(",", ":")))
+
+
+def remove_saved_index():
+    text = bpy.data.texts.get(INDEX_TEXT)
+    if text is not None:
+        bpy.data.texts.remove(text)
+
+
+def load_index():
+    """Restore the indexes from the text stored by save_index. Entries whose datablock changed since then, and
+    linked datablocks which can change without this file being saved, are indexed again in the background.
+    Returns False if there is no usable saved index.
+
+    Entries are checked against their fingerprints, unless the file is exactly the one written by the save that
+    stored the index (see trust_saved_index), as it may have been changed and saved again without the add-on."""
+    data = bpy.data
+    text = data.texts.get(INDEX_TEXT)
+    if text is None:
+        return False
+    try:
+        saved = json.loads(text.as_string())
+    except ValueError:
+        return False
+    if not isinstance(saved, dict) or saved.get("version") != INDEX_VERSION:
+        return False
+
+    uids = {}
+    for collection in (data.materials, data.node_groups):
+        for id_data in collection:
+            uids[id_key(id_data)] = id_data.session_uid
+
+    def resolve(entries):
+        resolved = {}
+        for key, value in entries.items():
+            uid = uids.get(key)
+            if uid is None:
+                return None
+            resolved[uid] = value
+        return resolved
+
+    usage_index.begin_build()
+    trusted = is_trusted_save(saved.get("token"))
+    saved_objects = saved.get("objects", {})
+    stale_objects = []
+    for obj in data.objects:
+        entry = saved_objects.get(id_key(obj))
+        valid = entry is not None and obj.library is None and (trusted or entry[0] == object_fingerprint(obj))
+        materials = groups = None
+        if valid:
+            materials = resolve(entry[1])
+            groups = resolve(entry[2])
+        if materials is None or groups is None:
+            stale_objects.append(obj)
+            continue
+        obj_data = obj.data
+        data_uid = obj_data.session_uid if obj_data is not None else None
+        usage_index.add_object(obj, entry[0][0], data_uid, materials, groups)
+
+    tree_graph.clear()
+    saved_trees = saved.get("trees", {})
+    stale_owners = []
+    groups_by_key = {id_key(g): g for g in data.node_groups}
+    for kind, collection in zip(OWNER_KINDS, tree_graph.owner_collections()):
+        for owner in collection:
+            entry = saved_trees.get("%s:%s" % (kind, id_key(owner)))
+            children = None
+            if entry is not None and owner.library is None and (trusted or entry[0] == tree_fingerprint(owner)):
+                children = {}
+                for key in entry[1]:
+                    g = groups_by_key.get(key)
+                    if g is None:
+                        children = None
+                        break
+                    children[g.session_uid] = g
+            if children is None:
+                stale_owners.append(owner)
+            else:
+                tree_graph.set_children(owner, children)
+
+    index_builder.start(stale_objects, stale_owners)
+    return True
+
+
+#####################################################################
+# Cleanup
+#####################################################################
+
+
+class UnusedTrees:
+    """Materials, worlds and node groups that can't be reached from any scene.
+
+    Reachability is worked out in one pass over the users of every tree, object, collection and particle settings
+    (bpy.data.user_map), walking from the scenes through collection and particle instances and the objects and
+    collections Geometry Nodes trees point to. A tree that is only used by other unreachable trees, by objects that
+    can't be reached from any scene or by orphan data counts as unused too, unlike the orphan icons in the panels
+    which only show trees with no users at all."""
+
+    KINDS = (
+        ("MATERIAL", "Materials"),
+        ("WORLD", "Worlds"),
+        ("SHADER", "Shader Groups"),
+        ("GEOMETRY", "Geometry Node Groups"),
+        ("COMPOSITING", "Compositor Groups"),
+    )
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.key = None
+        self.names = {}  # kind -> sorted names of the unused trees of that kind
+
+    @staticmethod
+    def data_key():
+        registry.ensure()
+        tree_graph.ensure()
+        data = bpy.data
+        return (registry.key, tree_graph.generation, len(data.objects), len(data.worlds), len(data.collections))
+
+    def is_current(self):
+        return self.key is not None and self.key == self.data_key()
+
+    def count(self):
+        return sum(len(names) for names in self.names.values())
+
+    def analyze(self):
+        """Return the unreachable trees, and remember their names for the Unused Trees panel."""
+        data = bpy.data
+        if index_builder.running:
+            index_builder.tick(float("inf"))
+        usage_index.ensure()
+
+        # The trees, and everything that can lead from a scene to one: objects (directly or through their data),
+        # collections, which may only be used as an instance by an object or a particle system, and particle settings
+        ids = {}  # uid -> datablock
+        for collection in (
+            data.materials,
+            data.worlds,
+            data.node_groups,
+            data.objects,
+            data.collections,
+            data.particles,
+        ):
+            for id_data in collection:
+                ids[id_data.session_uid] = id_data
+
+        reachable = set()
+        uses = {}  # uid -> uids of the datablocks it uses
+        for id_data, users in data.user_map(subset=list(ids.values())).items():
+            uid = id_data.session_uid
+            if (
+                id_data.library is not None
+                or id_data.use_fake_user
+                or id_data.asset_data is not None
+                or getattr(id_data, "is_tool", False)
+            ):
+                reachable.add(uid)
+            for user in users:
+                user_uid = user.session_uid
+                if user_uid in ids:
+                    uses.setdefault(user_uid, []).append(uid)
+                    continue
+                objects = usage_index.data_users.get(user_uid)
+                if objects is not None:  # Object data, used through the objects using it
+                    for obj_uid in objects:
+                        uses.setdefault(obj_uid, []).append(uid)
+                elif isinstance(user, bpy.types.Scene) or user.users > 0 or user.use_fake_user:
+                    reachable.add(uid)
+
+        stack = list(reachable)
+        while stack:
+            for uid in uses.get(stack.pop(), ()):
+                if uid not in reachable:
+                    reachable.add(uid)
+                    stack.append(uid)
+
+        tree_types = (bpy.types.Material, bpy.types.World, bpy.types.NodeTree)
+        unused = [id_data for uid, id_data in ids.items() if uid not in reachable and isinstance(id_data, tree_types)]
+        self.names = {}
+        for tree in unused:
+            if isinstance(tree, bpy.types.Material):
+                kind = "MATERIAL"
+            elif isinstance(tree, bpy.types.World):
+                kind = "WORLD"
+            else:
+                kind = tree.type
+            self.names.setdefault(kind, []).append(tree.name)
+        for names in self.names.values():
+            names.sort()
+        self.key = self.data_key()
+        return unused
+
+
+unused_trees = UnusedTrees()
+
+
+#####################################################################
+# Search
+#####################################################################
+
+
+class RecentTrees:
+    """The datablocks most recently visited through the goto operators."""
+
+    def __init__(self, size=200):
+        self.size = size
+        self.counter = 0
+        self.visits = {}  # uid -> visit counter, higher is more recent
+        self.touched = set()  # uids whose rank changed since the sort orders were updated
+
+    def visit(self, id_data):
+        self.counter += 1
+        self.visits.pop(id_data.session_uid, None)
+        self.visits[id_data.session_uid] = self.counter
+        self.touched.add(id_data.session_uid)
+        if len(self.visits) > self.size:
+            oldest = next(iter(self.visits))  # dicts keep insertion order, so this is the oldest
+            del self.visits[oldest]
+            self.touched.add(oldest)
+
+    def rank(self, uid):
+        return self.visits.get(uid, 0)
+
+
+recent_trees = RecentTrees()
+
+
+SEARCH_KINDS = {
+    "MATERIAL": "Material",
+    "LIGHT": "Light",
+    "WORLD": "World",
+    "SHADER": "Shader Group",
+    "GEOMETRY": "Geometry Nodes",
+    "COMPOSITING": "Compositor Group",
+    "SCENE": "Scene",
+}
+
+
+def trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Trigram and prefix index over the names of every tree that can be navigated to.
+
+    Synced incrementally before each search popup, so only added, removed or renamed datablocks are re-indexed."""
+
+    def __init__(self):
+        self.entries = {}  # uid -> (kind, name, lowercase name)
+        self.grams = {}  # trigram -> set of uids
+        self.prefixes = []  # sorted (lowercase name, uid)
+        self.prefixes_dirty = False
+        self.group_kinds = {}  # node group uid -> node group type
+        self.registry_key = None
+        self.labels = {}  # label shown in the popup -> uid
+
+    def add(self, uid, kind, name):
+        lower = name.lower()
+        self.entries[uid] = (kind, name, lower)
+        for gram in trigrams(lower):
+            self.grams.setdefault(gram, set()).add(uid)
+        self.prefixes_dirty = True
+
+    def remove(self, uid):
+        _kind, _name, lower = self.entries.pop(uid)
+        for gram in trigrams(lower):
+            uids = self.grams.get(gram)
+            if uids is not None:
+                uids.discard(uid)
+                if not uids:
+                    del self.grams[gram]
+        self.prefixes_dirty = True
+
+    def current_entries(self):
+        data = bpy.data
+        registry.ensure()
+        if self.registry_key != registry.key:
+            self.registry_key = registry.key
+            self.group_kinds = {}
+            for groups in (registry.shader_groups, registry.geometry_groups, registry.compositor_groups):
+                for g in groups:
+                    self.group_kinds[g.session_uid] = g.type
+
+        current = {}
+        for collection, kind in ((data.materials, "MATERIAL"), (data.worlds, "WORLD"), (data.scenes, "SCENE")):
+            uids = [0] * len(collection)
+            collection.foreach_get("session_uid", uids)
+            for uid, name in zip(uids, collection.keys()):
+                current[uid] = (kind, name)
+
+        uids = [0] * len(data.node_groups)
+        data.node_groups.foreach_get("session_uid", uids)
+        for uid, name in zip(uids, data.node_groups.keys()):
+            kind = self.group_kinds.get(uid)
+            if kind is not None:
+                current[uid] = (kind, name)
+
+        usage_index.ensure()
+        for uid, obj in usage_index.lights.items():
+            current[uid] = ("LIGHT", obj.name)
+        return current
+
+    def sync(self):
+        current = self.current_entries()
+        for uid in [uid for uid in self.entries if uid not in current]:
+            self.remove(uid)
+        for uid, (kind, name) in current.items():
+            entry = self.entries.get(uid)
+            if entry is not None and entry[0] == kind and entry[1] == name:
+                continue
+            if entry is not None:
+                self.remove(uid)
+            self.add(uid, kind, name)
+        self.ensure_prefixes()
+
+    def ensure_prefixes(self):
+        if self.prefixes_dirty:
+            self.prefixes = sorted((lower, uid) for uid, (_kind, _name, lower) in self.entries.items())
+            self.prefixes_dirty = False
+
+    def search(self, text, limit=50):
+        """Return the uids best matching text, most recently visited first."""
+        query = text.lower().strip()
+        if not query:
+            matches = [uid for uid in reversed(recent_trees.visits) if uid in self.entries]
+            return matches[:limit]
+
+        if len(query) < 3:
+            self.ensure_prefixes()
+            candidates = set()
+            i = bisect_left(self.prefixes, (query,))
+            while i < len(self.prefixes) and self.prefixes[i][0].startswith(query):
+                candidates.add(self.prefixes[i][1])
+                i += 1
+            candidates.update(uid for uid in recent_trees.visits if uid in self.entries)
+        else:
+            postings = sorted((self.grams.get(gram, set()) for gram in trigrams(query)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:]) if postings[0] else set()
+            if not candidates:
+                # Nothing contains the whole query, fall back to names that share most of its trigrams
+                counts = {}
+                for uids in postings:
+                    for uid in uids:
+                        counts[uid] = counts.get(uid, 0) + 1
+                needed = (len(postings) + 1) // 2
+                return nsmallest(
+                    limit,
+                    (uid for uid, count in counts.items() if count >= needed),
+                    key=lambda uid: (-counts[uid], -recent_trees.rank(uid), len(self.entries[uid][1])),
+                )
+
+        def sort_key(uid):
+            lower = self.entries[uid][2]
+            position = lower.find(query)
+            return (position < 0, -recent_trees.rank(uid), position != 0, position, len(lower), lower)
+
+        return nsmallest(limit, (uid for uid in candidates if query in self.entries[uid][2]), key=sort_key)
+
+    def results(self, text):
+        """Return the search results as unique (label, description) pairs for a search popup."""
+        self.labels = {}
+        results = []
+        for uid in self.search(text):
+            kind, name, _lower = self.entries[uid]
+            label = name
+            if label in self.labels:
+                label = "%s (%s)" % (name, SEARCH_KINDS[kind])
+            if label in self.labels:
+                label = "%s (%s %d)" % (name, SEARCH_KINDS[kind], uid)
+            self.labels[label] = uid
+            results.append((label, SEARCH_KINDS[kind]))
+        return results
+
+
+search_index = SearchIndex()
+
+
+#####################################################################
+# Sorting
+#####################################################################
+
+
+def sort_key_users(item):
+    if isinstance(item, bpy.types.Material):
+        count = len(usage_index.material_users.get(item.session_uid, ()))
+    else:
+        count = len(usage_index.group_users.get(item.session_uid, ())) + tree_graph.user_count(item)
+    return -count
+
+
+def sort_key_recent(item):
+    return -recent_trees.rank(item.session_uid)
+
+
+def sort_key_nodes(item):
+    tree = tree_of(item)
+    return -len(tree.nodes) if tree is not None else 0
+
+
+def sort_key_cost(item):
+    stats = tree_costs.get(item)
+    return -stats.cost if stats is not None else 0
+
+
+SORT_KEYS = {"USERS": sort_key_users, "RECENT": sort_key_recent, "NODES": sort_key_nodes, "COST": sort_key_cost}
+SORT_SOURCES = ((usage_index, "USERS"), (tree_graph, "USERS"), (recent_trees, "RECENT"), (tree_costs, "COST"))
+
+
+class SortCache:
+    """The sort key of every tree for one sort mode, and the trees in that order.
+
+    A key is only worked out again after its tree is marked stale, and the tree is then moved to its new place
+    instead of sorting the whole list again."""
+
+    def __init__(self, mode):
+        self.key = SORT_KEYS[mode]
+        self.clear()
+
+    def clear(self):
+        self.keys = {}  # uid -> (sort key, lowercase name)
+        self.order = []  # sorted (sort key, lowercase name, uid)
+        self.stale = set()
+
+    def place(self, uid, item):
+        old = self.keys.get(uid)
+        if old is not None:
+            del self.order[bisect_left(self.order, (*old, uid))]
+        key = self.keys[uid] = (self.key(item), item.name.lower())
+        insort(self.order, (*key, uid))
+
+    def remove(self, uids):
+        for uid in uids:
+            old = self.keys.pop(uid)
+            del self.order[bisect_left(self.order, (*old, uid))]
+
+    def sort(self, items):
+        by_uid = {item.session_uid: item for item in items}
+        for uid, item in by_uid.items():
+            if uid in self.stale or uid not in self.keys:
+                self.place(uid, item)
+        self.stale.difference_update(by_uid)
+        return [by_uid[uid] for _key, _name, uid in self.order if uid in by_uid]
+
+
+class TreeSorter:
+    """Sorts the lists of the panels, keeping a SortCache per sort mode that is updated as trees change."""
+
+    def __init__(self):
+        self.caches = {}  # sort mode -> SortCache
+        self.counts = None
+
+    def clear(self):
+        self.caches.clear()
+        self.counts = None
+
+    def touch(self, uids, mode=None):
+        for cache_mode, cache in self.caches.items():
+            if mode is None or cache_mode == mode:
+                cache.stale.update(uids)
+
+    def handle_updates(self, depsgraph):
+        for update in depsgraph.updates:
+            if isinstance(update.id, (bpy.types.Material, bpy.types.NodeTree)):
+                self.touch((update.id.original.session_uid,))
+
+    def collect_changes(self):
+        for source, mode in SORT_SOURCES:
+            if source.touched is None:
+                cache = self.caches.get(mode)
+                if cache is not None:
+                    cache.clear()
+            elif source.touched:
+                self.touch(source.touched, mode)
+            source.touched = set()
+
+        counts = (len(bpy.data.materials), len(bpy.data.node_groups))
+        if counts != self.counts:
+            # Forget the trees that were removed
+            self.counts = counts
+            live = {item.session_uid for item in (*registry.materials, *bpy.data.node_groups)}
+            for cache in self.caches.values():
+                cache.remove(cache.keys.keys() - live)
+
+    def sort(self, items, mode):
+        """Return the items in the order of this sort mode, most first. Names break ties."""
+        if mode == "NAME":
+            return items  # bpy.data is already sorted by name
+        usage_index.ensure()
+        registry.ensure()
+        cache = self.caches.get(mode)
+        if cache is None:
+            cache = self.caches[mode] = SortCache(mode)
+        self.collect_changes()
+        return cache.sort(items)
+
+
+tree_sorter = TreeSorter()
+
+
+#####################################################################
+# Previews
+#####################################################################
+
+
+def tag_node_editors_redraw():
+    wm = bpy.context.window_manager
+    if wm is None:
+        return
+    for window in wm.windows:
+        for area in window.screen.areas:
+            if area.type == "NODE_EDITOR":
+                area.tag_redraw()
+
+
+class PreviewScheduler:
+    """Hands out material preview icons a few at a time from a timer, instead of requesting a preview for every
+    listed material in the same redraw.
+
+    Materials that are drawn are queued (recently visited ones first) and get a plain icon until their turn comes.
+    This only limits how fast previews are generated: a preview belongs to its material and Blender keeps it until
+    the file is closed, so there is nothing to free here."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ready = {}  # uid -> icon id
+        self.queue = []  # heap of (priority, counter, uid)
+        self.queued = {}  # uid -> material
+        self.counter = 0
+
+    def icon(self, mat):
+        """Return the preview icon id for this material, or 0 if it isn't available yet."""
+        uid = mat.session_uid
+        icon_id = self.ready.get(uid)
+        if icon_id is not None:
+            return icon_id
+
+        if uid not in self.queued:
+            self.counter += 1
+            heappush(self.queue, (-recent_trees.rank(uid), self.counter, uid))
+            self.queued[uid] = mat
+            if not bpy.app.timers.is_registered(preview_tick):
+                bpy.app.timers.register(preview_tick, first_interval=0.05)
+        return 0
+
+    def tick(self, budget):
+        generated = 0
+        while self.queue and generated < budget:
+            _priority, _counter, uid = heappop(self.queue)
+            mat = self.queued.pop(uid, None)
+            if mat is None:
+                continue
+            try:
+                self.ready[uid] = mat.preview_ensure().icon_id
+            except ReferenceError:  # Removed since it was queued
+                continue
+            generated += 1
+        return generated
+
+
+preview_scheduler = PreviewScheduler()
+
+
+def preview_tick():
+    prefs = get_prefs(bpy.context)
+    budget = prefs.preview_budget if prefs else 4
+    if preview_scheduler.tick(budget):
+        tag_node_editors_redraw()
+    return 0.1 if preview_scheduler.queue else None
+
+
+def material_icon(layout, context, mat, num_items):
+    """Return the icon arguments for a material's operator button according to the preview policy."""
+    prefs = get_prefs(context)
+    policy = prefs.preview_policy if prefs else "ALWAYS"
+    if policy == "ALWAYS":
+        try:
+            return {"icon_value": layout.icon(mat)}
+        except RuntimeError:
+            print("WARNING [Mat Panel]: Could not get icon value for %s" % mat.name)
+            return {"icon_value": 1}
+    if policy == "LIMIT" and num_items > prefs.preview_limit:
+        return {"icon": "MATERIAL"}
+    icon_id = preview_scheduler.icon(mat)
+    return {"icon_value": icon_id} if icon_id else {"icon": "MATERIAL"}
+
+
+#####################################################################
+# Asset Libraries
+#####################################################################
+
+
+ASSET_INDEX_VERSION = 1
+ASSET_SOURCE = "matalogue_asset"  # custom property of appended assets: {"file": library file, "name": asset name}
+
+
+def asset_library_settings(context):
+    """(name, path, import method) of each asset library set up in the preferences, as entered there."""
+    return tuple(
+        (library.name, library.path, getattr(library, "import_method", "APPEND_REUSE"))
+        for library in context.preferences.filepaths.asset_libraries
+    )
+
+
+def same_file(a, b):
+    return os.path.normcase(os.path.normpath(bpy.path.abspath(a))) == os.path.normcase(os.path.normpath(b))
+
+
+class AssetCatalogue:
+    """Names of the materials and node groups marked as assets in the .blend files of the asset libraries, read
+    without linking anything and a few files at a time from a timer.
+
+    The names found in each file are saved to a JSON file in the add-on's user folder together with the file's
+    modification time and size, so only new and changed files are read again, also in later sessions."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.files = {}  # path -> (mtime, size, material names, node group names)
+        self.entries = []  # (library name, import method, [(kind, name, path)]) as drawn
+        self.settings = None  # asset_library_settings() at the last scan
+        self.libraries = []  # (name, folder, import method) of the libraries whose folder exists
+        # ("LIBRARY", name, path, import method), ("DIR", path) and ("FILE", path, (mtime, size)) left to look at
+        self.pending = deque()
+        self.seen = set()
+        self.loaded = False
+        self.dirty = False
+
+    @property
+    def running(self):
+        return bool(self.pending)
+
+    def files_left(self):
+        return sum(1 for item in self.pending if item[0] == "FILE")
+
+    def load(self):
+        self.loaded = True
+        path = user_file_path("asset_names.json")
+        if path is None:
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        try:
+            if saved.get("version") != ASSET_INDEX_VERSION:
+                return
+            files = {
+                filepath: (mtime, size, tuple(materials), tuple(node_groups))
+                for filepath, (mtime, size, materials, node_groups) in saved["files"].items()
+            }
+        except (AttributeError, KeyError, TypeError, ValueError):  # Not written by the add-on, the files are read again
+            return
+        self.files = files
+        self.update_entries()
+
+    def save(self):
+        self.dirty = False
+        path = user_file_path("asset_names.json")
+        if path is None:
+            return
+        data = {"version": ASSET_INDEX_VERSION, "files": self.files}
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print("WARNING [Matalogue]: Could not save the asset library names: %s" % e)
+
+    def ensure(self, context):
+        """Scan the asset libraries the first time they're needed, and again when they're changed in the preferences."""
+        if not self.loaded:
+            self.load()
+        settings = asset_library_settings(context)
+        if settings != self.settings:
+            self.start(settings)
+
+    def start(self, settings):
+        """Look at the library folders again from the timer, reading the files that changed."""
+        self.settings = settings
+        self.libraries = []
+        self.pending = deque(("LIBRARY", *library) for library in settings)
+        self.seen = set()
+        self.update_entries()
+        if not bpy.app.timers.is_registered(asset_scan_tick):
+            bpy.app.timers.register(asset_scan_tick, first_interval=0)
+
+    def scan_folder(self, folder):
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir():
+                    self.pending.append(("DIR", entry.path))
+                elif entry.name.endswith(".blend") and entry.is_file():
+                    stat = entry.stat()
+                    stamp = (stat.st_mtime, stat.st_size)
+                    self.seen.add(entry.path)
+                    cached = self.files.get(entry.path)
+                    if cached is None or cached[:2] != stamp:
+                        self.pending.append(("FILE", entry.path, stamp))
+            except OSError:  # Removed or unreadable since the folder was listed
+                continue
+
+    def add_library(self, name, path, method):
+        folder = os.path.normpath(bpy.path.abspath(path))
+        if os.path.isdir(folder):
+            self.libraries.append((name, folder, method))
+            self.pending.append(("DIR", folder))
+
+    def read_file(self, path, stamp):
+        try:
+            with bpy.data.libraries.load(path, link=True, assets_only=True) as (data_from, data_to):
+                materials = tuple(data_from.materials)
+                node_groups = tuple(data_from.node_groups)
+        except Exception as e:  # Not a valid .blend file, it's kept with no assets until it changes
+            print("WARNING [Matalogue]: Could not read the assets in %s: %s" % (path, e))
+            materials = node_groups = ()
+        self.files[path] = (*stamp, materials, node_groups)
+        self.dirty = True
+
+    def tick(self, budget):
+        """Look at folders and read files until budget seconds have passed. Returns True when everything is done."""
+        deadline = time.perf_counter() + budget
+        pending = self.pending
+        while pending:
+            item = pending.popleft()
+            if item[0] == "LIBRARY":
+                self.add_library(*item[1:])
+            elif item[0] == "DIR":
+                self.scan_folder(item[1])
+            else:
+                self.read_file(item[1], item[2])
+            if time.perf_counter() > deadline:
+                break
+        if pending:
+            self.update_entries()
+            return False
+
+        for path in [path for path in self.files if path not in self.seen]:
+            del self.files[path]
+            self.dirty = True
+        if self.dirty:
+            self.save()
+        self.update_entries()
+        return True
+
+    def update_entries(self):
+        self.entries = []
+        for name, folder, method in self.libraries:
+            prefix = os.path.join(folder, "")
+            items = []
+            for path, (_mtime, _size, materials, node_groups) in self.files.items():
+                if path.startswith(prefix):
+                    items.extend(("MATERIAL", mat, path) for mat in materials)
+                    items.extend(("NODE_GROUP", g, path) for g in node_groups)
+            items.sort(key=lambda item: (item[0], item[1].lower()))
+            self.entries.append((name, method, items))
+
+
+asset_catalogue = AssetCatalogue()
+
+
+def asset_scan_tick():
+    if not asset_catalogue.running:
+        return None
+    prefs = get_prefs(bpy.context)
+    budget = prefs.build_budget if prefs else 10
+    done = asset_catalogue.tick(budget / 1000)
+    tag_node_editors_redraw()
+    return None if done else 0.01
+
+
+def find_imported_asset(collection, path, name, link):
+    """Find an asset that was already linked or appended from this file, so that it's reused instead of loaded again.
+    Appended assets are recognized by the ASSET_SOURCE property set when they were imported, as
+    bpy.data.libraries.load doesn't keep a reference to the file they came from."""
+    for id_data in collection:
+        if link:
+            if id_data.library is not None and id_data.name == name and same_file(id_data.library.filepath, path):
+                return id_data
+        elif id_data.library is None:
+            source = id_data.get(ASSET_SOURCE)
+            if source is not None and source.get("name") == name and same_file(source.get("file", ""), path):
+                return id_data
+    return None
+
+
+#####################################################################
+# Profiling
+#####################################################################
+
+
+class Profiler:
+    """Rolling draw, poll and execute timings, recorded by the wrappers added in `instrument` while enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.window = 200
+        self.items = 0  # rows drawn and editor updates made, counted while a wrapped call runs
+        self.samples = {}  # (class name, method, variant) -> deque of (milliseconds, items)
+
+    def clear(self):
+        self.samples.clear()
+
+    def record(self, key, elapsed, items):
+        samples = self.samples.get(key)
+        if samples is None or samples.maxlen != self.window:
+            samples = self.samples[key] = deque(samples or (), maxlen=self.window)
+        samples.append((elapsed * 1000, items))
+
+    def stats(self):
+        result = []
+        for (name, method, variant), samples in self.samples.items():
+            times = sorted(ms for ms, _items in samples)
+            result.append(
+                {
+                    "class": name,
+                    "method": method,
+                    "variant": variant,
+                    "count": len(times),
+                    "p50_ms": percentile(times, 0.5),
+                    "p95_ms": percentile(times, 0.95),
+                    "max_ms": times[-1],
+                    "items": samples[-1][1],
+                    "samples": [list(sample) for sample in samples],
+                }
+            )
+        result.sort(key=lambda entry: -entry["p95_ms"])
+        return result
+
+
+profiler = Profiler()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return values[min(len(values) - 1, max(0, int(len(values) * fraction + 0.5) - 1))]
+
+
+def sync_profiler(prefs, context=None):
+    profiler.enabled = prefs.use_profiler
+    profiler.window = prefs.profiler_window
+    if not profiler.enabled:
+        profiler.clear()
+
+
+def profile_variant(cls, context):
+    """Describe the filters a panel is drawn with, so each combination is timed separately."""
+    settings = context.window_manager.MATALOGUE_Settings
+    variant = []
+    for prop in getattr(cls, "profile_filters", ()):
+        value = getattr(settings, prop)
+        if value is True:
+            variant.append(prop.split("_")[1])
+        elif isinstance(value, str) and value != "NAME":
+            variant.append(value.lower())  # Sort mode
+    if use_list_view(context):
+        variant.append("list")
+    return "+".join(variant) or "all"
+
+
+def profiled(function, method):
+    def wrapper(self, context, *args, **kwargs):
+        if not profiler.enabled:
+            return function(self, context, *args, **kwargs)
+        cls = self if isinstance(self, type) else type(self)
+        items = profiler.items
+        start = time.perf_counter()
+        try:
+            return function(self, context, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            variant = profile_variant(cls, context) if method == "draw" else ""
+            profiler.record((cls.__name__, method, variant), elapsed, profiler.items - items)
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    wrapper.profiled = function
+    return wrapper
+
+
+def instrument(cls):
+    """Wrap a panel's draw and poll or an operator's execute with the profiler. The wrappers only add a flag check
+    while profiling is disabled."""
+    if cls.__name__.startswith("MATALOGUE_PT_"):
+        methods = ("draw", "poll")
+    elif cls.__name__.startswith("MATALOGUE_OT_"):
+        methods = ("execute",)
+    else:
+        return
+    if getattr(cls, "profile_exclude", False):
+        return
+    for method in methods:
+        function = cls.__dict__.get(method)
+        if isinstance(function, classmethod):
+            if not hasattr(function.__func__, "profiled"):
+                setattr(cls, method, classmethod(profiled(function.__func__, method)))
+        elif function is not None and not hasattr(function, "profiled"):
+            setattr(cls, method, profiled(function, method))
+
+
+#####################################################################
+# Navigation
+#####################################################################
+
+
+def set_space_types(space, tree_type, shader_type=None):
+    """Switch the editor to this type of tree, only touching the properties that actually change.
+    Returns the number of editor updates this caused."""
+    updates = 0
+    if space.tree_type != tree_type:
+        space.tree_type = tree_type
+        updates += 1
+    if shader_type is not None and space.shader_type != shader_type:
+        space.shader_type = shader_type
+        updates += 1
+    return updates
+
+
+def leave_groups(space):
+    """Go back up to the top level tree by editing the editor's path directly, rather than calling
+    the node.tree_path_parent operator until it fails. Returns the number of path updates."""
+    path = space.path
+    updates = 0
+    while len(path) > 1:
+        path.pop()
+        updates += 1
+    return updates
+
+
+def enter_group(space, g):
+    """Show this group at the top of the editor's path. Returns the number of path updates."""
+    path = space.path
+    if len(path) > 0 and path[-1].node_tree == g:
+        return 0
+    updates = leave_groups(space)
+    path.append(g)
+    return updates + 1
+
+
+pinned_spaces = set()  # pointers of the editors pinned by View Only navigation
+
+
+def pin_tree(space, tree):
+    """Show a tree by pinning it in the editor, without touching the selection or the active object.
+    Returns the number of editor updates."""
+    updates = 0
+    if not space.pin:
+        space.pin = True
+        updates += 1
+    pinned_spaces.add(space.as_pointer())
+    path = space.path
+    if len(path) != 1 or path[0].node_tree != tree:
+        path.start(tree)
+        updates += 1
+    return updates
+
+
+def unpin(space):
+    """Release an editor pinned by View Only navigation, so that it follows the active object again."""
+    key = space.as_pointer()
+    if key not in pinned_spaces:
+        return 0
+    pinned_spaces.discard(key)
+    if space.pin:
+        space.pin = False
+        return 1
+    return 0
+
+
+def view_only(context):
+    return context.window_manager.MATALOGUE_Settings.view_only
+
+
+class NavigationHistory:
+    """Back/forward history of one Node Editor. Entries are (operator name, operator arguments)."""
+
+    def __init__(self, size=50):
+        self.size = size
+        self.back = []
+        self.forward = []
+
+    def record(self, entry):
+        if self.back and self.back[-1] == entry:
+            return
+        self.back.append(entry)
+        del self.back[: -self.size]
+        self.forward.clear()
+
+
+navigation_histories = {}  # space pointer -> NavigationHistory
+navigation_replaying = False  # True while going back or forward, so the jump isn't recorded again
+
+
+def get_navigation_history(space):
+    key = space.as_pointer()
+    history = navigation_histories.get(key)
+    if history is None:
+        history = navigation_histories[key] = NavigationHistory()
+    return history
+
+
+def finish_navigation(op, context, start, updates, arguments):
+    """Record a jump made by a goto operator in the editor's history and optionally report how long it took."""
+    if profiler.enabled:
+        profiler.items += updates
+    if not navigation_replaying:
+        get_navigation_history(context.space_data).record((op.bl_idname, arguments))
+
+    prefs = get_prefs(context)
+    if prefs and prefs.report_navigation_time:
+        elapsed = (time.perf_counter() - start) * 1000
+        op.report({"INFO"}, "%s: %.2f ms, %d editor update(s)" % (op.bl_label, elapsed, updates))
+
+
+def replay_navigation(op, entry):
+    global navigation_replaying
+    idname, arguments = entry
+    category, name = idname.split(".")
+    navigation_replaying = True
+    try:
+        getattr(getattr(bpy.ops, category), name)(**arguments)
+    except (RuntimeError, KeyError):
+        op.report({"WARNING"}, "Could not go back to this tree, it may have been removed or renamed")
+        return False
+    finally:
+        navigation_replaying = False
+    return True
+
+
 #####################################################################
 # Operators
 #####################################################################
@@ -136,36 +2309,50 @@ class MATALOGUE_OT_go_to_material(bpy.types.Operator):
     bl_label = "Go To Material"
 
     mat: bpy.props.StringProperty(default="")
+    uid: bpy.props.IntProperty(
+        default=0, options={"SKIP_SAVE"}, description="session_uid of the datablock, used instead of its name if set"
+    )
 
     def execute(self, context):
+        start = time.perf_counter()
+        space = context.space_data
+        updates = set_space_types(space, "ShaderNodeTree", "OBJECT")
+        mat = identity_map.get("materials", self.uid, self.mat)
+        recent_trees.visit(mat)
+
+        if view_only(context):
+            updates += pin_tree(space, mat.node_tree)
+            finish_navigation(self, context, start, updates, {"mat": self.mat, "uid": self.uid})
+            return {"FINISHED"}
+
         dummy_object(delete=True)
-        context.space_data.tree_type = "ShaderNodeTree"
-        context.space_data.shader_type = "OBJECT"
-        mat = bpy.data.materials[self.mat]
+        updates += unpin(space)
+        updates += leave_groups(space)
 
-        try:  # Go up one group as many times as possible - error will occur when the top level is reached
-            while True:
-                bpy.ops.node.tree_path_parent()
-        except RuntimeError:
-            pass
+        for obj in context.selected_objects:
+            obj.select_set(False)
 
         objs_with_mat = 0
         active_set = False
-        for obj in context.view_layer.objects:
-            obj_materials = [slot.material for slot in obj.material_slots]
-            if mat in obj_materials:
-                objs_with_mat += 1
+        for obj, slots in usage_index.users(mat):
+            try:
                 obj.select_set(True)
-                if not active_set:  # set first object as active
-                    active_set = True
+            except RuntimeError:  # Not in this view layer
+                continue
+            objs_with_mat += 1
+            if not active_set:  # set first object as active
+                active_set = True
+                context.view_layer.objects.active = obj
+                if mat != obj.active_material:
+                    obj.active_material_index = slots[0]
+
+        if objs_with_mat == 0 and context.window_manager.MATALOGUE_Settings.mat_evaluated:
+            # Select the objects instancing it instead, it can't be made the active material of those
+            for obj in evaluated_usage.objects(mat, context.evaluated_depsgraph_get()):
+                obj.select_set(True)
+                if objs_with_mat == 0:
                     context.view_layer.objects.active = obj
-                    if mat != obj.active_material:
-                        for i, x in enumerate(obj.material_slots):
-                            if x.material == mat:
-                                obj.active_material_index = i
-                                break
-            else:
-                obj.select_set(False)
+                objs_with_mat += 1
 
         if objs_with_mat == 0:
             self.report({"WARNING"}, "No objects in this scene use '" + mat.name + "' material")
@@ -173,6 +2360,7 @@ class MATALOGUE_OT_go_to_material(bpy.types.Operator):
             slot = dummy.material_slots[0]
             slot.material = mat
 
+        finish_navigation(self, context, start, updates, {"mat": self.mat, "uid": self.uid})
         return {"FINISHED"}
 
 
@@ -181,27 +2369,27 @@ class MATALOGUE_OT_go_to_group(bpy.types.Operator):
 
     bl_idname = "matalogue.goto_group"
     bl_label = "Go To Group"
-    first_run = True
 
     tree_type: bpy.props.StringProperty(default="")
     tree: bpy.props.StringProperty(default="")
+    uid: bpy.props.IntProperty(
+        default=0, options={"SKIP_SAVE"}, description="session_uid of the datablock, used instead of its name if set"
+    )
 
     def execute(self, context):
-        try:  # Go up one group as many times as possible - error will occur when the top level is reached
-            while True:
-                bpy.ops.node.tree_path_parent()
-        except RuntimeError:
-            pass
-
-        g = bpy.data.node_groups[self.tree]
-        context.space_data.tree_type = self.tree_type
-        context.space_data.path.append(g)
+        start = time.perf_counter()
+        g = identity_map.get("node_groups", self.uid, self.tree)
+        recent_trees.visit(g)
+        updates = set_space_types(context.space_data, self.tree_type)
+        if view_only(context):
+            updates += pin_tree(context.space_data, g)
+        else:
+            updates += unpin(context.space_data)
+            updates += enter_group(context.space_data, g)
 
-        current_tree = context.space_data.path[-1].node_tree if len(context.space_data.path) > 0 else None
-        if self.first_run and current_tree is not g:
-            # Sometimes we need to run this twice? Not sure why...
-            self.first_run = False
-            self.execute(context)
+        finish_navigation(
+            self, context, start, updates, {"tree_type": self.tree_type, "tree": self.tree, "uid": self.uid}
+        )
         return {"FINISHED"}
 
 
@@ -210,50 +2398,51 @@ class MATALOGUE_OT_go_to_geonodes(bpy.types.Operator):
 
     bl_idname = "matalogue.goto_geo"
     bl_label = "Go To Geo Nodes"
-    first_run = True
 
     tree: bpy.props.StringProperty(default="")
     is_tool: bpy.props.BoolProperty(default=False)
+    uid: bpy.props.IntProperty(
+        default=0, options={"SKIP_SAVE"}, description="session_uid of the datablock, used instead of its name if set"
+    )
 
     def execute(self, context):
-        try:  # Go up one group as many times as possible - error will occur when the top level is reached
-            while True:
-                bpy.ops.node.tree_path_parent()
-        except RuntimeError:
-            pass
-
-        g = bpy.data.node_groups[self.tree]
-        context.space_data.tree_type = "GeometryNodeTree"
+        start = time.perf_counter()
+        space = context.space_data
+        g = identity_map.get("node_groups", self.uid, self.tree)
+        recent_trees.visit(g)
+        updates = set_space_types(space, "GeometryNodeTree")
         if self.is_tool:
             set_geometry_nodes_type(context, "TOOL")
-            context.space_data.path.append(g)
+            updates += unpin(space)
+            updates += enter_group(space, g)
+        elif view_only(context):
+            set_geometry_nodes_type(context, "MODIFIER")
+            updates += pin_tree(space, g)
         else:
             set_geometry_nodes_type(context, "MODIFIER")
+            updates += unpin(space)
+            for obj in context.selected_objects:
+                obj.select_set(False)
             objs_with_modifier = 0
             active_set = False
-            for obj in context.view_layer.objects:
-                obj_groups = [mod.node_group for mod in obj.modifiers if mod.type == "NODES"]
-                if g in obj_groups:
-                    objs_with_modifier += 1
+            for obj, mod_names in usage_index.group_modifier_users(g):
+                try:
                     obj.select_set(True)
-                    if not active_set:  # set first object as active
-                        active_set = True
-                        context.view_layer.objects.active = obj
-                        for mod in obj.modifiers:
-                            if g == mod.node_group and not mod.is_active:
-                                mod.is_active = True
-                                break
-                else:
-                    obj.select_set(False)
+                except RuntimeError:  # Not in this view layer
+                    continue
+                objs_with_modifier += 1
+                if not active_set:  # set first object as active
+                    active_set = True
+                    context.view_layer.objects.active = obj
+                    mod = obj.modifiers.get(mod_names[0])
+                    if mod is not None and not mod.is_active:
+                        mod.is_active = True
             if objs_with_modifier == 0:
-                context.space_data.path.append(g)
-
-        current_tree = context.space_data.path[-1].node_tree if len(context.space_data.path) > 0 else None
-        if self.first_run and current_tree is not g:
-            # Sometimes we need to run this twice? Not sure why...
-            self.first_run = False
-            self.execute(context)
+                updates += enter_group(space, g)
+            else:
+                updates += leave_groups(space)
 
+        finish_navigation(self, context, start, updates, {"tree": self.tree, "is_tool": self.is_tool, "uid": self.uid})
         return {"FINISHED"}
 
 
@@ -265,17 +2454,42 @@ class MATALOGUE_OT_go_to_light(bpy.types.Operator):
 
     light: bpy.props.StringProperty(default="")
     world: bpy.props.BoolProperty(default=False)
+    world_name: bpy.props.StringProperty(
+        default="", description="World to show, if not the world of the current scene"
+    )
+    uid: bpy.props.IntProperty(
+        default=0, options={"SKIP_SAVE"}, description="session_uid of the datablock, used instead of its name if set"
+    )
 
     def execute(self, context):
-        dummy_object(delete=True)
-        context.space_data.tree_type = "ShaderNodeTree"
+        start = time.perf_counter()
+        space = context.space_data
         if self.world:
-            context.space_data.shader_type = "WORLD"
+            updates = set_space_types(space, "ShaderNodeTree", "WORLD")
+            if self.uid or self.world_name:
+                owner = identity_map.get("worlds", self.uid, self.world_name)
+            else:
+                owner = context.scene.world
         else:
-            context.space_data.shader_type = "OBJECT"
-            light = bpy.data.objects[self.light]
-            context.view_layer.objects.active = light
-
+            updates = set_space_types(space, "ShaderNodeTree", "OBJECT")
+            owner = identity_map.get("objects", self.uid, self.light)
+        if owner is not None:
+            recent_trees.visit(owner)
+
+        # The editor always follows the scene's world, so other worlds can only be shown pinned
+        other_world = self.world and owner is not None and owner != context.scene.world
+        if (view_only(context) or other_world) and owner is not None:
+            tree = owner.node_tree if self.world else owner.data.node_tree
+            updates += pin_tree(space, tree)
+        else:
+            dummy_object(delete=True)
+            updates += unpin(space)
+            if not self.world:
+                context.view_layer.objects.active = owner
+            updates += leave_groups(space)
+
+        arguments = {"light": self.light, "world": self.world, "world_name": self.world_name, "uid": self.uid}
+        finish_navigation(self, context, start, updates, arguments)
         return {"FINISHED"}
 
 
@@ -285,18 +2499,340 @@ class MATALOGUE_OT_go_to_comp(bpy.types.Operator):
     bl_idname = "matalogue.goto_comp"
     bl_label = "Go To Composite"
     scene: bpy.props.StringProperty(default="")
+    uid: bpy.props.IntProperty(
+        default=0, options={"SKIP_SAVE"}, description="session_uid of the datablock, used instead of its name if set"
+    )
 
     def execute(self, context):
-        context.space_data.tree_type = "CompositorNodeTree"
-        scene = bpy.data.scenes[self.scene]
-        context.window.scene = scene
+        start = time.perf_counter()
+        space = context.space_data
+        updates = set_space_types(space, "CompositorNodeTree")
+        scene = identity_map.get("scenes", self.uid, self.scene)
+        recent_trees.visit(scene)
+
+        if view_only(context):
+            # Switching the window to another scene would evaluate all of it, just to show its compositor
+            tree = get_compositor_node_group(scene)
+            if tree is None:
+                self.report({"WARNING"}, "'" + scene.name + "' has no compositing nodes")
+                return {"CANCELLED"}
+            updates += pin_tree(space, tree)
+            finish_navigation(self, context, start, updates, {"scene": self.scene, "uid": self.uid})
+            return {"FINISHED"}
+
+        updates += unpin(space)
+        if context.window.scene != scene:
+            context.window.scene = scene
+            updates += 1
+        updates += leave_groups(space)
+
+        finish_navigation(self, context, start, updates, {"scene": self.scene, "uid": self.uid})
+        return {"FINISHED"}
 
-        try:  # Go up one group as many times as possible - error will occur when the top level is reached
-            while True:
-                bpy.ops.node.tree_path_parent()
-        except RuntimeError:
-            pass
 
+class MATALOGUE_OT_navigate_back(bpy.types.Operator):
+    "Go back to the previously shown tree"
+
+    bl_idname = "matalogue.navigate_back"
+    bl_label = "Back"
+
+    @classmethod
+    def poll(cls, context):
+        space = context.space_data
+        if space is None or space.type != "NODE_EDITOR":
+            return False
+        return len(get_navigation_history(space).back) > 1
+
+    def execute(self, context):
+        history = get_navigation_history(context.space_data)
+        if not replay_navigation(self, history.back[-2]):
+            return {"CANCELLED"}
+        history.forward.append(history.back.pop())
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_navigate_forward(bpy.types.Operator):
+    "Go forward to the next tree in the history"
+
+    bl_idname = "matalogue.navigate_forward"
+    bl_label = "Forward"
+
+    @classmethod
+    def poll(cls, context):
+        space = context.space_data
+        if space is None or space.type != "NODE_EDITOR":
+            return False
+        return len(get_navigation_history(space).forward) > 0
+
+    def execute(self, context):
+        history = get_navigation_history(context.space_data)
+        if not replay_navigation(self, history.forward[-1]):
+            return {"CANCELLED"}
+        history.back.append(history.forward.pop())
+        return {"FINISHED"}
+
+
+def search_trees(self, context, edit_text):
+    return search_index.results(edit_text)
+
+
+class MATALOGUE_OT_search(bpy.types.Operator):
+    "Search all materials, lights, worlds, node groups and scenes"
+
+    bl_idname = "matalogue.search"
+    bl_label = "Search Trees"
+    bl_property = "query"
+
+    query: bpy.props.StringProperty(name="Search", search=search_trees, search_options=set())
+
+    @classmethod
+    def poll(cls, context):
+        return context.space_data is not None and context.space_data.type == "NODE_EDITOR"
+
+    def invoke(self, context, event):
+        search_index.sync()
+        self.query = ""
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        self.layout.activate_init = True
+        self.layout.prop(self, "query", text="", icon="VIEWZOOM")
+
+    def execute(self, context):
+        uid = search_index.labels.get(self.query)
+        if uid is None:
+            search_index.sync()
+            results = search_index.search(self.query, limit=1)
+            if not results:
+                self.report({"WARNING"}, "Nothing found for '%s'" % self.query)
+                return {"CANCELLED"}
+            uid = results[0]
+
+        kind, name, _lower = search_index.entries[uid]
+        if kind == "MATERIAL":
+            bpy.ops.matalogue.goto_mat(mat=name, uid=uid)
+        elif kind == "LIGHT":
+            bpy.ops.matalogue.goto_light(light=name, world=False, uid=uid)
+        elif kind == "WORLD":
+            bpy.ops.matalogue.goto_light(world=True, world_name=name, uid=uid)
+        elif kind == "GEOMETRY":
+            is_tool = identity_map.get("node_groups", uid, name).is_tool
+            bpy.ops.matalogue.goto_geo(tree=name, is_tool=is_tool, uid=uid)
+        elif kind == "SCENE":
+            bpy.ops.matalogue.goto_comp(scene=name, uid=uid)
+        else:
+            tree_type = "ShaderNodeTree" if kind == "SHADER" else "CompositorNodeTree"
+            bpy.ops.matalogue.goto_group(tree_type=tree_type, tree=name, uid=uid)
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_toggle_expanded(bpy.types.Operator):
+    "Show or hide the node groups used inside this tree"
+
+    bl_idname = "matalogue.toggle_expanded"
+    bl_label = "Toggle Nested Groups"
+    bl_options = {"INTERNAL"}
+
+    uid: bpy.props.IntProperty()
+
+    def execute(self, context):
+        expanded_trees.symmetric_difference_update({self.uid})
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_merge_materials(bpy.types.Operator):
+    "Replace the numbered copies of this material (e.g. Metal.001, Metal.002) with it in every material slot"
+
+    bl_idname = "matalogue.merge_materials"
+    bl_label = "Merge Duplicate Materials"
+    bl_options = {"REGISTER", "UNDO"}
+
+    mat: bpy.props.StringProperty(default="")
+    source: bpy.props.StringProperty(
+        default="", description="Only replace this material, instead of all numbered copies of the target"
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        target = bpy.data.materials.get(self.mat)
+        if target is None:
+            self.report({"ERROR"}, "Material '%s' not found" % self.mat)
+            return {"CANCELLED"}
+
+        if self.source:
+            names = [self.source]
+        else:
+            registry.ensure()
+            names = registry.material_duplicates.get(base_name(target.name), ())
+        sources = [bpy.data.materials.get(name) for name in names if name != target.name]
+        sources = [mat for mat in sources if mat is not None]
+        if not sources:
+            self.report({"INFO"}, "'%s' has no duplicates to merge" % target.name)
+            return {"CANCELLED"}
+
+        changed, skipped = usage_index.remap_materials(sources, target)
+        message = "Replaced %d material(s) with '%s' in %d slot(s)" % (len(sources), target.name, changed)
+        if skipped:
+            message += ", %d linked slot(s) left unchanged" % skipped
+        self.report({"INFO"}, message)
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_find_unused_trees(bpy.types.Operator):
+    "Find the materials, worlds and node groups that no scene uses, directly or through other trees"
+
+    bl_idname = "matalogue.find_unused_trees"
+    bl_label = "Find Unused Trees"
+
+    def execute(self, context):
+        unused = unused_trees.analyze()
+        self.report({"INFO"}, "Found %d unused tree(s)" % len(unused))
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_purge_unused_trees(bpy.types.Operator):
+    "Delete the materials, worlds and node groups that no scene uses, keeping fake users, assets and linked data"
+
+    bl_idname = "matalogue.purge_unused_trees"
+    bl_label = "Purge Unused Trees"
+    bl_options = {"REGISTER", "UNDO"}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        unused = unused_trees.analyze()
+        if not unused:
+            self.report({"INFO"}, "No unused trees")
+            return {"CANCELLED"}
+        bpy.data.batch_remove(unused)
+        # Drop everything that may still hold the removed trees or their uids
+        unused_trees.clear()
+        registry.bump()
+        tree_graph.clear()
+        tree_costs.clear()
+        tree_sorter.clear()
+        identity_map.clear()
+        preview_scheduler.clear()
+        self.report({"INFO"}, "Deleted %d unused tree(s)" % len(unused))
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_import_asset(bpy.types.Operator):
+    "Link or append this asset as set up for its asset library, then show its nodes"
+
+    bl_idname = "matalogue.import_asset"
+    bl_label = "Import Asset"
+    bl_options = {"REGISTER", "UNDO"}
+
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH")
+    kind: bpy.props.EnumProperty(items=[("MATERIAL", "Material", ""), ("NODE_GROUP", "Node Group", "")])
+    name: bpy.props.StringProperty(default="")
+    import_method: bpy.props.StringProperty(default="APPEND_REUSE")
+
+    def execute(self, context):
+        collection_name = "materials" if self.kind == "MATERIAL" else "node_groups"
+        collection = getattr(bpy.data, collection_name)
+        link = self.import_method == "LINK"
+
+        id_data = None
+        if self.import_method != "APPEND":
+            id_data = find_imported_asset(collection, self.filepath, self.name, link)
+        if id_data is None:
+            try:
+                with bpy.data.libraries.load(self.filepath, link=link, assets_only=True) as (data_from, data_to):
+                    if self.name in getattr(data_from, collection_name):
+                        setattr(data_to, collection_name, [self.name])
+            except (OSError, RuntimeError, ValueError) as e:
+                self.report({"ERROR"}, "Could not read %s: %s" % (self.filepath, e))
+                return {"CANCELLED"}
+            loaded = getattr(data_to, collection_name)
+            id_data = loaded[0] if loaded else None
+            if id_data is None:
+                self.report({"WARNING"}, "'%s' is no longer in this file, refresh the asset libraries" % self.name)
+                return {"CANCELLED"}
+            if not link:
+                id_data[ASSET_SOURCE] = {"file": os.path.normpath(bpy.path.abspath(self.filepath)), "name": self.name}
+            registry.bump()
+
+        if self.kind == "MATERIAL":
+            bpy.ops.matalogue.goto_mat(mat=id_data.name, uid=id_data.session_uid)
+        elif id_data.bl_idname == "GeometryNodeTree":
+            bpy.ops.matalogue.goto_geo(tree=id_data.name, is_tool=id_data.is_tool, uid=id_data.session_uid)
+        elif id_data.bl_idname in {"ShaderNodeTree", "CompositorNodeTree"}:
+            bpy.ops.matalogue.goto_group(tree_type=id_data.bl_idname, tree=id_data.name, uid=id_data.session_uid)
+        else:
+            self.report({"INFO"}, "Imported '%s', it can't be shown in the Node Editor" % id_data.name)
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_refresh_asset_libraries(bpy.types.Operator):
+    "Look for new and changed .blend files in the asset libraries. Only the files that changed are read again"
+
+    bl_idname = "matalogue.refresh_asset_libraries"
+    bl_label = "Refresh"
+
+    def execute(self, context):
+        if not asset_catalogue.loaded:
+            asset_catalogue.load()
+        asset_catalogue.start(asset_library_settings(context))
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_profiler_save(bpy.types.Operator):
+    "Save the recorded panel and operator timings to a JSON file"
+
+    bl_idname = "matalogue.profiler_save"
+    bl_label = "Save Timings"
+    profile_exclude = True
+
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH")
+    filter_glob: bpy.props.StringProperty(default="*.json", options={"HIDDEN"})
+
+    @classmethod
+    def poll(cls, context):
+        return bool(profiler.samples)
+
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = "matalogue_timings.json"
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        data = {
+            "blender": bpy.app.version_string,
+            "file": bpy.data.filepath,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "counts": {
+                "objects": len(bpy.data.objects),
+                "materials": len(bpy.data.materials),
+                "node_groups": len(bpy.data.node_groups),
+                "scenes": len(bpy.data.scenes),
+            },
+            "entries": profiler.stats(),
+        }
+        try:
+            with open(bpy.path.abspath(self.filepath), "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+        except OSError as e:
+            self.report({"ERROR"}, "Could not save timings: %s" % e)
+            return {"CANCELLED"}
+        self.report({"INFO"}, "Saved %d timing entries to %s" % (len(data["entries"]), self.filepath))
+        return {"FINISHED"}
+
+
+class MATALOGUE_OT_profiler_clear(bpy.types.Operator):
+    "Forget all recorded timings"
+
+    bl_idname = "matalogue.profiler_clear"
+    bl_label = "Clear Timings"
+    profile_exclude = True
+
+    def execute(self, context):
+        profiler.clear()
         return {"FINISHED"}
 
 
@@ -305,73 +2841,296 @@ class MATALOGUE_OT_go_to_comp(bpy.types.Operator):
 #####################################################################
 
 
-def draw_shadernodes_panel(self, context, selected_only=False, visible_only=False):
-    def draw_item(context, col, mat, indent):
+def use_list_view(context):
+    prefs = get_prefs(context)
+    return prefs is not None and prefs.use_list_view
+
+
+def draw_build_status(layout):
+    """Show that the indexes are still being built after loading, so filters and nested groups may be incomplete."""
+    if index_builder.running:
+        row = layout.row()
+        row.enabled = False
+        row.label(text="Building index... %d%%" % (index_builder.progress() * 100), icon="SORTTIME")
+
+
+def draw_id_status(row, id_data):
+    if id_data.library:
+        row.label(text="", icon="LINKED")
+    elif id_data.use_fake_user:
+        row.label(text="", icon="FAKE_USER_ON")
+    elif not id_data.users:
+        row.alert = True
+        row.label(text="", icon="ORPHAN_DATA")
+
+
+def draw_merge_button(row, mat):
+    """Offer to merge the numbered copies of a material into it, on the row of the un-numbered original."""
+    duplicates = registry.material_duplicates.get(mat.name)
+    if duplicates is not None:
+        op = row.operator("matalogue.merge_materials", text="", icon="AUTOMERGE_ON", emboss=False)
+        op.mat = mat.name
+        op.source = ""
+
+
+def draw_expand_toggle(row, owner, active):
+    """Draw a toggle for the nested groups of this tree, if it has any. Active trees are always expanded."""
+    if active or not tree_graph.child_groups(owner):
+        return
+    expanded = owner.session_uid in expanded_trees
+    op = row.operator(
+        "matalogue.toggle_expanded",
+        text="",
+        emboss=False,
+        icon="DISCLOSURE_TRI_DOWN" if expanded else "DISCLOSURE_TRI_RIGHT",
+    )
+    op.uid = owner.session_uid
+
+
+def draw_group_users(row, context, g):
+    prefs = get_prefs(context)
+    if prefs and prefs.show_group_users:
+        count = tree_graph.user_count(g)
+        if count:
+            row.label(text=str(count))
+
+
+def draw_sort_header(layout, context, prop):
+    row = layout.row(align=True)
+    row.alignment = "RIGHT"
+    row.prop(context.window_manager.MATALOGUE_Settings, prop, text="", icon_only=True)
+    row.separator()
+
+
+def draw_tree_cost(row, context, owner):
+    prefs = get_prefs(context)
+    if prefs and prefs.show_tree_cost:
+        stats = tree_costs.get(owner)
+        if stats is not None:
+            heavy = stats.cost >= prefs.heavy_tree_cost
+            sub = row.row(align=True)
+            sub.alert = heavy
+            sub.label(text=str(stats.cost), icon="ERROR" if heavy else "BLANK1")
+
+
+def draw_face_count(row, context, mat):
+    prefs = get_prefs(context)
+    if prefs and prefs.show_face_counts:
+        count = face_counts.total(mat)
+        if count is not None:
+            row.label(text=str(count))
+
+
+def draw_child_groups(col, context, owner, tree_type, indent, visited=frozenset()):
+    """Draw every group nested inside this tree, recursively."""
+    visited = visited | {owner.session_uid}
+    for g in tree_graph.child_groups(owner):
+        if g.session_uid in visited:
+            continue
         row = get_row(col, context)
         for i in range(indent):
             row.label(text="", icon="BLANK1")
+        op = row.operator("matalogue.goto_group", text=g.name, emboss=False, icon="NODETREE")
+        op.tree_type = tree_type
+        op.tree = g.name
+        op.uid = g.session_uid
+        draw_child_groups(col, context, g, tree_type, indent + 1, visited)
 
-        try:
-            icon_val = layout.icon(mat)
-        except RuntimeError:
-            icon_val = 1
-            print("WARNING [Mat Panel]: Could not get icon value for %s" % mat.name)
+
+def filter_materials(context, selected_only=False, visible_only=False, evaluated=False, hide_empty=False, sort="NAME"):
+    registry.ensure()
+    if evaluated and (selected_only or visible_only):
+        usage, source = evaluated_usage, context.evaluated_depsgraph_get()
+    else:
+        usage, source = usage_index, context.view_layer
+    materials = []
+    for mat in registry.materials:
+        if selected_only and not usage.used_by_selected(mat, source):
+            continue
+        if visible_only and not usage.used_by_visible(mat, source):
+            continue
+        if hide_empty and face_counts.total(mat) == 0:
+            continue
+        materials.append(mat)
+    return tree_sorter.sort(materials, sort)
+
+
+def filter_geonodes(context, conditions, inverse=False, selected_only=False, visible_only=False, sort="NAME"):
+    view_layer = context.view_layer
+    geo_nodes = []
+    for g in registry.geometry_groups_where(conditions, inverse):
+        if selected_only and not usage_index.group_used_by_selected(g, view_layer):
+            continue
+        if visible_only and not usage_index.group_used_by_visible(g, view_layer):
+            continue
+        geo_nodes.append(g)
+    return tree_sorter.sort(geo_nodes, sort)
+
+
+list_filters = {}  # list_id -> filter arguments, set by the panel just before it draws the list
+list_shown = {}  # list_id -> number of items left after filtering, set by filter_items before the items are drawn
+
+
+class CatalogueList:
+    """Shared filtering for the List View lists, which are drawn over a whole bpy.data collection
+    and only show the items of one catalogue."""
+
+    def catalogue_items(self, context):
+        return []
+
+    def filter_items(self, context, data, propname):
+        items = getattr(data, propname)
+        helper = bpy.types.UI_UL_list
+        flag = self.bitflag_filter_item
+
+        shown = {item.session_uid: i for i, item in enumerate(self.catalogue_items(context))}
+        uids = [0] * len(items)
+        items.foreach_get("session_uid", uids)
+        flags = [flag if uid in shown else 0 for uid in uids]
+
+        if self.filter_name:
+            by_name = helper.filter_items_by_name(self.filter_name, flag, items, "name")
+            flags = [a & b for a, b in zip(flags, by_name)]
+        list_shown[self.list_id] = sum(1 for f in flags if f)
+
+        order = []
+        if self.use_filter_sort_alpha:
+            order = helper.sort_items_by_name(items, "name")
+        elif list_filters.get(self.list_id, ("NAME",))[-1] != "NAME":
+            # Items in the order of the sort mode, followed by the hidden ones
+            hidden = iter(range(len(shown), len(uids)))
+            order = [shown[uid] if uid in shown else next(hidden) for uid in uids]
+        return flags, order
+
+
+class MATALOGUE_UL_materials(CatalogueList, bpy.types.UIList):
+    def catalogue_items(self, context):
+        return filter_materials(context, *list_filters.get(self.list_id, ()))
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        mat = item
+        row = layout.row(align=True)
+        if profiler.enabled:
+            profiler.items += 1
+        active = (
+            mat == context.space_data.id
+            and len(context.space_data.path) > 0
+            and context.space_data.path[-1].node_tree == mat.node_tree
+        )
+        prefs = get_prefs(context)
+        if prefs is None or prefs.preview_policy == "ALWAYS":
+            icon_args = {"icon_value": icon}
+        else:
+            icon_args = material_icon(layout, context, mat, list_shown.get(self.list_id, len(data.materials)))
+        op = row.operator("matalogue.goto_mat", text=mat.name, emboss=active, **icon_args)
+        op.mat = mat.name
+        op.uid = mat.session_uid
+        draw_tree_cost(row, context, mat)
+        draw_face_count(row, context, mat)
+        draw_id_status(row, mat)
+        draw_merge_button(row, mat)
+
+
+class MATALOGUE_UL_node_groups(CatalogueList, bpy.types.UIList):
+    def catalogue_items(self, context):
+        if self.list_id not in list_filters:
+            return []
+        tree_type, conditions, inverse, selected_only, visible_only, sort = list_filters[self.list_id]
+        if tree_type == "GEOMETRY":
+            return filter_geonodes(context, conditions, inverse, selected_only, visible_only, sort)
+        registry.ensure()
+        return tree_sorter.sort(registry.shader_groups if tree_type == "SHADER" else registry.compositor_groups, sort)
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        g = item
+        row = layout.row(align=True)
+        if profiler.enabled:
+            profiler.items += 1
+        active = len(context.space_data.path) > 0 and context.space_data.path[-1].node_tree == g
+        if g.type == "GEOMETRY":
+            op = row.operator(
+                "matalogue.goto_geo",
+                text=g.name,
+                emboss=active,
+                icon=("TOOL_SETTINGS" if g.is_tool else "MODIFIER" if g.is_modifier else "NODETREE"),
+            )
+            op.tree = g.name
+            op.uid = g.session_uid
+            op.is_tool = g.is_tool
+            row.enabled = context.object is not None  # Avoid hard crashing Blender when there's no active object
+        else:
+            op = row.operator("matalogue.goto_group", text=g.name, emboss=active, icon="NODETREE")
+            op.tree_type = "ShaderNodeTree" if g.type == "SHADER" else "CompositorNodeTree"
+            op.tree = g.name
+            op.uid = g.session_uid
+        draw_tree_cost(row, context, g)
+        draw_id_status(row, g)
+
+
+def draw_group_list(
+    layout, context, tree_type, conditions=(), inverse=False, selected_only=False, visible_only=False, sort="NAME"
+):
+    list_id = "_".join((tree_type, *conditions, "inverse" if inverse else ""))
+    list_filters[list_id] = (tree_type, conditions, inverse, selected_only, visible_only, sort)
+    settings = context.window_manager.MATALOGUE_Settings
+    layout.template_list(
+        "MATALOGUE_UL_node_groups",
+        list_id,
+        bpy.data,
+        "node_groups",
+        settings,
+        "group_list_index",
+        rows=get_prefs(context).list_rows,
+    )
+
+
+def draw_shadernodes_panel(
+    self, context, selected_only=False, visible_only=False, evaluated=False, hide_empty=False, sort="NAME"
+):
+    def draw_item(context, col, mat, indent):
+        row = get_row(col, context)
+        for i in range(indent):
+            row.label(text="", icon="BLANK1")
 
         active = mat == context.space_data.id and context.space_data.path[-1].node_tree.name == mat.node_tree.name
         op = row.operator(
             "matalogue.goto_mat",
             text=mat.name,
             emboss=active,
-            icon_value=icon_val,
+            **material_icon(layout, context, mat, len(materials)),
         )
         op.mat = mat.name
-        if mat.library:
-            row.label(text="", icon="LINKED")
-        elif mat.use_fake_user:
-            row.label(text="", icon="FAKE_USER_ON")
-        elif not mat.users:
-            row.alert = True
-            row.label(text="", icon="ORPHAN_DATA")
+        op.uid = mat.session_uid
+        draw_tree_cost(row, context, mat)
+        draw_face_count(row, context, mat)
+        draw_id_status(row, mat)
+        draw_merge_button(row, mat)
+        draw_expand_toggle(row, mat, active)
 
         # Node trees in this tree:
-        if active:
-            already_drawn = []
-            for node in mat.node_tree.nodes:
-                if node.type == "GROUP" and node.node_tree.name not in already_drawn:
-                    row = get_row(col, context)
-                    row.label(text="", icon="BLANK1")
-                    op = row.operator("matalogue.goto_group", text=node.node_tree.name, emboss=False, icon="NODETREE")
-                    op.tree_type = "ShaderNodeTree"
-                    op.tree = node.node_tree.name
-                    already_drawn.append(node.node_tree.name)
-
-    def used_by_selected(mat):
-        for obj in context.selected_objects:
-            for slot in obj.material_slots:
-                if slot.material == mat:
-                    return True
-        return False
-
-    def used_by_visible(mat):
-        for obj in context.view_layer.objects:
-            if obj.visible_get():
-                for slot in obj.material_slots:
-                    if slot.material == mat:
-                        return True
-        return False
+        if active or mat.session_uid in expanded_trees:
+            draw_child_groups(col, context, mat, "ShaderNodeTree", indent + 1)
 
     layout = self.layout
+    draw_build_status(layout)
+
+    if use_list_view(context):
+        list_filters["materials"] = (selected_only, visible_only, evaluated, hide_empty, sort)
+        settings = context.window_manager.MATALOGUE_Settings
+        layout.template_list(
+            "MATALOGUE_UL_materials",
+            "materials",
+            bpy.data,
+            "materials",
+            settings,
+            "mat_list_index",
+            rows=get_prefs(context).list_rows,
+        )
+        return
 
     col = layout.column(align=True)
 
-    materials = []
-    for mat in bpy.data.materials:
-        if mat.use_nodes:
-            if selected_only and not used_by_selected(mat):
-                continue
-            if visible_only and not used_by_visible(mat):
-                continue
-            materials.append(mat)
+    materials = filter_materials(context, selected_only, visible_only, evaluated, hide_empty, sort)
 
     num_drawn = 0
     for mat in materials:
@@ -389,6 +3148,21 @@ def draw_shadernodes_panel(self, context, selected_only=False, visible_only=Fals
             row.label(text="None")
 
 
+class MATALOGUE_PT_search(bpy.types.Panel):
+    bl_label = "Search"
+    bl_space_type = "NODE_EDITOR"
+    bl_region_type = "UI"
+    bl_category = "Trees"
+    bl_options = {"HIDE_HEADER"}
+
+    def draw(self, context):
+        row = self.layout.row(align=True)
+        row.operator("matalogue.navigate_back", text="", icon="BACK")
+        row.operator("matalogue.navigate_forward", text="", icon="FORWARD")
+        row.operator("matalogue.search", text="Search Trees...", icon="VIEWZOOM")
+        row.prop(context.window_manager.MATALOGUE_Settings, "view_only", text="", icon="PINNED")
+
+
 class MATALOGUE_PT_shader(bpy.types.Panel):
     bl_label = "Shader"
     bl_space_type = "NODE_EDITOR"
@@ -417,11 +3191,24 @@ class MATALOGUE_PT_shader_materials(bpy.types.Panel):
         row.alignment = "RIGHT"
         row.prop(settings, "mat_selected_only", text="", icon="RESTRICT_SELECT_OFF")
         row.prop(settings, "mat_visible_only", text="", icon="RESTRICT_VIEW_OFF")
+        row.prop(settings, "mat_evaluated", text="", icon="MOD_INSTANCE")
+        row.prop(settings, "mat_hide_empty", text="", icon="FACESEL")
+        row.prop(settings, "mat_sort", text="", icon_only=True)
         row.separator()
 
+    profile_filters = ("mat_selected_only", "mat_visible_only", "mat_evaluated", "mat_hide_empty", "mat_sort")
+
     def draw(self, context):
         settings = context.window_manager.MATALOGUE_Settings
-        draw_shadernodes_panel(self, context, settings.mat_selected_only, settings.mat_visible_only)
+        draw_shadernodes_panel(
+            self,
+            context,
+            settings.mat_selected_only,
+            settings.mat_visible_only,
+            settings.mat_evaluated,
+            settings.mat_hide_empty,
+            settings.mat_sort,
+        )
 
 
 class MATALOGUE_PT_shader_lights(bpy.types.Panel):
@@ -439,44 +3226,60 @@ class MATALOGUE_PT_shader_lights(bpy.types.Panel):
         row.prop(settings, "light_visible_only", text="", icon="RESTRICT_VIEW_OFF")
         row.separator()
 
+    profile_filters = ("light_visible_only",)
+
     def draw(self, context):
         settings = context.window_manager.MATALOGUE_Settings
-        objects = context.visible_objects if settings.light_visible_only else context.view_layer.objects
-        lights = [obj for obj in objects if obj.type == "LIGHT"]
+        view_layer = context.view_layer
+        space = context.space_data
+        current_tree = space.path[-1].node_tree if len(space.path) > 0 else None
 
         layout = self.layout
+        draw_build_status(layout)
         col = layout.column(align=True)
 
-        for light in lights:
-            if light.data.use_nodes:
+        lights_by_type = usage_index.lights_by_type(view_layer)
+        for light_type in LIGHT_TYPES:
+            lights = lights_by_type.get(light_type, ())
+            if settings.light_visible_only:
+                lights = [light for light in lights if light.visible_get(view_layer=view_layer)]
+            lights = [light for light in lights if light.data.use_nodes]
+            if not lights:
+                continue
+            if len(lights_by_type) > 1:
+                col.label(text=light_type.title(), icon="LIGHT_%s" % light_type)
+            for light in lights:
                 row = get_row(col, context)
-                active = False
-                if light.data == context.space_data.id:
-                    if context.space_data.path[-1].node_tree.name == light.data.node_tree.name:
-                        active = True
+                active = light.data == space.id and current_tree == light.data.node_tree
                 op = row.operator(
                     "matalogue.goto_light",
                     text=light.name,
                     emboss=active,
-                    icon="LIGHT_%s" % light.data.type,
+                    icon="LIGHT_%s" % light_type,
                 )
                 op.light = light.name
+                op.uid = light.session_uid
                 op.world = False
 
-        if context.scene.world:
+        if len(bpy.data.worlds) > 0:
+            col.separator()
+        for world in bpy.data.worlds:
             row = get_row(col, context)
-            if context.scene.world.use_nodes:
-                active = False
-                if context.scene.world == context.space_data.id:
-                    if context.space_data.path[-1].node_tree.name == context.scene.world.node_tree.name:
-                        active = True
-                op = row.operator(
-                    "matalogue.goto_light",
-                    text="World",
-                    emboss=active,
-                    icon="WORLD",
-                )
-                op.world = True
+            if not world.use_nodes:
+                row.prop(world, "use_nodes", text=world.name, emboss=False, icon="ADD")
+                continue
+            is_scene_world = world == context.scene.world
+            active = current_tree is not None and current_tree == world.node_tree
+            op = row.operator(
+                "matalogue.goto_light",
+                text=world.name,
+                emboss=active,
+                icon="WORLD" if is_scene_world else "WORLD_DATA",
+            )
+            op.world = True
+            op.world_name = world.name
+            op.uid = world.session_uid
+            draw_id_status(row, world)
 
 
 class MATALOGUE_PT_shader_groups(bpy.types.Panel):
@@ -485,18 +3288,25 @@ class MATALOGUE_PT_shader_groups(bpy.types.Panel):
     bl_space_type = "NODE_EDITOR"
     bl_region_type = "UI"
     bl_category = "Trees"
+    bl_options = {"HEADER_LAYOUT_EXPAND"}
+
+    profile_filters = ("shader_group_sort",)
+
+    def draw_header(self, context):
+        draw_sort_header(self.layout, context, "shader_group_sort")
 
     def draw(self, context):
         layout = self.layout
+        settings = context.window_manager.MATALOGUE_Settings
 
         col = layout.column(align=True)
 
-        shader_groups = []
-        for g in bpy.data.node_groups:
-            if g.type == "SHADER":
-                shader_groups.append(g)
+        if use_list_view(context):
+            draw_group_list(layout, context, "SHADER", sort=settings.shader_group_sort)
+            return
 
-        for g in shader_groups:
+        registry.ensure()
+        for g in tree_sorter.sort(registry.shader_groups, settings.shader_group_sort):
             emboss = False
             row = get_row(col, context)
             if len(context.space_data.path) > 0:
@@ -504,17 +3314,19 @@ class MATALOGUE_PT_shader_groups(bpy.types.Panel):
             op = row.operator("matalogue.goto_group", text=g.name, emboss=emboss, icon="NODETREE")
             op.tree_type = "ShaderNodeTree"
             op.tree = g.name
-            if g.library:
-                row.label(text="", icon="LINKED")
-            elif g.use_fake_user:
-                row.label(text="", icon="FAKE_USER_ON")
-            elif not g.users:
-                row.alert = True
-                row.label(text="", icon="ORPHAN_DATA")
+            op.uid = g.session_uid
+            draw_tree_cost(row, context, g)
+            draw_id_status(row, g)
+            draw_group_users(row, context, g)
+            draw_expand_toggle(row, g, emboss)
+            if emboss or g.session_uid in expanded_trees:
+                draw_child_groups(col, context, g, "ShaderNodeTree", 1)
 
 
 def draw_geonodes_panel(self, context, conditions, inverse=False, selected_only=False, visible_only=False):
-    def draw_item(context, col, g, indent):
+    sort = getattr(context.window_manager.MATALOGUE_Settings, self.sort_property)
+
+    def draw_item(context, col, g, indent, expand=False, visited=frozenset()):
         active = False
         row = get_row(col, context)
         for i in range(indent):
@@ -528,52 +3340,32 @@ def draw_geonodes_panel(self, context, conditions, inverse=False, selected_only=
             icon=("TOOL_SETTINGS" if g.is_tool else "MODIFIER" if g.is_modifier else "NODETREE"),
         )
         op.tree = g.name
+        op.uid = g.session_uid
         op.is_tool = g.is_tool
         if not indent:
-            if g.library:
-                row.label(text="", icon="LINKED")
-            elif g.use_fake_user:
-                row.label(text="", icon="FAKE_USER_ON")
-            elif not g.users:
-                row.alert = True
-                row.label(text="", icon="ORPHAN_DATA")
+            draw_tree_cost(row, context, g)
+            draw_id_status(row, g)
+            draw_group_users(row, context, g)
+            draw_expand_toggle(row, g, active)
         row.enabled = context.object is not None  # Avoid hard crashing Blender when there's no active object
 
         # Node trees in this tree:
-        if active:
-            already_drawn = []
-            for node in g.nodes:
-                if node.type == "GROUP" and node.node_tree.name not in already_drawn:
-                    draw_item(context, col, node.node_tree, indent + 1)
-                    already_drawn.append(node.node_tree.name)
-
-    def used_by_selected(g):
-        for obj in context.selected_objects:
-            for mod in obj.modifiers:
-                if mod.type == "NODES" and mod.node_group == g:
-                    return True
-        return False
-
-    def used_by_visible(g):
-        for obj in context.view_layer.objects:
-            if obj.visible_get():
-                for mod in obj.modifiers:
-                    if mod.type == "NODES" and mod.node_group == g:
-                        return True
-        return False
+        if expand or active or (not indent and g.session_uid in expanded_trees):
+            visited = visited | {g.session_uid}
+            for child in tree_graph.child_groups(g):
+                if child.session_uid not in visited:
+                    draw_item(context, col, child, indent + 1, True, visited)
 
     layout = self.layout
+    draw_build_status(layout)
+
+    if use_list_view(context):
+        draw_group_list(layout, context, "GEOMETRY", conditions, inverse, selected_only, visible_only, sort)
+        return
 
     col = layout.column(align=True)
 
-    geo_nodes = []
-    for g in bpy.data.node_groups:
-        if g.type == "GEOMETRY" and any((getattr(g, c) is True for c in conditions)) != inverse:
-            if selected_only and not used_by_selected(g):
-                continue
-            if visible_only and not used_by_visible(g):
-                continue
-            geo_nodes.append(g)
+    geo_nodes = filter_geonodes(context, conditions, inverse, selected_only, visible_only, sort)
 
     num_drawn = 0
     for g in geo_nodes:
@@ -592,10 +3384,7 @@ def draw_geonodes_panel(self, context, conditions, inverse=False, selected_only=
 
 
 def poll_geonodes_panel(conditions, inverse=False):
-    for g in bpy.data.node_groups:
-        if g.type == "GEOMETRY" and any((getattr(g, c) is True for c in conditions)) != inverse:
-            return True
-    return False
+    return len(registry.geometry_groups_where(conditions, inverse)) > 0
 
 
 class MATALOGUE_PT_geonodes(bpy.types.Panel):
@@ -603,6 +3392,7 @@ class MATALOGUE_PT_geonodes(bpy.types.Panel):
     bl_space_type = "NODE_EDITOR"
     bl_region_type = "UI"
     bl_category = "Trees"
+    bl_options = {"HEADER_LAYOUT_EXPAND"}
 
     def draw_header(self, context):
         layout = self.layout
@@ -622,6 +3412,8 @@ class MATALOGUE_PT_geonodes_modifiers(bpy.types.Panel):
 
     conditions = ["is_modifier"]
     inverse = False
+    sort_property = "geo_modifier_sort"
+    profile_filters = ("geo_selected_only", "geo_visible_only", "geo_modifier_sort")
 
     def draw_header(self, context):
         settings = context.window_manager.MATALOGUE_Settings
@@ -629,6 +3421,7 @@ class MATALOGUE_PT_geonodes_modifiers(bpy.types.Panel):
         row.alignment = "RIGHT"
         row.prop(settings, "geo_selected_only", text="", icon="RESTRICT_SELECT_OFF")
         row.prop(settings, "geo_visible_only", text="", icon="RESTRICT_VIEW_OFF")
+        row.prop(settings, self.sort_property, text="", icon_only=True)
         row.separator()
 
     @classmethod
@@ -648,9 +3441,15 @@ class MATALOGUE_PT_geonodes_tools(bpy.types.Panel):
     bl_space_type = "NODE_EDITOR"
     bl_region_type = "UI"
     bl_category = "Trees"
+    bl_options = {"HEADER_LAYOUT_EXPAND"}
 
     conditions = ["is_tool"]
     inverse = False
+    sort_property = "geo_tool_sort"
+    profile_filters = ("geo_tool_sort",)
+
+    def draw_header(self, context):
+        draw_sort_header(self.layout, context, self.sort_property)
 
     @classmethod
     def poll(self, context):
@@ -666,9 +3465,15 @@ class MATALOGUE_PT_geonodes_groups(bpy.types.Panel):
     bl_space_type = "NODE_EDITOR"
     bl_region_type = "UI"
     bl_category = "Trees"
+    bl_options = {"HEADER_LAYOUT_EXPAND"}
 
     conditions = ["is_modifier", "is_tool"]
     inverse = True
+    sort_property = "geo_group_sort"
+    profile_filters = ("geo_group_sort",)
+
+    def draw_header(self, context):
+        draw_sort_header(self.layout, context, self.sort_property)
 
     @classmethod
     def poll(self, context):
@@ -704,33 +3509,28 @@ class MATALOGUE_PT_compositing_scenes(bpy.types.Panel):
 
         col = layout.column(align=True)
 
-        for sc in bpy.data.scenes:
+        # The compositor tree shown in this editor, which may be another scene's when pinned by View Only
+        path = context.space_data.path
+        shown = path[-1].node_tree if len(path) > 0 else None
+        if shown is not None and shown.bl_idname != "CompositorNodeTree":
+            shown = None
+
+        registry.ensure()
+        for sc in registry.scenes:
             name = sc.name
             row = get_row(col, context)
             if not sc.use_nodes:
                 row.prop(sc, "use_nodes", text=name, emboss=False, icon="ADD")
                 continue
-            active = False
-            if len(context.space_data.path) > 0:
-                active = (
-                    context.space_data.path[-1].node_tree.name == get_compositor_node_group(context.scene).name
-                    and sc == context.scene
-                )
+            active = shown is not None and get_compositor_node_group(sc) == shown
             op = row.operator("matalogue.goto_comp", text=name, emboss=active, icon="SCENE_DATA")
             op.scene = name
+            op.uid = sc.session_uid
+            draw_expand_toggle(row, sc, active)
 
             # Node trees in this tree:
-            if active and len(bpy.data.scenes) > 1:
-                already_drawn = []
-                for node in get_compositor_node_group(context.scene).nodes:
-                    if node.type == "GROUP" and node.node_tree.name not in already_drawn:
-                        g = node.node_tree
-                        row = col.row()
-                        row.label(text="", icon="BLANK1")
-                        op = row.operator("matalogue.goto_group", text=g.name, emboss=False, icon="NODETREE")
-                        op.tree_type = "CompositorNodeTree"
-                        op.tree = g.name
-                        already_drawn.append(g.name)
+            if (active and len(bpy.data.scenes) > 1) or sc.session_uid in expanded_trees:
+                draw_child_groups(col, context, sc, "CompositorNodeTree", 1)
 
 
 class MATALOGUE_PT_compositing_groups(bpy.types.Panel):
@@ -740,18 +3540,29 @@ class MATALOGUE_PT_compositing_groups(bpy.types.Panel):
     bl_region_type = "UI"
     bl_category = "Trees"
 
+    bl_options = {"HEADER_LAYOUT_EXPAND"}
+
+    profile_filters = ("comp_group_sort",)
+
     @classmethod
     def poll(self, context):
-        comp_groups = (g for g in bpy.data.node_groups if g.type == "COMPOSITING")
-        return len(list(comp_groups)) > 0
+        registry.ensure()
+        return len(registry.compositor_groups) > 0
+
+    def draw_header(self, context):
+        draw_sort_header(self.layout, context, "comp_group_sort")
 
     def draw(self, context):
         layout = self.layout
+        settings = context.window_manager.MATALOGUE_Settings
         col = layout.column(align=True)
 
-        comp_groups = (g for g in bpy.data.node_groups if g.type == "COMPOSITING")
+        if use_list_view(context):
+            draw_group_list(layout, context, "COMPOSITING", sort=settings.comp_group_sort)
+            return
 
-        for g in comp_groups:
+        registry.ensure()
+        for g in tree_sorter.sort(registry.compositor_groups, settings.comp_group_sort):
             emboss = False
             row = col.row(align=True)
             if len(context.space_data.path) > 0:
@@ -759,13 +3570,215 @@ class MATALOGUE_PT_compositing_groups(bpy.types.Panel):
             op = row.operator("matalogue.goto_group", text=g.name, emboss=emboss, icon="NODETREE")
             op.tree_type = "CompositorNodeTree"
             op.tree = g.name
-            if g.library:
-                row.label(text="", icon="LINKED")
-            elif g.use_fake_user:
-                row.label(text="", icon="FAKE_USER_ON")
-            elif not g.users:
-                row.alert = True
-                row.label(text="", icon="ORPHAN_DATA")
+            op.uid = g.session_uid
+            draw_tree_cost(row, context, g)
+            draw_id_status(row, g)
+            draw_group_users(row, context, g)
+            draw_expand_toggle(row, g, emboss)
+            if emboss or g.session_uid in expanded_trees:
+                draw_child_groups(col, context, g, "CompositorNodeTree", 1)
+
+
+class MATALOGUE_PT_unused(bpy.types.Panel):
+    bl_label = "Unused Trees"
+    bl_space_type = "NODE_EDITOR"
+    bl_region_type = "UI"
+    bl_category = "Trees"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw_header(self, context):
+        layout = self.layout
+        layout.label(text="", icon="ORPHAN_DATA")
+
+    def draw(self, context):
+        layout = self.layout
+        layout.operator("matalogue.find_unused_trees", icon="VIEWZOOM")
+        if unused_trees.key is None:
+            return
+        if not unused_trees.is_current():
+            row = layout.row()
+            row.enabled = False
+            row.label(text="The file changed since, search again")
+            return
+        if not unused_trees.count():
+            row = layout.row()
+            row.enabled = False
+            row.label(text="Every tree is used")
+            return
+
+        col = layout.column(align=True)
+        for kind, label in UnusedTrees.KINDS:
+            names = unused_trees.names.get(kind)
+            if not names:
+                continue
+            col.label(text="%s: %d" % (label, len(names)))
+            for name in names[:10]:
+                row = get_row(col, context)
+                row.enabled = False
+                row.label(text=name, icon="BLANK1")
+            if len(names) > 10:
+                row = get_row(col, context)
+                row.enabled = False
+                row.label(text="...and %d more" % (len(names) - 10), icon="BLANK1")
+
+        row = layout.row()
+        row.alert = True
+        row.operator("matalogue.purge_unused_trees", text="Delete %d Unused" % unused_trees.count(), icon="TRASH")
+
+
+class MATALOGUE_PT_asset_libraries(bpy.types.Panel):
+    bl_label = "Asset Libraries"
+    bl_space_type = "NODE_EDITOR"
+    bl_region_type = "UI"
+    bl_category = "Trees"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw_header(self, context):
+        layout = self.layout
+        layout.label(text="", icon="ASSET_MANAGER")
+
+    def draw(self, context):
+        layout = self.layout
+        asset_catalogue.ensure(context)
+        layout.operator("matalogue.refresh_asset_libraries", icon="FILE_REFRESH")
+        if asset_catalogue.running:
+            row = layout.row()
+            row.enabled = False
+            row.label(text="Reading asset libraries... %d file(s) left" % asset_catalogue.files_left(), icon="SORTTIME")
+        if not asset_catalogue.settings:
+            row = layout.row()
+            row.enabled = False
+            row.label(text="No asset libraries set up in the preferences")
+            return
+
+        col = layout.column(align=True)
+        for library, method, items in asset_catalogue.entries:
+            col.label(text=library, icon="ASSET_MANAGER")
+            if not items and not asset_catalogue.running:
+                row = get_row(col, context)
+                row.enabled = False
+                row.label(text="No material or node group assets", icon="BLANK1")
+            for kind, name, path in items:
+                row = get_row(col, context)
+                icon = "MATERIAL" if kind == "MATERIAL" else "NODETREE"
+                op = row.operator("matalogue.import_asset", text=name, emboss=False, icon=icon)
+                op.filepath = path
+                op.kind = kind
+                op.name = name
+                op.import_method = method
+
+
+class MATALOGUE_PT_profiler(bpy.types.Panel):
+    bl_label = "Profiler"
+    bl_space_type = "NODE_EDITOR"
+    bl_region_type = "UI"
+    bl_category = "Trees"
+    profile_exclude = True
+
+    @classmethod
+    def poll(cls, context):
+        return profiler.enabled
+
+    def draw(self, context):
+        layout = self.layout
+        row = layout.row(align=True)
+        row.operator("matalogue.profiler_save", icon="EXPORT")
+        row.operator("matalogue.profiler_clear", text="", icon="TRASH")
+
+        entries = profiler.stats()
+        if not entries:
+            layout.label(text="Nothing recorded yet")
+            return
+
+        col = layout.column(align=True)
+        for entry in [None] + entries:
+            split = col.split(factor=0.55)
+            if entry is None:
+                columns = ("Panel / Operator", "p50 ms", "p95 ms", "Items")
+            else:
+                name = entry["class"].replace("MATALOGUE_", "")
+                if entry["variant"]:
+                    name += " (%s)" % entry["variant"]
+                elif entry["method"] != "draw":
+                    name += " %s" % entry["method"]
+                columns = (name, "%.2f" % entry["p50_ms"], "%.2f" % entry["p95_ms"], str(entry["items"]))
+                split.alert = entry["p95_ms"] > 10
+            split.label(text=columns[0])
+            row = split.row()
+            for text in columns[1:]:
+                row.label(text=text)
+
+
+#####################################################################
+# Handlers
+#####################################################################
+
+
+@bpy.app.handlers.persistent
+def on_depsgraph_update(scene, depsgraph):
+    usage_index.handle_updates(depsgraph)
+    evaluated_usage.handle_updates(depsgraph)
+    face_counts.handle_updates(depsgraph)
+    tree_costs.handle_updates(depsgraph)
+    tree_sorter.handle_updates(depsgraph)
+    registry.handle_updates(depsgraph)
+    tree_graph.handle_updates(depsgraph)
+
+
+@bpy.app.handlers.persistent
+def on_save_pre(*args):
+    prefs = get_prefs(bpy.context)
+    if prefs is None or prefs.save_index:
+        save_index()
+    else:
+        remove_saved_index()
+
+
+@bpy.app.handlers.persistent
+def on_save_post(*args):
+    trust_saved_index()
+
+
+@bpy.app.handlers.persistent
+def on_load_post(*args):
+    if not load_index():
+        index_builder.start()
+    unused_trees.clear()
+    evaluated_usage.clear()
+    face_counts.clear()
+    tree_sorter.clear()
+    tree_costs.clear()
+    identity_map.clear()
+    dummy_handle[0] = None
+    pinned_spaces.clear()
+    navigation_histories.clear()  # Editors of the new file may get the pointers of freed ones
+    registry.bump()
+    preview_scheduler.clear()
+
+
+@bpy.app.handlers.persistent
+def on_undo_redo(*args):
+    # Undo reloads datablocks, so any references held by the indexes are no longer valid
+    index_builder.start()
+    unused_trees.clear()
+    evaluated_usage.clear()
+    face_counts.clear()
+    tree_sorter.clear()
+    tree_costs.clear()
+    identity_map.clear()
+    dummy_handle[0] = None
+    registry.bump()
+    preview_scheduler.clear()
+
+
+handlers = [
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update),
+    (bpy.app.handlers.save_pre, on_save_pre),
+    (bpy.app.handlers.save_post, on_save_post),
+    (bpy.app.handlers.load_post, on_load_post),
+    (bpy.app.handlers.undo_post, on_undo_redo),
+    (bpy.app.handlers.redo_post, on_undo_redo),
+]
 
 
 #####################################################################
@@ -781,6 +3794,20 @@ classes = [
     MATALOGUE_OT_go_to_geonodes,
     MATALOGUE_OT_go_to_light,
     MATALOGUE_OT_go_to_comp,
+    MATALOGUE_OT_navigate_back,
+    MATALOGUE_OT_navigate_forward,
+    MATALOGUE_OT_search,
+    MATALOGUE_OT_toggle_expanded,
+    MATALOGUE_OT_merge_materials,
+    MATALOGUE_OT_find_unused_trees,
+    MATALOGUE_OT_purge_unused_trees,
+    MATALOGUE_OT_import_asset,
+    MATALOGUE_OT_refresh_asset_libraries,
+    MATALOGUE_OT_profiler_save,
+    MATALOGUE_OT_profiler_clear,
+    MATALOGUE_UL_materials,
+    MATALOGUE_UL_node_groups,
+    MATALOGUE_PT_search,
     MATALOGUE_PT_shader,
     MATALOGUE_PT_shader_materials,
     MATALOGUE_PT_shader_lights,
@@ -792,6 +3819,9 @@ classes = [
     MATALOGUE_PT_compositing,
     MATALOGUE_PT_compositing_scenes,
     MATALOGUE_PT_compositing_groups,
+    MATALOGUE_PT_unused,
+    MATALOGUE_PT_asset_libraries,
+    MATALOGUE_PT_profiler,
 ]
 
 
@@ -799,12 +3829,39 @@ def register():
     from bpy.utils import register_class
 
     for cls in classes:
+        instrument(cls)
         register_class(cls)
 
     bpy.types.WindowManager.MATALOGUE_Settings = bpy.props.PointerProperty(type=MATALOGUE_Settings)
 
+    for handler_list, handler in handlers:
+        handler_list.append(handler)
+
+    prefs = get_prefs(bpy.context)
+    if prefs:
+        sync_profiler(prefs)
+
 
 def unregister():
+    for handler_list, handler in handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
+    usage_index.clear()
+    evaluated_usage.clear()
+    face_counts.clear()
+    tree_sorter.clear()
+    tree_costs.clear()
+    tree_graph.clear()
+    identity_map.clear()
+    navigation_histories.clear()
+    profiler.clear()
+    preview_scheduler.clear()
+    index_builder.pending.clear()
+    asset_catalogue.clear()
+    for timer in (preview_tick, index_build_tick, asset_scan_tick):
+        if bpy.app.timers.is_registered(timer):
+            bpy.app.timers.unregister(timer)
+
     del bpy.types.WindowManager.MATALOGUE_Settings
 
     from bpy.utils import unregister_class
@@ -0,0 +1,113 @@
+"""Load Matalogue against the fake bpy and collect benchmark results.
+
+Run from the repository root with `python -m pytest benchmarks`. Results are written as JSON to the path given with
+--bench-json (default: benchmarks/results.json) so scaling curves can be compared between versions."""
+
+import importlib.util
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS = Path(__file__).resolve().parent
+ROOT = BENCHMARKS.parent
+sys.path.insert(0, str(BENCHMARKS))
+
+import fake_bpy  # noqa: E402
+from scene_gen import SceneSpec, generate  # noqa: E402
+
+bpy = fake_bpy.install()
+
+SPECS = [
+    SceneSpec(objects=200, materials=50, geo_groups=10, scenes=2),
+    SceneSpec(objects=2000, materials=300, geo_groups=50, scenes=5),
+    SceneSpec(objects=10000, materials=1000, slots=3, geo_groups=200, scenes=10),
+]
+
+
+def load_addon():
+    spec = importlib.util.spec_from_file_location("matalogue", ROOT / "__init__.py", submodule_search_locations=[])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["matalogue"] = module
+    spec.loader.exec_module(module)
+    module.register()
+    bpy.context.preferences.addons["matalogue"] = fake_bpy.Addon("matalogue", module.MATALOGUE_Preferences())
+    return module
+
+
+addon = load_addon()
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-json", default=str(BENCHMARKS / "results.json"), help="Where to write the results")
+    parser.addoption("--bench-repeat", type=int, default=5, help="Timed repetitions of each warm measurement")
+
+
+class Bench:
+    """Times a callable cold (first call after the file is loaded) and warm (median of repeated calls),
+    counting RNA accesses and layout items along the way."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, fn):
+        fake_bpy.rna_accesses.value = 0
+        fake_bpy.UILayout.items = 0
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        return elapsed, fake_bpy.rna_accesses.value, fake_bpy.UILayout.items
+
+    def measure(self, name, spec, fn, variant="", cold=True):
+        record = {"name": name, "variant": variant, "scene": spec.label, "spec": vars(spec).copy()}
+        if cold:
+            record["cold_s"], record["cold_rna"], _items = self.run(fn)
+        warm = [self.run(fn) for _ in range(self.repeat)]
+        record["warm_median_s"] = statistics.median(t for t, _rna, _items in warm)
+        record["warm_min_s"] = min(t for t, _rna, _items in warm)
+        record["warm_rna"] = warm[-1][1]
+        record["layout_items"] = warm[-1][2]
+        self.results.append(record)
+        return record
+
+
+@pytest.fixture(scope="session")
+def bench(request):
+    bench = Bench(request.config.getoption("--bench-repeat"))
+    yield bench
+    path = Path(request.config.getoption("--bench-json"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(
+            {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "results": bench.results,
+            },
+            indent=1,
+        )
+    )
+
+
+@pytest.fixture
+def matalogue():
+    return addon
+
+
+@pytest.fixture
+def fake():
+    return bpy
+
+
+@pytest.fixture(params=SPECS, ids=[spec.label for spec in SPECS])
+def scene(request, fake, matalogue):
+    spec = request.param
+    generate(fake, spec)
+    matalogue.on_load_post()
+    fake.app.timers.run()
+    return spec
@@ -0,0 +1,1298 @@
+"""A lightweight stand-in for the parts of the bpy module that Matalogue uses.
+
+It is not a Blender emulator: it only models enough of the data, context and UI API for the add-on's panels and
+operators to run headless, so that their cost can be measured. Every attribute read on a fake datablock, slot,
+modifier, node or editor counts as one RNA access (see `rna_accesses`)."""
+
+import bisect
+import fnmatch
+import itertools
+import sys
+import types as _types
+
+#####################################################################
+# RNA access counting
+#####################################################################
+
+
+class _Counter:
+    def __init__(self):
+        self.value = 0
+
+
+rna_accesses = _Counter()
+_renames = _Counter()
+library_loads = _Counter()
+
+
+def _name(id_data):
+    """Read a name without counting it as an add-on RNA access."""
+    return object.__getattribute__(id_data, "name")
+
+
+class bpy_struct:
+    """Base for everything that is an RNA struct in Blender. Attribute reads are counted."""
+
+    def __getattribute__(self, name):
+        if name[0] != "_":
+            rna_accesses.value += 1
+        return object.__getattribute__(self, name)
+
+    def as_pointer(self):
+        return id(self)
+
+
+#####################################################################
+# Properties
+#####################################################################
+
+
+class _PropDef:
+    """What the bpy.props functions return. Also works as a descriptor when assigned to a class directly,
+    like PointerProperties registered on WindowManager."""
+
+    def __init__(self, kind, kwargs):
+        self.kind = kind
+        self.kwargs = kwargs
+
+    def default(self):
+        if "default" in self.kwargs:
+            default = self.kwargs["default"]
+            return set(default) if isinstance(default, (set, frozenset)) else default
+        if self.kind == "PointerProperty":
+            return self.kwargs["type"]()
+        if self.kind == "CollectionProperty":
+            return _PropCollection(self.kwargs["type"])
+        if self.kind == "EnumProperty":
+            items = self.kwargs.get("items")
+            if isinstance(items, (list, tuple)) and items:
+                if self.kwargs.get("options") and "ENUM_FLAG" in self.kwargs["options"]:
+                    return set()
+                return items[0][0]
+            return ""
+        return {
+            "BoolProperty": False,
+            "IntProperty": 0,
+            "FloatProperty": 0.0,
+            "StringProperty": "",
+        }.get(self.kind)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        key = "_prop_%d" % id(self)
+        values = object.__getattribute__(instance, "__dict__")
+        if key not in values:
+            values[key] = self.default()
+        return values[key]
+
+
+def _prop(kind):
+    def make(**kwargs):
+        return _PropDef(kind, kwargs)
+
+    make.__name__ = kind
+    return make
+
+
+props = _types.ModuleType("bpy.props")
+for _kind in (
+    "BoolProperty",
+    "IntProperty",
+    "FloatProperty",
+    "StringProperty",
+    "EnumProperty",
+    "PointerProperty",
+    "CollectionProperty",
+    "IntVectorProperty",
+    "FloatVectorProperty",
+    "BoolVectorProperty",
+):
+    setattr(props, _kind, _prop(_kind))
+
+
+class _PropCollection(list):
+    def __init__(self, item_type):
+        super().__init__()
+        self._item_type = item_type
+
+    def add(self):
+        item = self._item_type()
+        self.append(item)
+        return item
+
+    def remove(self, index):
+        del self[index]
+
+    def clear(self):
+        del self[:]
+
+
+class _PropertyOwner(bpy_struct):
+    """Base for classes whose annotations are bpy.props definitions. Instances get the defaults."""
+
+    def __init__(self, **kwargs):
+        for klass in reversed(type(self).__mro__):
+            for name, value in getattr(klass, "__annotations__", {}).items():
+                if isinstance(value, _PropDef):
+                    object.__setattr__(self, name, value.default())
+        for name, value in kwargs.items():
+            object.__setattr__(self, name, value)
+
+
+#####################################################################
+# Datablocks
+#####################################################################
+
+_session_uids = itertools.count(1)
+
+
+class ImagePreview(bpy_struct):
+    _icon_ids = itertools.count(1000)
+
+    def __init__(self):
+        self.icon_id = next(ImagePreview._icon_ids)
+
+
+class ID(bpy_struct):
+    def __setattr__(self, name, value):
+        if name == "name" and "name" in self.__dict__:
+            _renames.value += 1
+        object.__setattr__(self, name, value)
+
+    def __init__(self, name):
+        self.name = name
+        self.session_uid = next(_session_uids)
+        self.library = None
+        self.use_fake_user = False
+        self.users = 0
+        self.preview = None
+        self.is_evaluated = False
+        self.asset_data = None
+        self.library_weak_reference = None
+        self._properties = {}
+
+    def __getitem__(self, key):
+        return self._properties[key]
+
+    def __setitem__(self, key, value):
+        if self.library is not None:
+            raise TypeError("ID user properties of linked datablocks can't be edited")
+        self._properties[key] = value
+
+    def get(self, key, default=None):
+        return self._properties.get(key, default)
+
+    @property
+    def original(self):
+        return self
+
+    @property
+    def name_full(self):
+        return self.name
+
+    def preview_ensure(self):
+        if self.preview is None:
+            self.preview = ImagePreview()
+        return self.preview
+
+    def __repr__(self):
+        return "<%s %r>" % (type(self).__name__, self.name)
+
+
+class Library(ID):
+    def __init__(self, name, filepath=""):
+        super().__init__(name)
+        self.filepath = filepath
+
+
+class Node(bpy_struct):
+    def __init__(self, name, bl_idname, type="CUSTOM", node_tree=None):
+        self.name = name
+        self.bl_idname = bl_idname
+        self.type = type
+        self.node_tree = node_tree
+        self.image = None
+        self.inputs = []
+        self.outputs = []
+
+
+class NodeLink(bpy_struct):
+    def __init__(self, from_node, to_node, from_socket="", to_socket=""):
+        self.from_node = from_node
+        self.to_node = to_node
+        self.from_socket = from_socket
+        self.to_socket = to_socket
+
+
+class Nodes(list):
+    def get(self, name, default=None):
+        for node in self:
+            if node.name == name:
+                return node
+        return default
+
+
+class NodeTree(ID):
+    def __init__(self, name, type="SHADER", bl_idname=None):
+        super().__init__(name)
+        # Accept both the tree type and the bl_idname that bpy.data.node_groups.new() takes
+        type = {"ShaderNodeTree": "SHADER", "GeometryNodeTree": "GEOMETRY", "CompositorNodeTree": "COMPOSITING"}.get(
+            type, type
+        )
+        self.type = type
+        self.bl_idname = bl_idname or {
+            "SHADER": "ShaderNodeTree",
+            "GEOMETRY": "GeometryNodeTree",
+            "COMPOSITING": "CompositorNodeTree",
+        }.get(type, "ShaderNodeTree")
+        self.nodes = Nodes()
+        self.links = []
+        self.is_modifier = False
+        self.is_tool = False
+
+
+class Material(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.use_nodes = True
+        self.node_tree = NodeTree("Shader Nodetree", "SHADER")
+
+
+class World(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.use_nodes = True
+        self.node_tree = NodeTree("Shader Nodetree", "SHADER")
+
+
+class Light(ID):
+    def __init__(self, name, type="POINT"):
+        super().__init__(name)
+        self.type = type
+        self.use_nodes = True
+        self.node_tree = NodeTree("Shader Nodetree", "SHADER")
+
+
+class PropCollection(list):
+    def foreach_get(self, attr, seq):
+        for i, item in enumerate(self):
+            seq[i] = object.__getattribute__(item, attr)
+
+
+class MeshPolygons(PropCollection):
+    pass
+
+
+class MeshPolygon(bpy_struct):
+    def __init__(self, material_index=0):
+        self.material_index = material_index
+
+
+class Mesh(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.materials = []
+        self.polygons = MeshPolygons()
+
+
+class Text(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self._lines = ""
+
+    def clear(self):
+        self._lines = ""
+
+    def write(self, text):
+        self._lines += text
+
+    def from_string(self, text):
+        self._lines = text
+
+    def as_string(self):
+        return self._lines
+
+
+class Image(ID):
+    pass
+
+
+class MaterialSlot(bpy_struct):
+    def __init__(self, obj, index):
+        self._obj = obj
+        self._index = index
+        self.link = "DATA"
+
+    @property
+    def material(self):
+        return self._obj.data.materials[self._index]
+
+    @material.setter
+    def material(self, mat):
+        self._obj.data.materials[self._index] = mat
+
+    @property
+    def name(self):
+        mat = self.material
+        return mat.name if mat else ""
+
+
+class Modifier(bpy_struct):
+    def __init__(self, name, type="NODES", node_group=None):
+        self.name = name
+        self.type = type
+        self.node_group = node_group
+        self.is_active = False
+        self.show_viewport = True
+
+
+class Modifiers(list):
+    def get(self, name, default=None):
+        for mod in self:
+            if mod.name == name:
+                return mod
+        return default
+
+    def new(self, name, type):
+        mod = Modifier(name, type)
+        self.append(mod)
+        return mod
+
+
+class Object(ID):
+    def __init__(self, name, data=None):
+        super().__init__(name)
+        self.data = data
+        if data is None:
+            self.type = "EMPTY"
+        elif isinstance(data, Light):
+            self.type = "LIGHT"
+        else:
+            self.type = "MESH"
+        self.modifiers = Modifiers()
+        self.active_material_index = 0
+        self.hide_viewport = False
+        self.instance_type = "NONE"
+        self.instance_collection = None
+        self.particle_systems = []
+        self._selected = False
+
+    @property
+    def material_slots(self):
+        if self.data is None or not hasattr(self.data, "materials"):
+            return []
+        return [MaterialSlot(self, i) for i in range(len(self.data.materials))]
+
+    @property
+    def active_material(self):
+        slots = self.material_slots
+        if 0 <= self.active_material_index < len(slots):
+            return slots[self.active_material_index].material
+        return None
+
+    @property
+    def users_scene(self):
+        return [scene for scene in data.scenes if self in scene._object_set]
+
+    @property
+    def users_collection(self):
+        return [scene.collection for scene in self.users_scene]
+
+    def _view_layer(self, view_layer):
+        return view_layer if view_layer is not None else context.view_layer
+
+    def select_get(self, view_layer=None):
+        return self._selected and self in self._view_layer(view_layer).objects._set
+
+    def select_set(self, state, view_layer=None):
+        if self not in self._view_layer(view_layer).objects._set:
+            raise RuntimeError("Object '%s' can't be selected because it is not in View Layer" % self.name)
+        self._selected = state
+
+    def visible_get(self, view_layer=None, viewport=None):
+        return not self.hide_viewport and self in self._view_layer(view_layer).objects._set
+
+
+class LayerObjects(bpy_struct):
+    def __init__(self):
+        self._list = []
+        self._set = set()
+        self.active = None
+
+    def __iter__(self):
+        return iter(self._list)
+
+    def __len__(self):
+        return len(self._list)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for obj in self._list:
+                if obj.name == key:
+                    return obj
+            raise KeyError(key)
+        return self._list[key]
+
+    def get(self, name, default=None):
+        for obj in self._list:
+            if obj.name == name:
+                return obj
+        return default
+
+    @property
+    def selected(self):
+        return [obj for obj in self._list if obj._selected]
+
+    def _add(self, obj):
+        if obj not in self._set:
+            self._set.add(obj)
+            self._list.append(obj)
+
+    def _remove(self, obj):
+        if obj in self._set:
+            self._set.discard(obj)
+            self._list.remove(obj)
+            if self.active is obj:
+                self.active = None
+
+
+class LayerCollection(bpy_struct):
+    def __init__(self, collection):
+        self.collection = collection
+        self.children = []
+        self.exclude = False
+
+
+class ViewLayer(bpy_struct):
+    def __init__(self, name="ViewLayer", layer_collection=None):
+        self.name = name
+        self.objects = LayerObjects()
+        self.layer_collection = layer_collection
+
+    def update(self):
+        pass
+
+
+class CollectionObjects(bpy_struct):
+    def __init__(self, scene):
+        self._scene = scene
+
+    def __iter__(self):
+        return iter(list(self._scene._objects))
+
+    def __len__(self):
+        return len(self._scene._objects)
+
+    def link(self, obj):
+        if obj in self._scene._object_set:
+            raise RuntimeError("Object '%s' already in collection" % obj.name)
+        self._scene._link(obj)
+
+    def unlink(self, obj):
+        if obj not in self._scene._object_set:
+            raise RuntimeError("Object '%s' not in collection" % obj.name)
+        self._scene._unlink(obj)
+
+
+class ParticleSettings(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.instance_object = None
+        self.instance_collection = None
+
+
+class ParticleSystem(bpy_struct):
+    def __init__(self, settings):
+        self.settings = settings
+
+
+class Collection(ID):
+    def __init__(self, name, scene=None):
+        super().__init__(name)
+        self.objects = CollectionObjects(scene) if scene is not None else []
+
+
+class Scene(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self._objects = []
+        self._object_set = set()
+        self.collection = Collection("Scene Collection", self)
+        self.view_layers = [ViewLayer(layer_collection=LayerCollection(self.collection))]
+        self.world = None
+        self.use_nodes = False
+        self.compositing_node_group = None
+
+    @property
+    def objects(self):
+        return PropCollection(self._objects)
+
+    @property
+    def node_tree(self):
+        return self.compositing_node_group
+
+    def _link(self, obj):
+        self._objects.append(obj)
+        self._object_set.add(obj)
+        for view_layer in self.view_layers:
+            view_layer.objects._add(obj)
+
+    def _unlink(self, obj):
+        self._objects.remove(obj)
+        self._object_set.discard(obj)
+        for view_layer in self.view_layers:
+            view_layer.objects._remove(obj)
+
+
+class WindowManager(bpy_struct):
+    def __init__(self):
+        self.windows = []
+
+
+#####################################################################
+# Collections of datablocks
+#####################################################################
+
+
+class IDCollection(bpy_struct):
+    def __init__(self, factory):
+        self._items = []
+        self._names = {}
+        self._renames = _renames.value
+        self._set = set()
+        self._factory = factory
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return True
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            return self.get(item) is not None
+        return item in self._set
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            item = self.get(key)
+            if item is None:
+                raise KeyError('bpy_prop_collection[key]: key "%s" not found' % key)
+            return item
+        return self._items[key]
+
+    def get(self, name, default=None):
+        if self._renames != _renames.value:
+            self._names = {_name(item): item for item in self._items}
+            self._renames = _renames.value
+        return self._names.get(name, default)
+
+    def keys(self):
+        return [item.name for item in self._items]
+
+    def values(self):
+        return list(self._items)
+
+    def items(self):
+        return [(item.name, item) for item in self._items]
+
+    def foreach_get(self, attr, seq):
+        for i, item in enumerate(self._items):
+            seq[i] = getattr(item, attr)
+
+    def _unique_name(self, name):
+        if self.get(name) is None:
+            return name
+        for i in itertools.count(1):
+            candidate = "%s.%03d" % (name, i)
+            if self.get(candidate) is None:
+                return candidate
+
+    def new(self, name, *args, **kwargs):
+        item = self._factory(self._unique_name(name), *args, **kwargs)
+        self._add(item)
+        return item
+
+    def _add(self, item):
+        name = _name(item)
+        if self._items and _name(self._items[-1]) > name:
+            keys = [_name(x) for x in self._items]
+            self._items.insert(bisect.bisect_right(keys, name), item)
+        else:
+            self._items.append(item)
+        self._names[name] = item
+        self._set.add(item)
+        return item
+
+    def remove(self, item, do_unlink=True):
+        self._items.remove(item)
+        self._set.discard(item)
+        if self._names.get(_name(item)) is item:
+            del self._names[_name(item)]
+        for scene in data.scenes:
+            if item in scene._object_set:
+                scene._unlink(item)
+
+
+library_files = {}  # filepath -> {"materials": [names], "node_groups": {name: tree type}}, what libraries.load reads
+
+
+class _LibraryLoad:
+    """What bpy.data.libraries.load returns: a context manager giving the names in the file, which links or appends
+    the names assigned to data_to when it exits."""
+
+    def __init__(self, filepath, link):
+        self.filepath = filepath
+        self.link = link
+
+    def __enter__(self):
+        contents = library_files.get(self.filepath)
+        if contents is None:
+            raise OSError("Cannot read '%s'" % self.filepath)
+        library_loads.value += 1
+        self.contents = contents
+        self.data_from = _types.SimpleNamespace(
+            materials=list(contents.get("materials", ())), node_groups=list(contents.get("node_groups", {}))
+        )
+        self.data_to = _types.SimpleNamespace(materials=[], node_groups=[])
+        return self.data_from, self.data_to
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            return False
+        library = None
+        if self.link and (self.data_to.materials or self.data_to.node_groups):
+            library = next((lib for lib in data.libraries if lib.filepath == self.filepath), None)
+            if library is None:
+                library = data.libraries.new(self.filepath.rsplit("/", 1)[-1], self.filepath)
+        for collection_name in ("materials", "node_groups"):
+            loaded = []
+            for name in getattr(self.data_to, collection_name):
+                if collection_name == "materials":
+                    item = data.materials.new(name)
+                else:
+                    item = data.node_groups.new(name, self.contents["node_groups"][name])
+                # Blender only sets library_weak_reference when appending with the reuse option of wm.append
+                item.library = library
+                loaded.append(item)
+            setattr(self.data_to, collection_name, loaded)
+        return False
+
+
+class BlendDataLibraries(IDCollection):
+    def load(self, filepath, link=False, relative=False, assets_only=False):
+        return _LibraryLoad(filepath, link)
+
+
+class BlendData(bpy_struct):
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.filepath = ""
+        self.is_dirty = False
+        self.materials = IDCollection(Material)
+        self.node_groups = IDCollection(NodeTree)
+        self.worlds = IDCollection(World)
+        self.lights = IDCollection(Light)
+        self.meshes = IDCollection(Mesh)
+        self.objects = IDCollection(Object)
+        self.scenes = IDCollection(Scene)
+        self.texts = IDCollection(Text)
+        self.images = IDCollection(Image)
+        self.collections = IDCollection(Collection)
+        self.particles = IDCollection(ParticleSettings)
+        self.libraries = BlendDataLibraries(Library)
+
+    def user_map(self, subset=None, key_types=None, value_types=None):
+        """Map each ID in subset (or every ID) to the set of IDs that use it directly. Runs in C in Blender, so the
+        attribute reads made here aren't counted."""
+        reads = rna_accesses.value
+        try:
+            return self._user_map(subset)
+        finally:
+            rna_accesses.value = reads
+
+    def _user_map(self, subset):
+        if subset is None:
+            subset = [id_data for collection in self._collections() for id_data in collection]
+        users = {id_data: set() for id_data in subset}
+
+        def use(user, id_data):
+            if id_data is not None and id_data in users:
+                users[id_data].add(user)
+
+        def use_tree(user, tree):
+            if tree is None:
+                return
+            for node in tree.nodes:
+                use(user, node.node_tree)
+
+        for obj in self.objects:
+            use(obj, obj.data)
+            use(obj, obj.instance_collection)
+            for mod in obj.modifiers:
+                use(obj, mod.node_group)
+            for system in obj.particle_systems:
+                use(obj, system.settings)
+        for collection in self.collections:
+            for obj in collection.objects:
+                use(collection, obj)
+        for settings in self.particles:
+            use(settings, settings.instance_object)
+            use(settings, settings.instance_collection)
+        for mesh in self.meshes:
+            for mat in mesh.materials:
+                use(mesh, mat)
+        for owner in (*self.materials, *self.worlds, *self.lights):
+            use_tree(owner, owner.node_tree)
+        for g in self.node_groups:
+            use_tree(g, g)
+        for scene in self.scenes:
+            use(scene, scene.world)
+            use(scene, scene.compositing_node_group)
+            for obj in scene._objects:
+                use(scene, obj)
+        return users
+
+    def _collections(self):
+        return (
+            self.materials,
+            self.node_groups,
+            self.worlds,
+            self.lights,
+            self.meshes,
+            self.objects,
+            self.scenes,
+            self.texts,
+            self.images,
+            self.collections,
+            self.particles,
+        )
+
+    def batch_remove(self, ids):
+        for id_data in list(ids):
+            for collection in (
+                self.materials,
+                self.node_groups,
+                self.worlds,
+                self.lights,
+                self.meshes,
+                self.objects,
+                self.texts,
+                self.images,
+            ):
+                if id_data in collection._set:
+                    collection.remove(id_data)
+
+
+data = BlendData()
+
+
+#####################################################################
+# Editors, context and UI
+#####################################################################
+
+
+class NodeTreePath(bpy_struct):
+    def __init__(self, node_tree):
+        self.node_tree = node_tree
+
+
+class SpaceNodeEditorPath(bpy_struct):
+    def __init__(self):
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def append(self, node_tree, node=None):
+        self._items.append(NodeTreePath(node_tree))
+
+    def pop(self):
+        if self._items:
+            self._items.pop()
+
+    def clear(self):
+        self._items = []
+
+    def start(self, node_tree):
+        self._items = [NodeTreePath(node_tree)]
+
+
+class SpaceNodeEditor(bpy_struct):
+    def __init__(self):
+        self.type = "NODE_EDITOR"
+        self.tree_type = "ShaderNodeTree"
+        self.shader_type = "OBJECT"
+        self.node_tree_sub_type = "MODIFIER"
+        self.path = SpaceNodeEditorPath()
+        self.id = None
+        self.pin = False
+
+    @property
+    def node_tree(self):
+        return self.path[0].node_tree if len(self.path) else None
+
+    @property
+    def edit_tree(self):
+        return self.path[-1].node_tree if len(self.path) else None
+
+
+class Area(bpy_struct):
+    def __init__(self, space):
+        self.type = space.type
+        self.spaces = _types.SimpleNamespace(active=space)
+        self.redraws = 0
+
+    def tag_redraw(self):
+        self.redraws += 1
+
+
+class Screen(bpy_struct):
+    def __init__(self, areas):
+        self.areas = areas
+
+
+class Window(bpy_struct):
+    def __init__(self, screen, scene):
+        self.screen = screen
+        self.scene = scene
+
+
+class UILayout:
+    """Records how many layout items are created. Not an RNA struct, so reads aren't counted."""
+
+    items = 0
+
+    def __init__(self):
+        self.alignment = "EXPAND"
+        self.enabled = True
+        self.active = True
+        self.alert = False
+        self.activate_init = False
+        self.use_property_split = False
+        self.scale_x = 1.0
+        self.scale_y = 1.0
+
+    def _child(self):
+        UILayout.items += 1
+        return UILayout()
+
+    def row(self, align=False, heading=""):
+        return self._child()
+
+    def column(self, align=False, heading=""):
+        return self._child()
+
+    def box(self):
+        return self._child()
+
+    def split(self, factor=0.0, align=False):
+        return self._child()
+
+    def label(self, text="", icon="NONE", icon_value=0):
+        UILayout.items += 1
+
+    def separator(self, factor=1.0):
+        UILayout.items += 1
+
+    def prop(self, data, property, **kwargs):
+        UILayout.items += 1
+
+    def operator(self, operator, text="", **kwargs):
+        UILayout.items += 1
+        return _types.SimpleNamespace()
+
+    def menu(self, menu, **kwargs):
+        UILayout.items += 1
+
+    def popover(self, panel, **kwargs):
+        UILayout.items += 1
+
+    def icon(self, data):
+        return data.preview_ensure().icon_id
+
+    def template_list(self, listtype_name, list_id, dataptr, propname, active_dataptr, active_propname, rows=5, **kwargs):
+        """Filter the whole collection like Blender does, then only draw the first `rows` visible items."""
+        UILayout.items += 1
+        cls = _registered[listtype_name]
+        ui_list = _ui_lists.get((listtype_name, list_id))
+        if ui_list is None:
+            ui_list = _ui_lists[(listtype_name, list_id)] = cls()
+            ui_list.list_id = list_id
+        collection = getattr(dataptr, propname)
+        flags, order = ui_list.filter_items(context, dataptr, propname)
+        items = list(collection)
+        shown = [item for i, item in enumerate(items) if not flags or flags[i] & UIList.bitflag_filter_item]
+        for index, item in enumerate(shown[:rows]):
+            ui_list.draw_item(context, self._child(), dataptr, item, 0, active_dataptr, active_propname, index)
+
+
+class Preferences(bpy_struct):
+    def __init__(self):
+        self.addons = {}
+        self.filepaths = _types.SimpleNamespace(asset_libraries=[])
+
+
+class Addon(bpy_struct):
+    def __init__(self, module, preferences):
+        self.module = module
+        self.preferences = preferences
+
+
+class Context(bpy_struct):
+    def __init__(self):
+        self.preferences = Preferences()
+        self.window_manager = WindowManager()
+        self.space_data = SpaceNodeEditor()
+        self.area = Area(self.space_data)
+        self.region = None
+        self.scene = None
+        self.view_layer = None
+        self.window = None
+
+    def setup(self, scene):
+        """Make this scene the active one and show it in a window with one Node Editor."""
+        self.scene = scene
+        self.view_layer = scene.view_layers[0]
+        self.space_data = SpaceNodeEditor()
+        self.area = Area(self.space_data)
+        self.window = Window(Screen([self.area]), scene)
+        self.window_manager.windows = [self.window]
+
+    @property
+    def selected_objects(self):
+        return [obj for obj in self.view_layer.objects if obj._selected]
+
+    @property
+    def visible_objects(self):
+        return [obj for obj in self.view_layer.objects if not obj.hide_viewport]
+
+    @property
+    def object(self):
+        return self.view_layer.objects.active
+
+    @property
+    def active_object(self):
+        return self.view_layer.objects.active
+
+    def evaluated_depsgraph_get(self):
+        instances = _evaluated_instances(self.view_layer)
+        return Depsgraph(object_instances=instances, scene=self.scene, view_layer=self.view_layer)
+
+    def temp_override(self, **kwargs):
+        return _Override(self, kwargs)
+
+
+class _Override:
+    def __init__(self, ctx, kwargs):
+        self.ctx = ctx
+        self.kwargs = kwargs
+        self.saved = {}
+
+    def __enter__(self):
+        for key, value in self.kwargs.items():
+            self.saved[key] = object.__getattribute__(self.ctx, key)
+            object.__setattr__(self.ctx, key, value)
+        return self.ctx
+
+    def __exit__(self, *exc):
+        for key, value in self.saved.items():
+            object.__setattr__(self.ctx, key, value)
+
+
+context = Context()
+
+
+#####################################################################
+# Depsgraph
+#####################################################################
+
+
+class DepsgraphUpdate(bpy_struct):
+    def __init__(self, id, is_updated_geometry=False, is_updated_shading=False, is_updated_transform=False):
+        self.id = id
+        self.is_updated_geometry = is_updated_geometry
+        self.is_updated_shading = is_updated_shading
+        self.is_updated_transform = is_updated_transform
+
+
+class DepsgraphObjectInstance(bpy_struct):
+    def __init__(self, object, parent=None, is_instance=False):
+        self.object = object
+        self.parent = parent
+        self.is_instance = is_instance
+        self.instance_object = object if is_instance else None
+
+
+class Depsgraph(bpy_struct):
+    def __init__(self, updates=(), object_instances=(), scene=None, view_layer=None):
+        self.updates = list(updates)
+        self.object_instances = list(object_instances)
+        self.scene = scene
+        self.view_layer = view_layer
+
+
+def _evaluated_instances(view_layer):
+    """The instances Blender would evaluate for a view layer: every visible object, and the objects of the
+    collections they instance. Objects are their own evaluated copies here."""
+    instances = []
+    for obj in view_layer.objects:
+        if object.__getattribute__(obj, "hide_viewport"):
+            continue
+        instances.append(DepsgraphObjectInstance(obj))
+        if object.__getattribute__(obj, "instance_type") == "COLLECTION":
+            collection = object.__getattribute__(obj, "instance_collection")
+            for child in collection.objects if collection is not None else ():
+                instances.append(DepsgraphObjectInstance(child, parent=obj, is_instance=True))
+    return instances
+
+
+#####################################################################
+# bpy.types
+#####################################################################
+
+
+class Operator(_PropertyOwner):
+    bl_options = set()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.reports = []
+        self.layout = UILayout()
+
+    def report(self, type, message):
+        self.reports.append((set(type), message))
+
+
+class Panel(_PropertyOwner):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.layout = UILayout()
+
+
+class Menu(Panel):
+    pass
+
+
+class PropertyGroup(_PropertyOwner):
+    pass
+
+
+class AddonPreferences(_PropertyOwner):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.layout = UILayout()
+
+
+class UIList(_PropertyOwner):
+    bitflag_filter_item = 1 << 30
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.list_id = ""
+        self.filter_name = ""
+        self.use_filter_sort_alpha = False
+        self.use_filter_sort_reverse = False
+        self.use_filter_invert = False
+
+
+class UI_UL_list(UIList):
+    @staticmethod
+    def filter_items_by_name(pattern, bitflag, items, propname="name", flags=None, reverse=False):
+        if not pattern or not items:
+            return []
+        pattern = "*" + pattern.lower() + "*"
+        flags = flags or [0] * len(items)
+        for i, item in enumerate(items):
+            if fnmatch.fnmatchcase(getattr(item, propname).lower(), pattern) != reverse:
+                flags[i] |= bitflag
+        return flags
+
+    @staticmethod
+    def sort_items_by_name(items, propname="name"):
+        ordered = sorted(enumerate(items), key=lambda x: getattr(x[1], propname).lower())
+        order = [0] * len(ordered)
+        for new_index, (old_index, _item) in enumerate(ordered):
+            order[old_index] = new_index
+        return order
+
+
+types = _types.ModuleType("bpy.types")
+for _cls in (
+    bpy_struct,
+    ID,
+    Library,
+    Material,
+    NodeTree,
+    World,
+    Light,
+    Mesh,
+    Object,
+    Scene,
+    Collection,
+    Text,
+    Image,
+    Node,
+    NodeLink,
+    MaterialSlot,
+    Modifier,
+    ViewLayer,
+    LayerCollection,
+    LayerObjects,
+    SpaceNodeEditor,
+    WindowManager,
+    Depsgraph,
+    DepsgraphUpdate,
+    DepsgraphObjectInstance,
+    ImagePreview,
+    Operator,
+    Panel,
+    Menu,
+    PropertyGroup,
+    AddonPreferences,
+    UIList,
+    UI_UL_list,
+    Context,
+):
+    setattr(types, _cls.__name__, _cls)
+types.UILayout = UILayout
+
+#####################################################################
+# bpy.utils, bpy.ops, bpy.app
+#####################################################################
+
+_registered = {}
+_ui_lists = {}
+
+
+def register_class(cls):
+    _registered[cls.__name__] = cls
+    setattr(types, cls.__name__, cls)
+
+
+def unregister_class(cls):
+    _registered.pop(cls.__name__, None)
+    if getattr(types, cls.__name__, None) is cls:
+        delattr(types, cls.__name__)
+
+
+utils = _types.ModuleType("bpy.utils")
+utils.register_class = register_class
+utils.unregister_class = unregister_class
+utils.extension_path_user = lambda package, path="", create=False: path
+
+
+class _OpsCategory:
+    def __init__(self, category):
+        self._category = category
+
+    def __getattr__(self, name):
+        idname = "%s.%s" % (self._category, name)
+
+        def call(*args, **kwargs):
+            for cls in _registered.values():
+                if getattr(cls, "bl_idname", None) == idname:
+                    op = cls(**kwargs)
+                    poll = getattr(cls, "poll", None)
+                    if poll is not None and not poll(context):
+                        raise RuntimeError("Operator bpy.ops.%s.poll() failed, context is incorrect" % idname)
+                    return op.execute(context)
+            raise AttributeError("Operator bpy.ops.%s not found" % idname)
+
+        return call
+
+
+class _Ops:
+    def __getattr__(self, category):
+        return _OpsCategory(category)
+
+
+ops = _Ops()
+
+
+class _Timers:
+    def __init__(self):
+        self.functions = {}
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.functions[function] = first_interval
+
+    def unregister(self, function):
+        if function not in self.functions:
+            raise ValueError("Error: function is not registered")
+        del self.functions[function]
+
+    def is_registered(self, function):
+        return function in self.functions
+
+    def run(self, max_calls=10000):
+        """Run the registered timers until they all finish. Returns the number of calls made."""
+        calls = 0
+        while self.functions and calls < max_calls:
+            for function in list(self.functions):
+                calls += 1
+                interval = function()
+                if interval is None:
+                    self.functions.pop(function, None)
+        return calls
+
+
+def _persistent(function):
+    return function
+
+
+app = _types.SimpleNamespace(
+    version=(4, 2, 0),
+    version_string="4.2.0",
+    debug=False,
+    background=True,
+    timers=_Timers(),
+    handlers=_types.SimpleNamespace(
+        persistent=_persistent,
+        depsgraph_update_post=[],
+        load_pre=[],
+        load_post=[],
+        save_pre=[],
+        save_post=[],
+        undo_post=[],
+        redo_post=[],
+    ),
+)
+
+
+path = _types.SimpleNamespace(abspath=lambda filepath, start=None, library=None: filepath.replace("//", "", 1))
+
+
+#####################################################################
+# Helpers for the benchmarks
+#####################################################################
+
+
+def reset():
+    """Empty the file and the context, as if Blender had just opened a new empty file."""
+    data.reset()
+    _ui_lists.clear()
+    app.timers.functions.clear()
+    UILayout.items = 0
+
+
+def install():
+    """Make this module importable as bpy."""
+    module = sys.modules[__name__]
+    sys.modules["bpy"] = module
+    sys.modules["bpy.types"] = types
+    sys.modules["bpy.props"] = props
+    sys.modules["bpy.utils"] = utils
+    return module
@@ -0,0 +1,35 @@
+"""Drive Matalogue through the fake bpy the way Blender would, for the tests and the benchmarks."""
+
+
+def panel(matalogue, name):
+    return getattr(matalogue, name)()
+
+
+def run_operator(fake, cls, **kwargs):
+    op = cls(**kwargs)
+    result = op.execute(fake.context)
+    assert result == {"FINISHED"}, op.reports
+    return op
+
+
+def depsgraph_update(fake, matalogue, *ids, **kwargs):
+    """Run the depsgraph handler as if these datablocks were just changed."""
+    updates = [fake.DepsgraphUpdate(id_data, **kwargs) for id_data in ids]
+    matalogue.on_depsgraph_update(fake.context.scene, fake.Depsgraph(updates))
+
+
+def index_state(matalogue):
+    usage_index, tree_graph = matalogue.usage_index, matalogue.tree_graph
+    return (
+        usage_index.material_users,
+        usage_index.group_users,
+        set(usage_index.lights),
+        {uid: set(children) for uid, children in tree_graph.children.items()},
+    )
+
+
+def finish_load(fake, matalogue):
+    matalogue.on_load_post()
+    while matalogue.index_builder.running:
+        matalogue.index_build_tick()
+    fake.app.timers.functions.clear()
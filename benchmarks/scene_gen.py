@@ -0,0 +1,120 @@
+"""Generate synthetic files in the fake bpy for the benchmarks."""
+
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class SceneSpec:
+    objects: int = 1000
+    materials: int = 100
+    slots: int = 2  # material slots per mesh object
+    geo_modifiers: int = 1  # Geometry Nodes modifiers per mesh object
+    geo_groups: int = 20  # modifier node groups
+    nested_depth: int = 2  # levels of groups nested inside every shader, geometry and compositor tree
+    shader_groups: int = 20
+    compositor_groups: int = 5
+    lights: int = 20
+    worlds: int = 3  # only the first is used by the scenes
+    scenes: int = 3
+    selected: float = 0.05  # fraction of objects that are selected
+    hidden: float = 0.2  # fraction of objects that are hidden
+    seed: int = 0
+
+    @property
+    def label(self):
+        return "o%d_m%d_s%d_g%d_sc%d" % (self.objects, self.materials, self.slots, self.geo_groups, self.scenes)
+
+
+def nest_groups(bpy, tree, groups, depth, rng):
+    """Add group nodes to the tree, and to the groups used inside it, `depth` levels deep."""
+    if depth <= 0 or not groups:
+        return
+    for i in range(min(2, len(groups))):
+        g = rng.choice(groups)
+        if g is tree:
+            continue
+        tree.nodes.append(bpy.types.Node("Group.%03d" % i, tree.bl_idname.replace("Tree", "Group"), "GROUP", g))
+        if not g.nodes:
+            nest_groups(bpy, g, [x for x in groups if x is not g], depth - 1, rng)
+
+
+def add_nodes(bpy, tree, count, rng):
+    for i in range(count):
+        tree.nodes.append(bpy.types.Node("Node.%03d" % i, "ShaderNodeMath", "MATH"))
+    for i in range(1, len(tree.nodes)):
+        tree.links.append(bpy.types.NodeLink(tree.nodes[i - 1], tree.nodes[i]))
+
+
+def generate(bpy, spec):
+    """Fill the fake bpy.data with a file described by spec, and point bpy.context at its first scene."""
+    rng = random.Random(spec.seed)
+    bpy.reset()
+    data = bpy.data
+
+    materials = [data.materials.new("Material.%05d" % i) for i in range(spec.materials)]
+    shader_groups = [data.node_groups.new("Shader Group.%04d" % i, "ShaderNodeTree") for i in range(spec.shader_groups)]
+    geo_groups = []
+    for i in range(spec.geo_groups):
+        g = data.node_groups.new("Geo Modifier.%04d" % i, "GeometryNodeTree")
+        g.is_modifier = True
+        geo_groups.append(g)
+    for i in range(max(1, spec.geo_groups // 4)):
+        g = data.node_groups.new("Geo Tool.%04d" % i, "GeometryNodeTree")
+        g.is_tool = True
+    geo_nested = [data.node_groups.new("Geo Group.%04d" % i, "GeometryNodeTree") for i in range(spec.geo_groups)]
+    comp_groups = [
+        data.node_groups.new("Compositor Group.%04d" % i, "CompositorNodeTree") for i in range(spec.compositor_groups)
+    ]
+
+    for mat in materials:
+        add_nodes(bpy, mat.node_tree, rng.randint(5, 30), rng)
+        nest_groups(bpy, mat.node_tree, shader_groups, spec.nested_depth, rng)
+    for g in geo_groups:
+        add_nodes(bpy, g, rng.randint(5, 30), rng)
+        nest_groups(bpy, g, geo_nested, spec.nested_depth, rng)
+
+    scenes = [data.scenes.new("Scene.%02d" % i) for i in range(max(1, spec.scenes))]
+    world = data.worlds.new("World")
+    for i in range(1, spec.worlds):
+        data.worlds.new("World.%03d" % i)
+    for scene in scenes:
+        scene.world = world
+        scene.use_nodes = True
+        tree = data.node_groups.new("Compositing Nodetree", "CompositorNodeTree")
+        scene.compositing_node_group = tree
+        add_nodes(bpy, tree, 10, rng)
+        nest_groups(bpy, tree, comp_groups, spec.nested_depth, rng)
+    main_scene = scenes[0]
+
+    for i in range(spec.lights):
+        light = data.lights.new("Light.%04d" % i, rng.choice(["POINT", "SUN", "SPOT", "AREA"]))
+        obj = data.objects.new("Light.%04d" % i, light)
+        main_scene.collection.objects.link(obj)
+
+    for i in range(spec.objects):
+        mesh = data.meshes.new("Mesh.%06d" % i)
+        for j in range(spec.slots):
+            mesh.materials.append(rng.choice(materials) if materials else None)
+        faces = rng.randint(0, 50)
+        mesh.polygons.extend(bpy.MeshPolygon(rng.randrange(max(1, spec.slots))) for _ in range(faces))
+        obj = data.objects.new("Object.%06d" % i, mesh)
+        for j in range(spec.geo_modifiers):
+            if geo_groups:
+                obj.modifiers.new("GeometryNodes.%03d" % j, "NODES").node_group = rng.choice(geo_groups)
+        obj.hide_viewport = rng.random() < spec.hidden
+        # Most objects live in the main scene, a few in the others
+        scene = main_scene if rng.random() > 0.05 or len(scenes) == 1 else rng.choice(scenes[1:])
+        scene.collection.objects.link(obj)
+        obj._selected = scene is main_scene and rng.random() < spec.selected
+
+    for collection in (data.materials, data.node_groups, data.worlds, data.lights):
+        for id_data in collection:
+            id_data.users = 1
+    for tree in (g for g in data.node_groups if g.name.startswith("Compositing Nodetree")):
+        tree.use_fake_user = True
+
+    bpy.context.setup(main_scene)
+    first_mesh = next((obj for obj in main_scene.view_layers[0].objects if obj.type == "MESH"), None)
+    main_scene.view_layers[0].objects.active = first_mesh
+    return main_scene
@@ -0,0 +1,81 @@
+"""Browsing and importing the materials and node groups of the asset libraries."""
+
+from types import SimpleNamespace
+
+import pytest
+from helpers import panel, run_operator
+
+
+def test_asset_libraries(fake, matalogue, scene, tmp_path, monkeypatch):
+    """Asset names are saved by file modification time and size, so scanning again only reads the changed files."""
+    library = tmp_path / "library"
+    (library / "sub").mkdir(parents=True)
+    contents = {
+        library / "metals.blend": {"materials": ["Gold", "Steel"]},
+        library / "sub" / "scatter.blend": {"node_groups": {"Scatter": "GEOMETRY"}, "materials": ["Moss"]},
+        library / "sub" / "broken.blend": None,
+    }
+    for path, names in contents.items():
+        path.write_bytes(b"BLENDER")
+        if names is not None:
+            monkeypatch.setitem(fake.library_files, str(path), names)
+    monkeypatch.setattr(fake.utils, "extension_path_user", lambda package, path="", create=False: str(tmp_path))
+    monkeypatch.setattr(
+        fake.context.preferences.filepaths,
+        "asset_libraries",
+        [SimpleNamespace(name="Studio", path=str(library), import_method="APPEND_REUSE")],
+    )
+    catalogue = matalogue.asset_catalogue
+    draw = panel(matalogue, "MATALOGUE_PT_asset_libraries").draw
+
+    def scan():
+        catalogue.clear()  # As if Blender was restarted, so only the saved names are known
+        loads = fake.library_loads.value
+        draw(fake.context)
+        fake.app.timers.run()
+        return fake.library_loads.value - loads
+
+    try:
+        assert scan() == 2  # The broken file can't be read, but is remembered too
+        assert [name for kind, name, path in catalogue.entries[0][2]] == ["Gold", "Moss", "Steel", "Scatter"]
+        assert scan() == 0
+        (library / "metals.blend").write_bytes(b"BLENDER-v2")
+        assert scan() == 1
+
+        op = matalogue.MATALOGUE_OT_import_asset
+        path = str(library / "sub" / "scatter.blend")
+        run_operator(fake, op, filepath=path, kind="NODE_GROUP", name="Scatter", import_method="APPEND_REUSE")
+        g = next(g for g in fake.data.node_groups if g.get(matalogue.ASSET_SOURCE))
+        assert g[matalogue.ASSET_SOURCE] == {"file": path, "name": "Scatter"}
+        assert fake.context.space_data.path[-1].node_tree is g
+        loads = fake.library_loads.value
+        run_operator(fake, op, filepath=path, kind="NODE_GROUP", name="Scatter", import_method="APPEND_REUSE")
+        assert fake.library_loads.value == loads
+        assert [other for other in fake.data.node_groups if other.get(matalogue.ASSET_SOURCE)] == [g]
+    finally:
+        catalogue.clear()
+
+
+@pytest.mark.parametrize(
+    "saved",
+    [
+        "[]",
+        '{"version": 1}',
+        '{"version": 1, "files": {"a.blend": [1, 2]}}',
+        '{"version": 1, "files": {"a.blend": 5}}',
+        '{"version": 1, "files": []}',
+        "not json",
+    ],
+)
+def test_asset_names_unreadable(fake, matalogue, tmp_path, monkeypatch, saved):
+    """A saved asset names file that isn't in the expected shape is ignored instead of breaking the panel."""
+    (tmp_path / "asset_names.json").write_text(saved)
+    monkeypatch.setattr(fake.utils, "extension_path_user", lambda package, path="", create=False: str(tmp_path))
+    catalogue = matalogue.asset_catalogue
+    catalogue.clear()
+    try:
+        panel(matalogue, "MATALOGUE_PT_asset_libraries").draw(fake.context)
+        assert catalogue.loaded and catalogue.files == {}
+    finally:
+        fake.app.timers.functions.clear()
+        catalogue.clear()
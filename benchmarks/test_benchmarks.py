@@ -0,0 +1,363 @@
+"""Time the panels, polls and goto operators on synthetic files of increasing size.
+
+Only timings and RNA access counts are checked here; what the add-on does is tested in the other modules."""
+
+import gc
+import time
+from types import SimpleNamespace
+
+import pytest
+from helpers import depsgraph_update, finish_load, panel, run_operator
+
+
+@pytest.mark.parametrize("selected_only, visible_only", [(False, False), (True, False), (False, True)])
+def test_draw_shadernodes_panel(bench, fake, matalogue, scene, selected_only, visible_only):
+    p = panel(matalogue, "MATALOGUE_PT_shader_materials")
+    variant = "selected" if selected_only else "visible" if visible_only else "all"
+    record = bench.measure(
+        "draw_shadernodes_panel",
+        scene,
+        lambda: matalogue.draw_shadernodes_panel(p, fake.context, selected_only, visible_only),
+        variant,
+    )
+    assert record["layout_items"] > 0
+
+
+@pytest.mark.parametrize(
+    "panel_name", ["MATALOGUE_PT_geonodes_modifiers", "MATALOGUE_PT_geonodes_tools", "MATALOGUE_PT_geonodes_groups"]
+)
+@pytest.mark.parametrize("selected_only, visible_only", [(False, False), (True, False), (False, True)])
+def test_draw_geonodes_panel(bench, fake, matalogue, scene, panel_name, selected_only, visible_only):
+    p = panel(matalogue, panel_name)
+    variant = "%s:%s" % (panel_name, "selected" if selected_only else "visible" if visible_only else "all")
+    record = bench.measure(
+        "draw_geonodes_panel",
+        scene,
+        lambda: matalogue.draw_geonodes_panel(p, fake.context, p.conditions, p.inverse, selected_only, visible_only),
+        variant,
+    )
+    assert record["layout_items"] > 0
+
+
+def test_draw_panels(bench, fake, matalogue, scene):
+    for cls in matalogue.classes:
+        if not cls.__name__.startswith("MATALOGUE_PT_"):
+            continue
+        p = cls()
+        if hasattr(cls, "poll") and not cls.poll(fake.context):
+            continue
+        bench.measure("draw", scene, lambda: p.draw(fake.context), cls.__name__)
+
+
+def test_poll(bench, fake, matalogue, scene):
+    polled = 0
+    for cls in matalogue.classes:
+        if cls.__name__.startswith("MATALOGUE_PT_") and hasattr(cls, "poll"):
+            bench.measure("poll", scene, lambda: cls.poll(fake.context), cls.__name__)
+            polled += 1
+    assert polled > 0
+
+
+def test_goto_material(bench, fake, matalogue, scene):
+    mats = list(fake.data.materials)
+    mat = mats[len(mats) // 2]
+    bench.measure(
+        "goto_mat", scene, lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=mat.name)
+    )
+    assert fake.context.object is not None and mat in [s.material for s in fake.context.object.material_slots]
+
+
+def test_goto_material_view_only(bench, fake, matalogue, scene):
+    fake.context.window_manager.MATALOGUE_Settings.view_only = True
+    try:
+        mat = list(fake.data.materials)[-1]
+        selected = set(fake.context.selected_objects)
+        bench.measure(
+            "goto_mat", scene, lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=mat.name), "view_only"
+        )
+        assert set(fake.context.selected_objects) == selected
+        assert fake.context.space_data.path[0].node_tree is mat.node_tree
+    finally:
+        fake.context.window_manager.MATALOGUE_Settings.view_only = False
+
+
+def test_goto_group(bench, fake, matalogue, scene):
+    g = next(g for g in fake.data.node_groups if g.type == "SHADER")
+    bench.measure(
+        "goto_group",
+        scene,
+        lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_group, tree_type="ShaderNodeTree", tree=g.name),
+    )
+    assert fake.context.space_data.path[-1].node_tree is g
+
+
+def test_goto_geonodes(bench, fake, matalogue, scene):
+    g = next(g for g in fake.data.node_groups if g.type == "GEOMETRY" and g.is_modifier)
+    bench.measure("goto_geo", scene, lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_geonodes, tree=g.name))
+    tool = next(g for g in fake.data.node_groups if g.type == "GEOMETRY" and g.is_tool)
+    bench.measure(
+        "goto_geo",
+        scene,
+        lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_geonodes, tree=tool.name, is_tool=True),
+        "tool",
+    )
+
+
+def test_goto_light(bench, fake, matalogue, scene):
+    light = next(obj for obj in fake.context.view_layer.objects if obj.type == "LIGHT")
+    bench.measure("goto_light", scene, lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_light, light=light.name))
+    bench.measure(
+        "goto_light", scene, lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_light, world=True), "world"
+    )
+    other = fake.data.worlds["World.001"]
+    bench.measure(
+        "goto_light",
+        scene,
+        lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_light, world=True, world_name=other.name),
+        "other world",
+    )
+    assert fake.context.space_data.pin and fake.context.space_data.path[-1].node_tree == other.node_tree
+
+
+def test_draw_lights_panel(bench, fake, matalogue, scene):
+    p = panel(matalogue, "MATALOGUE_PT_shader_lights")
+    record = bench.measure("draw_lights_panel", scene, lambda: p.draw(fake.context))
+    # One row per light and per world, and one label per light type
+    assert record["layout_items"] >= scene.lights + scene.worlds
+    # Editing a mesh object shouldn't cost the next draw a scan of every object
+    obj = next(obj for obj in fake.context.view_layer.objects if obj.type == "MESH")
+    matalogue.on_depsgraph_update(fake.context.scene, fake.Depsgraph([fake.DepsgraphUpdate(obj)]))
+    fake.rna_accesses.value = 0
+    p.draw(fake.context)
+    assert fake.rna_accesses.value < 50 * (scene.lights + scene.worlds)
+
+
+def test_goto_comp(bench, fake, matalogue, scene):
+    scene_data = list(fake.data.scenes)[-1]
+    bench.measure("goto_comp", scene, lambda: run_operator(fake, matalogue.MATALOGUE_OT_go_to_comp, scene=scene_data.name))
+
+
+def test_goto_comp_view_only(bench, fake, matalogue, scene):
+    fake.context.window_manager.MATALOGUE_Settings.view_only = True
+    try:
+        other = list(fake.data.scenes)[-1]
+        op = matalogue.MATALOGUE_OT_go_to_comp
+        bench.measure("goto_comp", scene, lambda: run_operator(fake, op, scene=other.name), "view_only")
+        draw = panel(matalogue, "MATALOGUE_PT_compositing_scenes").draw
+        record = bench.measure("draw", scene, lambda: draw(fake.context))
+        # Pinned scenes are highlighted without looking up each scene's tree more than once
+        assert record["warm_rna"] < 5 * record["layout_items"]
+    finally:
+        fake.context.window_manager.MATALOGUE_Settings.view_only = False
+
+
+def test_goto_linked_duplicate(bench, fake, matalogue, scene):
+    """A linked material with the same name as a local one is found by its session_uid, without scanning by name."""
+    local = list(fake.data.materials)[0]
+    library = fake.data.libraries.new("library.blend", "//library.blend")
+    linked = fake.Material(local.name)
+    linked.library = library
+    fake.data.materials._add(linked)
+    fake.context.window_manager.MATALOGUE_Settings.view_only = True
+    try:
+        op = matalogue.MATALOGUE_OT_go_to_material
+        record = bench.measure(
+            "goto_mat", scene, lambda: run_operator(fake, op, mat=linked.name, uid=linked.session_uid), "linked"
+        )
+        assert record["warm_rna"] < 50
+    finally:
+        fake.context.window_manager.MATALOGUE_Settings.view_only = False
+
+
+def test_evaluated_usage(bench, fake, matalogue, scene):
+    """The first draw walks every instance, later ones only look up the cached result."""
+    settings = fake.context.window_manager.MATALOGUE_Settings
+    settings.mat_evaluated = True
+    try:
+        record = bench.measure(
+            "filter_materials",
+            scene,
+            lambda: matalogue.filter_materials(fake.context, visible_only=True, evaluated=True),
+            "evaluated",
+        )
+        assert record["warm_rna"] < record["cold_rna"] / 5
+    finally:
+        settings.mat_evaluated = False
+
+
+def test_face_counts(bench, fake, matalogue, scene):
+    """Faces are counted once, later draws only look up the counts."""
+    record = bench.measure(
+        "filter_materials", scene, lambda: matalogue.filter_materials(fake.context, hide_empty=True), "hide_empty"
+    )
+    assert record["warm_rna"] < record["cold_rna"] / 5
+
+
+@pytest.mark.parametrize("mode", ["USERS", "RECENT", "NODES"])
+def test_sort_modes(bench, fake, matalogue, scene, mode):
+    """Sorting again is cheap, and a change to one tree only re-keys that tree."""
+    materials = list(fake.data.materials)
+    for mat in materials[:5]:
+        run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=mat.name)
+    record = bench.measure("sort_materials", scene, lambda: matalogue.filter_materials(fake.context, sort=mode), mode)
+    assert record["warm_rna"] < record["cold_rna"] / 5
+
+    # Visiting a material, or adding nodes and users to it, only re-keys that material
+    mat = materials[len(materials) // 2]
+    run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=mat.name)
+    mat.node_tree.nodes.extend(fake.types.Node("Extra.%03d" % i, "ShaderNodeMath", "MATH") for i in range(100))
+    obj = next(obj for obj in fake.context.view_layer.objects if obj.type == "MESH")
+    obj.data.materials.append(mat)
+    updates = [fake.DepsgraphUpdate(mat), fake.DepsgraphUpdate(obj, is_updated_geometry=True)]
+    matalogue.on_depsgraph_update(fake.context.scene, fake.Depsgraph(updates))
+    matalogue.filter_materials(fake.context)  # Rescan the registry, which isn't part of sorting
+    fake.rna_accesses.value = 0
+    matalogue.filter_materials(fake.context, sort=mode)
+    assert fake.rna_accesses.value < 2 * len(matalogue.registry.materials) + 100
+
+
+def test_tree_costs(bench, fake, matalogue, scene):
+    """Stats are worked out once, and a change that keeps a tree's structure only rescans that tree."""
+    inner = fake.data.node_groups.new("Inner Group", "ShaderNodeTree")
+    inner.nodes.extend(fake.types.Node("Node.%03d" % i, "ShaderNodeMath", "MATH") for i in range(4))
+    mats = [fake.data.materials.new("Costly Material") for _ in range(2)]
+    for mat in mats:
+        mat.node_tree.nodes.append(fake.types.Node("Group", "ShaderNodeGroup", "GROUP", inner))
+
+    materials = list(fake.data.materials)
+    record = bench.measure("tree_costs", scene, lambda: [matalogue.tree_costs.get(mat) for mat in materials])
+    assert record["warm_rna"] < 2 * len(materials)
+    depsgraph_update(fake, matalogue, inner)
+    fake.rna_accesses.value = 0
+    matalogue.tree_costs.get(mats[0])
+    assert fake.rna_accesses.value < 50
+
+    prefs = fake.context.preferences.addons["matalogue"].preferences
+    prefs.show_tree_cost = True
+    try:
+        p = panel(matalogue, "MATALOGUE_PT_shader_materials")
+        bench.measure("draw_shadernodes_panel", scene, lambda: p.draw(fake.context), "tree_cost")
+    finally:
+        prefs.show_tree_cost = False
+
+
+def test_depsgraph_update(bench, fake, matalogue, scene):
+    """An edit to a single object should only cost that object, not the whole file."""
+    obj = next(obj for obj in fake.context.view_layer.objects if obj.type == "MESH")
+    depsgraph = fake.Depsgraph([fake.DepsgraphUpdate(obj, is_updated_geometry=True)])
+    record = bench.measure("depsgraph_update", scene, lambda: matalogue.on_depsgraph_update(fake.context.scene, depsgraph))
+    assert record["warm_rna"] < 200
+
+
+def test_profiler(bench, fake, matalogue, scene):
+    """Drawing with the profiler enabled should cost little more than drawing without it."""
+    panels = [cls() for cls in matalogue.classes if cls.__name__.startswith("MATALOGUE_PT_")]
+
+    def draw_all():
+        for p in panels:
+            if not hasattr(p, "poll") or p.poll(fake.context):
+                p.draw(fake.context)
+
+    bench.measure("profiler", scene, draw_all, "disabled", cold=False)
+    matalogue.profiler.enabled = True
+    try:
+        bench.measure("profiler", scene, draw_all, "enabled", cold=False)
+    finally:
+        matalogue.profiler.enabled = False
+        matalogue.profiler.clear()
+
+
+def test_load_post_build(bench, fake, matalogue, scene):
+    """Loading a file should only block the interface for one indexing slice at a time."""
+    matalogue.on_load_post()
+    assert matalogue.index_builder.running or scene.objects < 500
+    p = panel(matalogue, "MATALOGUE_PT_shader_materials")
+    slices = []
+    gc.collect()  # Don't time a collection of the garbage left by earlier tests
+    while matalogue.index_builder.running:
+        start = time.perf_counter()
+        matalogue.index_build_tick()
+        slices.append(time.perf_counter() - start)
+        p.draw(fake.context)
+    fake.app.timers.functions.clear()
+    bench.results.append(
+        {
+            "name": "load_post_build",
+            "variant": "",
+            "scene": scene.label,
+            "spec": vars(scene).copy(),
+            "slices": len(slices),
+            "slice_max_s": max(slices, default=0),
+            "total_s": sum(slices),
+        }
+    )
+    # One slice may overshoot the budget by a chunk of objects, but never by much
+    assert max(slices, default=0) < 0.1
+    assert not matalogue.usage_index.building and not matalogue.tree_graph.building
+
+
+def test_saved_index(bench, fake, matalogue, scene, tmp_path, monkeypatch):
+    """Opening a file saved with the index should cost much less than indexing everything again."""
+    monkeypatch.setattr(fake.utils, "extension_path_user", lambda package, path="", create=False: str(tmp_path))
+    finish_load(fake, matalogue)
+    fresh = bench.measure("load_post", scene, lambda: finish_load(fake, matalogue), "no saved index")
+
+    blend = tmp_path / "scene.blend"
+    fake.data.filepath = str(blend)
+    bench.measure("save_pre", scene, matalogue.on_save_pre)
+    blend.write_bytes(b"BLENDER")
+    matalogue.on_save_post()
+    record = bench.measure("load_post", scene, lambda: finish_load(fake, matalogue), "saved index")
+    assert record["warm_rna"] < fresh["warm_rna"] / 2
+
+    # A file saved again without the add-on has its objects and trees checked against their fingerprints
+    blend.write_bytes(b"BLENDER, saved again")
+    bench.measure("load_post", scene, lambda: finish_load(fake, matalogue), "saved index, checked")
+
+
+def test_merge_materials(bench, fake, matalogue, scene):
+    """Merging duplicates should only visit the slots that use them."""
+    target = fake.data.materials.new("Metal")
+    sources = [fake.data.materials.new("Metal") for _ in range(3)]
+    meshes = [obj for obj in fake.context.view_layer.objects if obj.type == "MESH"]
+    for i, obj in enumerate(meshes[: len(meshes) // 100]):
+        obj.data.materials[0] = sources[i % len(sources)]
+        matalogue.usage_index.update_object(obj)
+    expected = len(meshes) // 100
+
+    op = matalogue.MATALOGUE_OT_merge_materials(mat=target.name)
+    record = bench.measure("merge_materials", scene, lambda: op.execute(fake.context), cold=True)
+    # The registry is rescanned for the new materials, but no objects other than the users are visited
+    assert record["cold_rna"] < 50 * expected + 5 * (len(fake.data.materials) + len(fake.data.node_groups))
+
+
+def test_unused_trees(bench, fake, matalogue, scene):
+    """Unused trees are found in one pass over the users of every tree and object."""
+    record = bench.measure("find_unused_trees", scene, matalogue.unused_trees.analyze)
+    ids = sum(len(c) for c in (fake.data.materials, fake.data.node_groups, fake.data.worlds, fake.data.objects))
+    assert record["warm_rna"] < 15 * ids  # Objects are walked too, to follow instances
+
+
+def test_asset_libraries(bench, fake, matalogue, scene, tmp_path, monkeypatch):
+    """Drawing the asset libraries only compares the library settings, the files are read from a timer."""
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(20):
+        path = library / ("assets.%03d.blend" % i)
+        path.write_bytes(b"BLENDER")
+        monkeypatch.setitem(fake.library_files, str(path), {"materials": ["Material.%03d" % j for j in range(10)]})
+    monkeypatch.setattr(fake.utils, "extension_path_user", lambda package, path="", create=False: str(tmp_path))
+    monkeypatch.setattr(
+        fake.context.preferences.filepaths,
+        "asset_libraries",
+        [SimpleNamespace(name="Studio", path=str(library), import_method="APPEND_REUSE")],
+    )
+    catalogue = matalogue.asset_catalogue
+    draw = panel(matalogue, "MATALOGUE_PT_asset_libraries").draw
+    catalogue.clear()
+    try:
+        draw(fake.context)
+        fake.app.timers.run()
+        bench.measure("draw", scene, lambda: draw(fake.context), "asset_libraries", cold=False)
+    finally:
+        catalogue.clear()
@@ -0,0 +1,41 @@
+"""Check that catalogue.py reads compressed .blend files completely."""
+
+import gzip
+import os
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import catalogue  # noqa: E402
+
+
+def read_data(path):
+    blend = catalogue.BlendFile.__new__(catalogue.BlendFile)
+    blend.file = None
+    blend.data = blend.open(path)
+    try:
+        return bytes(blend.data)
+    finally:
+        blend.close()
+
+
+def test_zstd_multiple_frames(tmp_path):
+    """Blender compresses big files as several zstd frames followed by a skippable seek table frame."""
+    zstandard = pytest.importorskip("zstandard")
+    data = os.urandom(3 << 20)
+    compressor = zstandard.ZstdCompressor()
+    frames = [compressor.compress(data[i : i + (1 << 20)]) for i in range(0, len(data), 1 << 20)]
+    seek_table = struct.pack("<II", 0x184D2A5E, 9) + bytes(9)
+    path = tmp_path / "multiple_frames.blend"
+    path.write_bytes(b"".join(frames) + seek_table)
+    assert read_data(path) == data
+
+
+def test_gzip(tmp_path):
+    data = b"BLENDER-v300" + os.urandom(1 << 16)
+    path = tmp_path / "gzip.blend"
+    path.write_bytes(gzip.compress(data))
+    assert read_data(path) == data
@@ -0,0 +1,69 @@
+"""Loading a file or undoing builds the index a slice at a time, or restores the one saved with the file."""
+
+import pytest
+from helpers import finish_load, index_state, panel
+
+
+def test_load_post_build_added_tree(fake, matalogue, scene):
+    """A tree added while the index is being built is scanned once the build is done."""
+    matalogue.on_load_post()
+    matalogue.index_build_tick()
+    group = fake.data.node_groups.new("Added Group", "ShaderNodeTree")
+    mat = fake.data.materials.new("Added During Build")
+    mat.node_tree.nodes.append(fake.types.Node("Group", "ShaderNodeGroup", "GROUP", group))
+    while matalogue.index_builder.running:
+        matalogue.index_build_tick()
+    fake.app.timers.functions.clear()
+    matalogue.tree_graph.ensure()
+    assert set(matalogue.tree_graph.children[mat.session_uid]) == {group.session_uid}
+
+
+def test_undo_build(fake, matalogue, scene, monkeypatch):
+    """Undo indexes the file again a slice at a time, like loading it, instead of all at once on the next draw."""
+    finish_load(fake, matalogue)
+    expected = index_state(matalogue)
+    monkeypatch.setattr(matalogue.usage_index, "rebuild", lambda: pytest.fail("Rebuilt in one go"))
+    matalogue.on_undo_redo()
+    assert fake.app.timers.is_registered(matalogue.index_build_tick)
+    p = panel(matalogue, "MATALOGUE_PT_shader_materials")
+    while matalogue.index_builder.running:
+        matalogue.index_build_tick()
+        p.draw(fake.context)
+    fake.app.timers.functions.clear()
+    assert index_state(matalogue) == expected
+
+
+def test_saved_index(fake, matalogue, scene, tmp_path, monkeypatch):
+    """The index saved with a file is restored as it was, and checked when the file was saved without the add-on."""
+    monkeypatch.setattr(fake.utils, "extension_path_user", lambda package, path="", create=False: str(tmp_path))
+    finish_load(fake, matalogue)
+    expected = index_state(matalogue)
+
+    blend = tmp_path / "scene.blend"
+    fake.data.filepath = str(blend)
+    matalogue.on_save_pre()
+    blend.write_bytes(b"BLENDER")
+    matalogue.on_save_post()
+    finish_load(fake, matalogue)
+    assert index_state(matalogue) == expected
+
+    # A file saved again without the add-on has its objects and trees checked against their fingerprints
+    blend.write_bytes(b"BLENDER, saved again")
+    finish_load(fake, matalogue)
+    assert index_state(matalogue) == expected
+    obj = next(obj for obj in fake.context.view_layer.objects if obj.type == "MESH")
+    mat = list(fake.data.materials)[-1]
+    obj.data.materials.append(mat)
+    finish_load(fake, matalogue)
+    assert obj.session_uid in matalogue.usage_index.material_users[mat.session_uid]
+
+    # Replacing a slot's material doesn't change any count
+    matalogue.on_save_pre()
+    blend.write_bytes(b"BLENDER, saved with the index again")
+    matalogue.on_save_post()
+    used = matalogue.usage_index.object_materials[obj.session_uid]
+    other = next(m for m in fake.data.materials if m.session_uid not in used)
+    obj.data.materials[0] = other
+    blend.write_bytes(b"BLENDER, saved without the add-on")
+    finish_load(fake, matalogue)
+    assert obj.session_uid in matalogue.usage_index.material_users[other.session_uid]
@@ -0,0 +1,66 @@
+"""The goto operators show the tree that was listed, and the editor's history replays the jumps."""
+
+from helpers import panel, run_operator
+
+
+def test_navigation_history(fake, matalogue, scene):
+    """Back and forward replay the recorded jumps, and a jump that fails leaves the history as it was."""
+    a, b = list(fake.data.materials)[:2]
+    matalogue.navigation_histories.clear()
+    run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=a.name)
+    run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=b.name)
+    history = matalogue.get_navigation_history(fake.context.space_data)
+    entries = list(history.back)
+    assert len(entries) == 2
+
+    run_operator(fake, matalogue.MATALOGUE_OT_navigate_back)
+    assert (history.back, history.forward) == (entries[:1], entries[1:])
+    run_operator(fake, matalogue.MATALOGUE_OT_navigate_forward)
+    assert (history.back, history.forward) == (entries, [])
+
+    fake.data.materials.remove(a)
+    op = matalogue.MATALOGUE_OT_navigate_back()
+    assert op.execute(fake.context) == {"CANCELLED"}
+    assert (history.back, history.forward) == (entries, [])
+
+
+def test_goto_comp_view_only(fake, matalogue, scene):
+    """View Only shows another scene's compositor by pinning it, without switching the window's scene."""
+    current = fake.context.window.scene
+    other = list(fake.data.scenes)[-1]
+    fake.context.window_manager.MATALOGUE_Settings.view_only = True
+    try:
+        run_operator(fake, matalogue.MATALOGUE_OT_go_to_comp, scene=other.name)
+        space = fake.context.space_data
+        assert fake.context.window.scene is current
+        assert space.pin and space.path[-1].node_tree is other.compositing_node_group
+        panel(matalogue, "MATALOGUE_PT_compositing_scenes").draw(fake.context)
+    finally:
+        fake.context.window_manager.MATALOGUE_Settings.view_only = False
+    # A normal jump switches the scene and releases the editor
+    run_operator(fake, matalogue.MATALOGUE_OT_go_to_comp, scene=other.name)
+    assert fake.context.window.scene is other and not fake.context.space_data.pin
+
+
+def test_goto_linked_duplicate(fake, matalogue, scene):
+    """A linked material with the same name as a local one is found by its session_uid."""
+    local = list(fake.data.materials)[0]
+    library = fake.data.libraries.new("library.blend", "//library.blend")
+    linked = fake.Material(local.name)
+    linked.library = library
+    fake.data.materials._add(linked)
+    fake.context.window_manager.MATALOGUE_Settings.view_only = True
+    try:
+        op = matalogue.MATALOGUE_OT_go_to_material
+        run_operator(fake, op, mat=linked.name, uid=linked.session_uid)
+        assert fake.context.space_data.path[0].node_tree is linked.node_tree
+
+        ids = matalogue.identity_map.maps["materials"][1]
+        run_operator(fake, op, mat=local.name, uid=local.session_uid)
+        assert fake.context.space_data.path[0].node_tree is local.node_tree
+        assert matalogue.identity_map.maps["materials"][1] is ids  # Nothing was added or removed
+        added = fake.data.materials.new("Added")
+        run_operator(fake, op, mat=added.name, uid=added.session_uid)
+        assert fake.context.space_data.path[0].node_tree is added.node_tree
+    finally:
+        fake.context.window_manager.MATALOGUE_Settings.view_only = False
@@ -0,0 +1,49 @@
+"""Material previews are handed out a few at a time, within the preview policy set in the preferences."""
+
+from helpers import panel
+
+
+def test_previews_settle(fake, matalogue, scene):
+    """Every drawn material gets its preview a few per tick, then the timer stops."""
+    prefs = fake.context.preferences.addons["matalogue"].preferences
+    prefs.preview_policy = "LAZY"
+    p = panel(matalogue, "MATALOGUE_PT_shader_materials")
+    matalogue.preview_scheduler.clear()
+    try:
+        for _redraw in range(1000):
+            p.draw(fake.context)
+            if not fake.app.timers.is_registered(matalogue.preview_tick):
+                break
+            ready = len(matalogue.preview_scheduler.ready)
+            if matalogue.preview_tick() is None:
+                fake.app.timers.unregister(matalogue.preview_tick)
+            assert len(matalogue.preview_scheduler.ready) - ready <= prefs.preview_budget
+        assert not fake.app.timers.is_registered(matalogue.preview_tick)
+        # Every drawn row now has its preview, so drawing again doesn't request any
+        assert matalogue.preview_scheduler.ready and not matalogue.preview_scheduler.queued
+        p.draw(fake.context)
+        assert not fake.app.timers.is_registered(matalogue.preview_tick)
+    finally:
+        matalogue.preview_scheduler.clear()
+
+
+def test_preview_limit_list_view(fake, matalogue, scene, monkeypatch):
+    """The preview limit of the List View counts the materials left after filtering, not every material."""
+    prefs = fake.context.preferences.addons["matalogue"].preferences
+    monkeypatch.setattr(prefs, "use_list_view", True)
+    monkeypatch.setattr(prefs, "preview_policy", "LIMIT")
+    monkeypatch.setattr(prefs, "preview_limit", 5)
+    listed = list(fake.data.materials)[:3]
+    monkeypatch.setattr(matalogue, "filter_materials", lambda context, *args: listed)
+    counts = []
+    material_icon = matalogue.material_icon
+
+    def record(layout, context, mat, num_items):
+        counts.append(num_items)
+        return material_icon(layout, context, mat, num_items)
+
+    monkeypatch.setattr(matalogue, "material_icon", record)
+    panel(matalogue, "MATALOGUE_PT_shader_materials").draw(fake.context)
+    fake.app.timers.functions.clear()
+    matalogue.preview_scheduler.clear()
+    assert counts == [len(listed)] * len(listed)
@@ -0,0 +1,24 @@
+"""The draw profiler records each panel and list, and saves its timings."""
+
+import json
+
+from helpers import run_operator
+
+
+def test_profiler(fake, matalogue, scene, tmp_path):
+    """Drawing with the profiler enabled records the panels and their rows, and the save writes them out."""
+    panels = [cls() for cls in matalogue.classes if cls.__name__.startswith("MATALOGUE_PT_")]
+    matalogue.profiler.enabled = True
+    try:
+        for p in panels:
+            if not hasattr(p, "poll") or p.poll(fake.context):
+                p.draw(fake.context)
+        entries = matalogue.profiler.stats()
+        assert any(e["class"] == "MATALOGUE_PT_shader_materials" and e["items"] > 0 for e in entries)
+        path = tmp_path / "timings.json"
+        op = run_operator(fake, matalogue.MATALOGUE_OT_profiler_save, filepath=str(path))
+        assert path.exists(), op.reports
+        assert json.loads(path.read_text())
+    finally:
+        matalogue.profiler.enabled = False
+        matalogue.profiler.clear()
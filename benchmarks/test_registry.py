@@ -0,0 +1,27 @@
+"""The registry lists each tree in its panel, and is only scanned again when that can change."""
+
+from helpers import depsgraph_update
+
+
+def test_registry_updates(fake, matalogue, scene):
+    """Edits inside a tree keep the registry, while renaming or retyping a datablock rescans it."""
+    registry = matalogue.registry
+    mat = next(iter(fake.data.materials))
+    g = next(g for g in fake.data.node_groups if g.type == "GEOMETRY")
+
+    def update(*ids):
+        depsgraph_update(fake, matalogue, *ids)
+        registry.ensure()
+        return registry.key
+
+    key = update()
+    mat.node_tree.nodes.append(fake.types.Node("Moved", "ShaderNodeMath", "MATH"))
+    assert update(mat, mat.node_tree, g) == key
+    mat.name = "Renamed Material"
+    assert update(mat) != key
+    key = registry.key
+    g.is_tool = not g.is_tool
+    assert update(g) != key
+    assert (g in registry.geometry_groups_where(["is_tool"])) == g.is_tool
+    g.is_tool = not g.is_tool
+    update(g)
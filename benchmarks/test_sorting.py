@@ -0,0 +1,52 @@
+"""The tree lists are sorted by the mode picked in each panel."""
+
+import pytest
+from helpers import depsgraph_update, panel, run_operator
+
+
+@pytest.mark.parametrize("mode", ["USERS", "RECENT", "NODES"])
+def test_sort_modes(fake, matalogue, scene, mode):
+    """Sorted lists match a full sort, also after a tree changed."""
+    materials = list(fake.data.materials)
+    for mat in materials[:5]:
+        run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=mat.name)
+
+    def expected(items):
+        return sorted(items, key=lambda item: (matalogue.SORT_KEYS[mode](item), item.name.lower()))
+
+    assert matalogue.filter_materials(fake.context, sort=mode) == expected(matalogue.registry.materials)
+    groups = matalogue.registry.geometry_groups_where(["is_modifier"])
+    assert matalogue.filter_geonodes(fake.context, ["is_modifier"], sort=mode) == expected(groups)
+
+    # Visiting a material, or adding nodes and users to it, moves it to the top
+    mat = materials[len(materials) // 2]
+    run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=mat.name)
+    mat.node_tree.nodes.extend(fake.types.Node("Extra.%03d" % i, "ShaderNodeMath", "MATH") for i in range(100))
+    obj = next(obj for obj in fake.context.view_layer.objects if obj.type == "MESH")
+    obj.data.materials.append(mat)
+    depsgraph_update(fake, matalogue, mat)
+    depsgraph_update(fake, matalogue, obj, is_updated_geometry=True)
+    result = matalogue.filter_materials(fake.context, sort=mode)
+    assert result == expected(matalogue.registry.materials)
+    assert mode == "USERS" or result[0] is mat
+
+
+def test_geonodes_sort_per_panel(fake, matalogue, scene, monkeypatch):
+    """Each Geometry Nodes panel is sorted by its own setting."""
+    settings = fake.context.window_manager.MATALOGUE_Settings
+    monkeypatch.setattr(settings, "geo_tool_sort", "NODES")
+    sorts = {}
+    filter_geonodes = matalogue.filter_geonodes
+
+    def record(context, conditions, inverse, selected_only, visible_only, sort):
+        sorts[tuple(conditions), inverse] = sort
+        return filter_geonodes(context, conditions, inverse, selected_only, visible_only, sort)
+
+    monkeypatch.setattr(matalogue, "filter_geonodes", record)
+    for name in ("MATALOGUE_PT_geonodes_modifiers", "MATALOGUE_PT_geonodes_tools", "MATALOGUE_PT_geonodes_groups"):
+        panel(matalogue, name).draw(fake.context)
+    assert sorts == {
+        (("is_modifier",), False): "NAME",
+        (("is_tool",), False): "NODES",
+        (("is_modifier", "is_tool"), True): "NAME",
+    }
@@ -0,0 +1,53 @@
+"""Tree stats count the nodes of nested groups, and follow changes to any tree they include."""
+
+from helpers import depsgraph_update
+
+
+def test_tree_costs(fake, matalogue, scene):
+    """Stats include nested groups, and trees with the same structure share them."""
+    inner = fake.data.node_groups.new("Inner Group", "ShaderNodeTree")
+    inner_nodes = ["ShaderNodeMath", "ShaderNodeMath", "ShaderNodeMath", "ShaderNodeTexImage"]
+    inner.nodes.extend(fake.types.Node("Node.%03d" % i, idname, "MATH") for i, idname in enumerate(inner_nodes))
+    outer = fake.data.node_groups.new("Outer Group", "ShaderNodeTree")
+    outer.nodes.extend(fake.types.Node("Node.%03d" % i, "ShaderNodeMath", "MATH") for i in range(2))
+    outer.nodes.extend(fake.types.Node("Group.%03d" % i, "ShaderNodeGroup", "GROUP", inner) for i in range(2))
+    mats = [fake.data.materials.new("Costly Material") for _ in range(2)]
+    for mat in mats:
+        mat.node_tree.nodes.extend(fake.types.Node("Node.%03d" % i, "ShaderNodeMath", "MATH") for i in range(4))
+        mat.node_tree.nodes.append(fake.types.Node("Group", "ShaderNodeGroup", "GROUP", outer))
+
+    stats = matalogue.tree_costs.get(mats[0])
+    own = [node for node in mats[0].node_tree.nodes if node.type != "GROUP"]
+    own_cost = sum(matalogue.NODE_COSTS.get(node.bl_idname, 1) for node in own)
+    assert (stats.nodes, stats.depth, stats.textures) == (len(own) + 2 + 2 * 4, 2, 2)
+    assert stats.cost == own_cost + 2 + 2 * (3 + 4)
+    assert matalogue.tree_costs.get(mats[1]) is stats  # Same structure, same entry
+
+    # A change that keeps the structure gives the same stats, from the signature cache
+    signatures = len(matalogue.tree_costs.by_signature)
+    depsgraph_update(fake, matalogue, inner)
+    assert matalogue.tree_costs.get(mats[0]) is stats
+    assert len(matalogue.tree_costs.by_signature) == signatures
+
+    # Adding a texture to the inner group raises the cost of everything using it
+    inner.nodes.append(fake.types.Node("Image", "ShaderNodeTexImage", "TEX_IMAGE"))
+    depsgraph_update(fake, matalogue, inner)
+    assert matalogue.tree_costs.get(mats[0]).textures == 4
+    assert matalogue.tree_costs.get(mats[1]).cost == stats.cost + 2 * 4
+    ordered = matalogue.filter_materials(fake.context, sort="COST")
+    costs = [matalogue.tree_costs.get(m).cost for m in ordered]
+    assert costs == sorted(costs, reverse=True)
+
+
+def test_tree_stats_size(fake, matalogue, scene, monkeypatch):
+    """Stats are only shared by trees with the same structure, and the least recently used ones are dropped."""
+    monkeypatch.setattr(matalogue, "TREE_STATS_SIZE", 3)
+    matalogue.tree_costs.clear()
+    sizes = []
+    for i in range(6):
+        mat = fake.data.materials.new("Sized Material")
+        mat.node_tree.nodes.extend(fake.types.Node("Node.%03d" % j, "ShaderNodeMath", "MATH") for j in range(i))
+        sizes.append(matalogue.tree_costs.get(mat).nodes)
+        assert len(matalogue.tree_costs.by_signature) <= 3
+    assert len(set(sizes)) == len(sizes)
+    matalogue.tree_costs.clear()
@@ -0,0 +1,76 @@
+"""Finding and purging the trees nothing in the file uses."""
+
+from helpers import depsgraph_update, run_operator
+
+
+def test_unused_trees(fake, matalogue, scene):
+    """Trees only used by unused trees, or by objects outside every scene, are found and purged."""
+    chained = fake.data.node_groups.new("Chained Group", "ShaderNodeTree")
+    unused_group = fake.data.node_groups.new("Unused Group", "ShaderNodeTree")
+    unused_group.nodes.append(fake.types.Node("Group", "ShaderNodeGroup", "GROUP", chained))
+    outside = fake.data.materials.new("Outside Material")
+    obj = fake.data.objects.new("Outside Object", fake.data.meshes.new("Outside Mesh"))
+    obj.data.materials.append(outside)
+    kept = fake.data.materials.new("Fake User Material")
+    kept.use_fake_user = True
+
+    matalogue.unused_trees.analyze()
+    names = matalogue.unused_trees.names
+    assert {"Chained Group", "Unused Group"} <= set(names["SHADER"])
+    assert "Outside Material" in names["MATERIAL"]
+    assert "Fake User Material" not in names["MATERIAL"]
+    assert not names.get("COMPOSITING") or all(not n.startswith("Compositing") for n in names["COMPOSITING"])
+    # Every used material is kept
+    used = {uid for uid, users in matalogue.usage_index.material_users.items() if users.keys() - {obj.session_uid}}
+    assert not any(mat.session_uid in used for mat in fake.data.materials if mat.name in names["MATERIAL"])
+
+    count = matalogue.unused_trees.count()
+    trees = (fake.data.materials, fake.data.node_groups, fake.data.worlds)
+    before = sum(len(c) for c in trees)
+    matalogue.preview_scheduler.icon(outside)
+    matalogue.tree_costs.get(outside)
+    op = run_operator(fake, matalogue.MATALOGUE_OT_purge_unused_trees)
+    assert sum(len(c) for c in trees) == before - count, op.reports
+    # Nothing is left pointing at the removed trees
+    assert outside.session_uid not in matalogue.preview_scheduler.queued
+    assert outside.session_uid not in matalogue.tree_costs.combined
+    assert "World.001" not in fake.data.worlds and "World" in fake.data.worlds
+    assert "Chained Group" not in fake.data.node_groups and "Fake User Material" in fake.data.materials
+
+    # Using a group in another tree changes what is unused, while other edits to the tree don't
+    later = fake.data.node_groups.new("Used Later", "ShaderNodeTree")
+    matalogue.unused_trees.analyze()
+    mat = next(iter(fake.data.materials))
+    mat.node_tree.nodes.append(fake.types.Node("Moved", "ShaderNodeMath", "MATH"))
+    depsgraph_update(fake, matalogue, mat)
+    assert matalogue.unused_trees.is_current()
+    mat.node_tree.nodes.append(fake.types.Node("Group", "ShaderNodeGroup", "GROUP", later))
+    depsgraph_update(fake, matalogue, mat)
+    assert not matalogue.unused_trees.is_current()
+
+
+def test_unused_trees_instances(fake, matalogue, scene):
+    """Objects only used through a collection or particle instance keep their materials when purging."""
+    instanced = fake.data.materials.new("Instanced Material")
+    obj = fake.data.objects.new("Instanced Object", fake.data.meshes.new("Instanced Mesh"))
+    obj.data.materials.append(instanced)
+    collection = fake.data.collections.new("Instanced Collection")
+    collection.objects.append(obj)
+    instancer = fake.data.objects.new("Instancer", None)
+    instancer.instance_type = "COLLECTION"
+    instancer.instance_collection = collection
+    fake.context.scene.collection.objects.link(instancer)
+
+    scattered = fake.data.materials.new("Scattered Material")
+    particle = fake.data.objects.new("Particle Object", fake.data.meshes.new("Particle Mesh"))
+    particle.data.materials.append(scattered)
+    settings = fake.data.particles.new("Scatter")
+    settings.instance_object = particle
+    emitter = next(obj for obj in fake.context.scene.objects if obj.type == "MESH")
+    emitter.particle_systems.append(fake.ParticleSystem(settings))
+    matalogue.usage_index.clear()
+
+    matalogue.unused_trees.analyze()
+    assert not {"Instanced Material", "Scattered Material"} & set(matalogue.unused_trees.names.get("MATERIAL", ()))
+    run_operator(fake, matalogue.MATALOGUE_OT_purge_unused_trees)
+    assert "Instanced Material" in fake.data.materials and "Scattered Material" in fake.data.materials
@@ -0,0 +1,91 @@
+"""The usage index, evaluated usage and face counts follow the edits made to the file."""
+
+from helpers import depsgraph_update, run_operator
+
+
+def test_objects_added_and_removed(fake, matalogue, scene, monkeypatch):
+    """Adding or deleting an object only indexes or drops that object."""
+    usage_index = matalogue.usage_index
+    usage_index.ensure()
+    mat = next(iter(fake.data.materials))
+    obj = fake.data.objects.new("Added Object", fake.data.meshes.new("Added Mesh"))
+    obj.data.materials.append(mat)
+    indexed = []
+    update_object = usage_index.update_object
+    monkeypatch.setattr(usage_index, "update_object", lambda o: indexed.append(o) or update_object(o))
+    depsgraph_update(fake, matalogue)
+    assert indexed == [obj] and obj.session_uid in usage_index.material_users[mat.session_uid]
+
+    fake.data.objects.remove(obj)
+    usage_index.ensure()
+    assert indexed == [obj] and obj.session_uid not in usage_index.material_users.get(mat.session_uid, {})
+    assert len(usage_index.objects) == len(fake.data.objects)
+
+
+def test_evaluated_usage(fake, matalogue, scene):
+    """Materials only used through instances count as visible when the evaluated usage is shown."""
+    settings = fake.context.window_manager.MATALOGUE_Settings
+    mat = fake.data.materials.new("Instanced Material")
+    source = fake.data.objects.new("Instanced Object", fake.data.meshes.new("Instanced Mesh"))
+    source.data.materials.append(mat)
+    collection = fake.data.collections.new("Instanced Collection")
+    collection.objects.append(source)
+    instancer = fake.data.objects.new("Instancer", None)
+    instancer.instance_type = "COLLECTION"
+    instancer.instance_collection = collection
+    fake.context.scene.collection.objects.link(instancer)
+    depsgraph_update(fake, matalogue, instancer)
+
+    assert mat not in matalogue.filter_materials(fake.context, visible_only=True)
+    settings.mat_evaluated = True
+    try:
+        assert mat in matalogue.filter_materials(fake.context, visible_only=True, evaluated=True)
+        run_operator(fake, matalogue.MATALOGUE_OT_go_to_material, mat=mat.name)
+        assert fake.context.object is instancer and fake.context.selected_objects == [instancer]
+        assert matalogue.dummy_handle[0] is None
+    finally:
+        settings.mat_evaluated = False
+
+
+def test_face_counts(fake, matalogue, scene):
+    """Face counts match the faces of every mesh, and an edit only recounts the mesh that changed."""
+    empty = fake.data.materials.new("Empty Slot Material")
+    mesh = fake.data.meshes.new("Empty Slot Mesh")
+    mesh.materials.extend([fake.data.materials["Material.00000"], empty])
+    mesh.polygons.append(fake.MeshPolygon(0))
+    obj = fake.data.objects.new("Empty Slot Object", mesh)
+    fake.context.scene.collection.objects.link(obj)
+    depsgraph_update(fake, matalogue, obj)
+
+    shown = matalogue.filter_materials(fake.context, hide_empty=True)
+    assert empty not in shown and empty in matalogue.filter_materials(fake.context)
+    expected = {}
+    for mesh_data in {o.data for o in fake.data.objects if o.type == "MESH"}:
+        for polygon in mesh_data.polygons:
+            mat = mesh_data.materials[polygon.material_index]
+            expected[mat] = expected.get(mat, 0) + 1
+    for mat in shown:
+        assert matalogue.face_counts.total(mat) == expected.get(mat, 0), mat.name
+
+    cached = len(matalogue.face_counts.meshes)
+    mesh.polygons.append(fake.MeshPolygon(1))
+    depsgraph_update(fake, matalogue, mesh, is_updated_geometry=True)
+    assert len(matalogue.face_counts.meshes) == cached - 1
+    assert empty in matalogue.filter_materials(fake.context, hide_empty=True)
+    assert len(matalogue.face_counts.meshes) == cached
+
+
+def test_merge_materials(fake, matalogue, scene):
+    """Merging duplicates moves every slot using them to the chosen material."""
+    target = fake.data.materials.new("Metal")
+    sources = [fake.data.materials.new("Metal") for _ in range(3)]
+    meshes = [obj for obj in fake.context.view_layer.objects if obj.type == "MESH"]
+    for i, obj in enumerate(meshes[: len(meshes) // 100]):
+        obj.data.materials[0] = sources[i % len(sources)]
+        matalogue.usage_index.update_object(obj)
+    expected = len(meshes) // 100
+
+    op = run_operator(fake, matalogue.MATALOGUE_OT_merge_materials, mat=target.name)
+    assert "in %d slot(s)" % expected in op.reports[0][1]
+    assert all(not matalogue.usage_index.material_users.get(mat.session_uid) for mat in sources)
+    assert len(matalogue.usage_index.material_users[target.session_uid]) == expected
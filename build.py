@@ -1,13 +1,26 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import os
 import re
 import subprocess
 import sys
+import time
 import zipfile
 from pathlib import Path
 
 
+EXCLUDED_DIRECTORIES = ("benchmarks/",)
+EXCLUDED_FILES = ("catalogue.py",)
+
+# Fixed entry metadata, so that building the same files always gives the same bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # The earliest date a zip can store
+ZIP_FILE_MODE = 0o644 << 16
+ZIP_COMPRESS_LEVEL = 9
+MANIFEST_PREFIX = "sha256:"  # Start of the zip comment, followed by the digest of the packaged files
+
+
 def list_files_to_package(root: Path, excluded_relative_paths: set[str]) -> list[Path]:
     result = subprocess.run(
         ["git", "ls-files", "--cached", "--others", "--exclude-standard"],
@@ -27,7 +40,7 @@ def list_files_to_package(root: Path, excluded_relative_paths: set[str]) -> list
             continue
 
         relative = line.replace("\\", "/")
-        if relative in excluded_relative_paths:
+        if relative in excluded_relative_paths or relative.startswith(EXCLUDED_DIRECTORIES):
             continue
 
         if Path(relative).name.startswith("."):
@@ -40,8 +53,9 @@ def list_files_to_package(root: Path, excluded_relative_paths: set[str]) -> list
     return files
 
 
-def build_zip(root: Path, output_zip: Path) -> None:
-    excluded = {Path(__file__).name.replace("\\", "/")}
+def package_files(root: Path, output_zip: Path) -> dict[str, Path]:
+    """Map the name of each file in the zip to its path, in the order they're stored."""
+    excluded = {Path(__file__).name.replace("\\", "/"), *EXCLUDED_FILES}
 
     try:
         output_rel = output_zip.resolve().relative_to(root.resolve())
@@ -50,15 +64,96 @@ def build_zip(root: Path, output_zip: Path) -> None:
         pass
 
     files = list_files_to_package(root, excluded)
+    return dict(sorted((file_path.relative_to(root).as_posix(), file_path) for file_path in files))
+
+
+def hash_files(files: dict[str, Path]) -> dict[str, str]:
+    return {arcname: hashlib.sha256(file_path.read_bytes()).hexdigest() for arcname, file_path in files.items()}
+
+
+def manifest_digest(hashes: dict[str, str], date_time: tuple[int, ...]) -> str:
+    """Digest of everything the zip's bytes depend on: the packaged files and the timestamp of the entries."""
+    digest = hashlib.sha256()
+    digest.update(f"{date_time}\n".encode("utf-8"))
+    for arcname, file_hash in sorted(hashes.items()):
+        digest.update(f"{arcname}\0{file_hash}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def zip_date_time() -> tuple[int, ...]:
+    """The time stored for every entry, SOURCE_DATE_EPOCH if it's set."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return ZIP_DATE_TIME
+    # Zips only store even seconds
+    return max(ZIP_DATE_TIME, tuple(time.gmtime(int(epoch) // 2 * 2)[:6]))
+
+
+def read_zip_digest(output_zip: Path) -> str | None:
+    """The digest of the files an existing zip was built from, or None if it wasn't made by this script."""
+    try:
+        with zipfile.ZipFile(output_zip) as archive:
+            comment = archive.comment.decode("utf-8", "replace")
+    except (OSError, zipfile.BadZipFile):
+        return None
+    return comment[len(MANIFEST_PREFIX) :] if comment.startswith(MANIFEST_PREFIX) else None
+
+
+def build_zip(files: dict[str, Path], output_zip: Path, digest: str) -> None:
     output_zip.parent.mkdir(parents=True, exist_ok=True)
+    date_time = zip_date_time()
+    temporary = output_zip.with_name(output_zip.name + ".tmp")
 
-    with zipfile.ZipFile(output_zip, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
-        for file_path in files:
-            archive.write(file_path, arcname=file_path.relative_to(root).as_posix())
+    try:
+        with zipfile.ZipFile(temporary, mode="w") as archive:
+            for arcname, file_path in files.items():
+                info = zipfile.ZipInfo(arcname, date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.create_system = 3  # Unix, whichever system builds it
+                info.external_attr = ZIP_FILE_MODE
+                archive.writestr(info, file_path.read_bytes(), compresslevel=ZIP_COMPRESS_LEVEL)
+            archive.comment = (MANIFEST_PREFIX + digest).encode("utf-8")
+        os.replace(temporary, output_zip)
+    finally:
+        # Left over when writing failed, and would be packaged by the next build
+        temporary.unlink(missing_ok=True)
 
     print(f"Created {output_zip} with {len(files)} files.")
 
 
+def check_zip(output_zip: Path, hashes: dict[str, str]) -> list[str]:
+    """Compare an existing zip with the files it would be built from. Returns the differences found."""
+    try:
+        archive = zipfile.ZipFile(output_zip)
+    except (OSError, zipfile.BadZipFile) as exc:
+        return [f"Cannot read {output_zip}: {exc}"]
+
+    problems = []
+    date_time = zip_date_time()
+    with archive:
+        names = set()
+        for info in archive.infolist():
+            names.add(info.filename)
+            expected = hashes.get(info.filename)
+            if expected is None:
+                problems.append(f"{info.filename}: not in the tree")
+            elif hashlib.sha256(archive.read(info)).hexdigest() != expected:
+                problems.append(f"{info.filename}: differs from the tree")
+            if info.date_time != date_time:
+                problems.append(f"{info.filename}: timestamp isn't normalized, the zip isn't reproducible")
+        problems.extend(f"{arcname}: missing from the zip" for arcname in sorted(hashes.keys() - names))
+        if archive.namelist() != sorted(archive.namelist()):
+            problems.append("Files aren't sorted, the zip isn't reproducible")
+    return problems
+
+
+def print_timings(timings: dict[str, float]) -> None:
+    print("Timings:")
+    for step, seconds in timings.items():
+        print(f"  {step:<8} {seconds * 1000:8.1f} ms")
+    print(f"  {'total':<8} {sum(timings.values()) * 1000:8.1f} ms")
+
+
 def read_manifest_value(manifest_path: Path, key: str) -> str:
     pattern = re.compile(rf"^{re.escape(key)}\s*=\s*\"([^\"]+)\"\s*$")
 
@@ -86,17 +181,53 @@ def main() -> int:
         default=str(default_output),
         help="Output zip file path (default: <id>-v<version>.zip in the repository root).",
     )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Verify that the existing zip matches the files in the repository, without building it.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Build the zip even if it was already built from the same files.",
+    )
     args = parser.parse_args()
 
     output_zip = Path(args.output).resolve()
+    timings: dict[str, float] = {}
+    problems: list[str] = []
 
     try:
-        build_zip(root, output_zip)
+        start = time.perf_counter()
+        files = package_files(root, output_zip)
+        timings["list"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hashes = hash_files(files)
+        digest = manifest_digest(hashes, zip_date_time())
+        timings["hash"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if args.check:
+            problems = check_zip(output_zip, hashes)
+            timings["check"] = time.perf_counter() - start
+            for problem in problems:
+                print(problem, file=sys.stderr)
+            if problems:
+                print(f"{output_zip} is out of date ({len(problems)} problem(s)).", file=sys.stderr)
+            else:
+                print(f"{output_zip} matches the {len(files)} files in the repository.")
+        elif not args.force and read_zip_digest(output_zip) == digest:
+            print(f"{output_zip} is up to date, skipped.")
+        else:
+            build_zip(files, output_zip, digest)
+            timings["zip"] = time.perf_counter() - start
     except Exception as exc:
         print(f"Error: {exc}", file=sys.stderr)
         return 1
 
-    return 0
+    print_timings(timings)
+    return 1 if problems else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Block codes of the datablocks listed in the Trees tab
+ID_CODES = {b"MA\0\0": "materials", b"NT\0\0": "node_groups", b"WO\0\0": "worlds", b"SC\0\0": "scenes"}
+DNA_CODE = b"DNA1"
+END_CODE = b"ENDB"
+
+LIB_EMBEDDED_DATA = 1 << 10  # ID.flag of node trees that belong to a material, world, light or scene
+NTREE_TYPES = {0: "shader", 1: "compositing", 3: "geometry"}  # bNodeTree.type, texture trees aren't listed
+GEO_NODE_ASSET_TOOL = 1 << 0  # GeometryNodeAssetTraits.flag
+GEO_NODE_ASSET_MODIFIER = 1 << 6
+
+
+class BlendFileError(Exception):
+    pass
+
+
+class SDNA:
+    """Struct layouts from the DNA1 block, used to find fields without hardcoding offsets for each Blender version."""
+
+    def __init__(self, data: bytes, endian: str, pointer_size: int):
+        self.pointer_size = pointer_size
+        offset = 8  # "SDNA", "NAME"
+        (count,) = struct.unpack_from(endian + "i", data, offset)
+        offset += 4
+        names = []
+        for _ in range(count):
+            end = data.index(b"\0", offset)
+            names.append(data[offset:end].decode("latin-1"))
+            offset = end + 1
+        offset = (offset + 3) & ~3
+
+        offset += 4  # "TYPE"
+        (count,) = struct.unpack_from(endian + "i", data, offset)
+        offset += 4
+        types = []
+        for _ in range(count):
+            end = data.index(b"\0", offset)
+            types.append(data[offset:end].decode("latin-1"))
+            offset = end + 1
+        offset = (offset + 3) & ~3
+
+        offset += 4  # "TLEN"
+        lengths = struct.unpack_from(f"{endian}{len(types)}h", data, offset)
+        offset += 2 * len(types)
+        offset = (offset + 3) & ~3
+
+        offset += 4  # "STRC"
+        (count,) = struct.unpack_from(endian + "i", data, offset)
+        offset += 4
+        self.structs: dict[str, dict[str, tuple[int, int]]] = {}  # struct name -> {field name: (offset, size)}
+        for _ in range(count):
+            type_index, field_count = struct.unpack_from(endian + "2h", data, offset)
+            offset += 4
+            fields = {}
+            field_offset = 0
+            for _ in range(field_count):
+                field_type, field_name = struct.unpack_from(endian + "2h", data, offset)
+                offset += 4
+                name = names[field_name]
+                size = self.field_size(name, lengths[field_type])
+                fields[field_name_key(name)] = (field_offset, size)
+                field_offset += size
+            self.structs[types[type_index]] = fields
+
+    def field_size(self, name: str, type_length: int) -> int:
+        size = self.pointer_size if name.startswith(("*", "(")) else type_length
+        for dimension in name.split("[")[1:]:
+            size *= int(dimension.rstrip("]"))
+        return size
+
+    def offset(self, struct_name: str, field: str) -> int | None:
+        found = self.structs.get(struct_name, {}).get(field)
+        return found[0] if found else None
+
+    def size(self, struct_name: str, field: str) -> int:
+        return self.structs[struct_name][field][1]
+
+
+def field_name_key(name: str) -> str:
+    """'*next' -> 'next', 'name[66]' -> 'name', '(*func)()' -> 'func'."""
+    return name.lstrip("(*").split("[")[0].split(")")[0]
+
+
+class BlendFile:
+    """Reads block headers and a few ID fields from a .blend file, without loading the rest of the file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+        self.data = self.open(path)
+        self.parse_header()
+
+    def open(self, path: Path):
+        with open(path, "rb") as f:
+            magic = f.read(4)
+            f.seek(0)
+            if magic.startswith(GZIP_MAGIC):
+                return gzip.decompress(f.read())
+            if magic == ZSTD_MAGIC:
+                if zstandard is None:
+                    raise BlendFileError("zstd compressed, install the zstandard module to read it")
+                # Blender writes several frames followed by a seek table, older zstandard versions stop after one
+                return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True).read()
+            self.file = open(path, "rb")
+            try:
+                return mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty file
+                return b""
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self.file is not None:
+            self.file.close()
+
+    def parse_header(self):
+        header = bytes(self.data[:17])
+        if not header.startswith(b"BLENDER"):
+            raise BlendFileError("not a .blend file")
+        if header[7:9].isdigit():
+            # Blender 5.0 and later: BLENDER17-01v0500, header size, pointer size, format version, endianness, version
+            self.header_size = int(header[7:9])
+            if header[9:10] != b"-" or header[10:12] != b"01":
+                raise BlendFileError(f"unsupported .blend file format {header[:self.header_size]!r}")
+            endian_char = header[12:13]
+            self.version = header[13:17].decode()
+            self.pointer_size = 8
+            self.large_bhead = True
+        else:
+            # BLENDER-v402: pointer size, endianness, version
+            self.header_size = 12
+            self.pointer_size = 8 if header[7:8] == b"-" else 4
+            endian_char = header[8:9]
+            self.version = header[9:12].decode()
+            self.large_bhead = False
+        self.endian = "<" if endian_char == b"v" else ">"
+        if self.large_bhead:
+            self.bhead = struct.Struct(self.endian + "4siQqq")  # code, SDNA index, old address, length, count
+        else:
+            pointer = "Q" if self.pointer_size == 8 else "I"
+            self.bhead = struct.Struct(self.endian + "4si" + pointer + "ii")  # code, length, old address, SDNA, count
+
+    def blocks(self):
+        """Yield (code, data offset, length, old address) for every block, reading only the headers."""
+        data = self.data
+        offset = self.header_size
+        size = len(data)
+        unpack = self.bhead.unpack_from
+        header_size = self.bhead.size
+        while offset + header_size <= size:
+            if self.large_bhead:
+                code, _sdna, old, length, _count = unpack(data, offset)
+            else:
+                code, length, old, _sdna, _count = unpack(data, offset)
+            if code == END_CODE:
+                return
+            offset += header_size
+            yield code, offset, length, old
+            offset += length
+
+    def read_int(self, offset: int, fmt: str = "i") -> int:
+        return struct.unpack_from(self.endian + fmt, self.data, offset)[0]
+
+    def read_pointer(self, offset: int) -> int:
+        return self.read_int(offset, "Q" if self.pointer_size == 8 else "I")
+
+    def read_string(self, offset: int, size: int) -> str:
+        raw = bytes(self.data[offset : offset + size])
+        return raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+    def catalogue(self) -> dict:
+        """List the materials, node groups, worlds and scenes the way the Trees tab groups them."""
+        blocks = {kind: [] for kind in ID_CODES.values()}
+        sdna = None
+        for code, offset, length, _old in self.blocks():
+            kind = ID_CODES.get(code)
+            if kind is not None:
+                blocks[kind].append(offset)
+            elif code == DNA_CODE:
+                sdna = SDNA(bytes(self.data[offset : offset + length]), self.endian, self.pointer_size)
+        if sdna is None:
+            raise BlendFileError("no DNA1 block")
+
+        name_offset = sdna.offset("ID", "name")
+        if name_offset is None:
+            raise BlendFileError("no ID name in the DNA")
+        name_size = sdna.size("ID", "name")  # 66 bytes before 5.0, 258 after, including the two letter code
+        lib_offset = sdna.offset("ID", "lib")
+        flag_offset = sdna.offset("ID", "flag")
+
+        def ids(kind):
+            """Yield (name, data offset) of the local, non-embedded IDs of this kind."""
+            for offset in blocks[kind]:
+                if lib_offset is not None and self.read_pointer(offset + lib_offset):
+                    continue
+                if flag_offset is not None and self.read_int(offset + flag_offset, "h") & LIB_EMBEDDED_DATA:
+                    continue
+                yield self.read_string(offset + name_offset + 2, name_size - 2), offset
+
+        use_nodes_offset = sdna.offset("Material", "use_nodes")
+        if int(self.version) >= 500:
+            use_nodes_offset = None  # Materials always use nodes since 5.0, the old flag is left as it was
+        materials = [
+            name
+            for name, offset in ids("materials")
+            if use_nodes_offset is None or self.read_int(offset + use_nodes_offset, "b")
+        ]
+
+        type_offset = sdna.offset("bNodeTree", "type")
+        traits_offset = sdna.offset("bNodeTree", "geometry_node_asset_traits")
+        groups = {"shader": [], "geometry": [], "compositing": []}
+        traits = {}  # old address of the GeometryNodeAssetTraits -> group names
+        for name, offset in ids("node_groups"):
+            tree_type = NTREE_TYPES.get(self.read_int(offset + type_offset))
+            if tree_type is None:
+                continue
+            groups[tree_type].append(name)
+            if tree_type == "geometry" and traits_offset is not None:
+                address = self.read_pointer(offset + traits_offset)
+                if address:
+                    traits.setdefault(address, []).append(name)
+
+        flags = {}  # geometry group name -> asset trait flags
+        flag_field = sdna.offset("GeometryNodeAssetTraits", "flag")
+        if traits and flag_field is not None:
+            for _code, offset, _length, old in self.blocks():
+                for name in traits.get(old, ()):
+                    flags[name] = self.read_int(offset + flag_field)
+
+        geometry_modifiers = [name for name in groups["geometry"] if flags.get(name, 0) & GEO_NODE_ASSET_MODIFIER]
+        geometry_tools = [name for name in groups["geometry"] if flags.get(name, 0) & GEO_NODE_ASSET_TOOL]
+        listed = GEO_NODE_ASSET_MODIFIER | GEO_NODE_ASSET_TOOL
+        geometry_other = [name for name in groups["geometry"] if not flags.get(name, 0) & listed]
+        return {
+            "version": self.version,
+            "materials": sorted(materials),
+            "worlds": sorted(name for name, _offset in ids("worlds")),
+            "shader_groups": sorted(groups["shader"]),
+            "geometry_modifiers": sorted(geometry_modifiers),
+            "geometry_tools": sorted(geometry_tools),
+            "geometry_groups": sorted(geometry_other),
+            "compositor_groups": sorted(groups["compositing"]),
+            "scenes": sorted(name for name, _offset in ids("scenes")),
+        }
+
+
+def read_catalogue(path: str) -> dict:
+    """Catalogue one file, reporting errors in the result so one bad file doesn't stop the others."""
+    result = {"file": path}
+    try:
+        blend = BlendFile(Path(path))
+        try:
+            result.update(blend.catalogue())
+        finally:
+            blend.close()
+    except (OSError, BlendFileError, struct.error, EOFError, ValueError) as exc:
+        result["error"] = str(exc) or type(exc).__name__
+    return result
+
+
+def find_blend_files(paths: list[str], recursive: bool) -> list[str]:
+    files: list[str] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pattern = "**/*.blend" if recursive else "*.blend"
+            files.extend(str(p) for p in sorted(path.glob(pattern)) if p.is_file())
+        else:
+            files.append(str(path))
+    return files
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="List the materials, node groups, worlds and scenes in .blend files as JSON lines, one per file, "
+        "without opening Blender. The lists match what the Trees tab of the add-on shows for each file."
+    )
+    parser.add_argument("paths", nargs="+", help=".blend files, or folders to look for them in.")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Also look in the subfolders of folders.")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of files to read at the same time (default: number of CPUs).",
+    )
+    args = parser.parse_args()
+
+    files = find_blend_files(args.paths, args.recursive)
+    failed = 0
+
+    def emit(result: dict) -> None:
+        nonlocal failed
+        failed += "error" in result
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+    if args.jobs <= 1 or len(files) <= 1:
+        for path in files:
+            emit(read_catalogue(path))
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(files))) as executor:
+            for result in executor.map(read_catalogue, files, chunksize=max(1, len(files) // (args.jobs * 4))):
+                emit(result)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())